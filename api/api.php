@@ -71,6 +71,7 @@ function apiInfo() {
             'GET /api/api.php?action=runner_results&telegram_id=123' => 'Результаты бегуна',
             'GET /api/api.php?action=runner_bests&telegram_id=123' => 'Личные рекорды',
             'GET /api/api.php?action=rating&distance=5 км' => 'Рейтинг на дистанции',
+            'GET /api/api.php?action=rating&distance_m=5000' => 'Рейтинг по дистанции в метрах (все написания)',
             'GET /api/api.php?action=clubs' => 'Список клубов',
             'GET /api/api.php?action=club&id=1' => 'Информация о клубе',
         ]
@@ -218,8 +219,10 @@ function getRunnerBests($pdo, $telegramId) {
 }
 
 // Рейтинг на дистанции
-function getRating($pdo, $distance) {
+// distance_m (метры) объединяет написания «5 км», «5км», «5000 м»; distance — точный текст
+function getRating($pdo, $distance, $distanceM = null) {
     try {
+        $filter = $distanceM ? 'r.distance_m = ?' : 'r.distance = ?';
         $stmt = $pdo->prepare("
             SELECT 
                 ru.id,
@@ -232,13 +235,13 @@ function getRating($pdo, $distance) {
                 MIN(r.overall_place) as best_place
             FROM results r
             JOIN runners ru ON r.runner_id = ru.id
-            WHERE r.distance = ?
+            WHERE $filter
             GROUP BY r.runner_id
             HAVING best_time_seconds IS NOT NULL
             ORDER BY best_time_seconds ASC
             LIMIT 50
         ");
-        $stmt->execute([$distance]);
+        $stmt->execute([$distanceM ? (int)$distanceM : $distance]);
         $rating = $stmt->fetchAll();
         
         jsonResponse(['status' => 'ok', 'count' => count($rating), 'data' => $rating]);
@@ -307,6 +310,7 @@ $action = getParam('action', '');
 $id = getParam('id', null);
 $telegram_id = getParam('telegram_id', null);
 $distance = getParam('distance', '');
+$distance_m = getParam('distance_m', null);
 
 switch ($action) {
     case '':
@@ -346,7 +350,9 @@ switch ($action) {
         break;
         
     case 'rating':
-        if ($distance) {
+        if ($distance_m && ctype_digit($distance_m)) {
+            getRating($pdo, $distance, $distance_m);
+        } elseif ($distance) {
             getRating($pdo, $distance);
         } else {
             jsonResponse(['error' => 'Missing distance'], 400);
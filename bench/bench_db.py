@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Seido — бенчмарк горячих запросов к БД на синтетической базе (без сети)
+Замеряются настоящие методы Database, которые вызывают обработчики:
+  - get_races_filtered — все сочетания фильтров (город, тип, даты, дистанция, организатор,
+    поиск) для предстоящих и прошедших забегов;
+  - get_race_results — страницы протокола самого большого и среднего забега, вплоть до последней;
+  - search_results_by_name — частая и редкая фамилия, имя, подстрока, нет совпадений;
+  - get_runner_personal_bests — бегун с наибольшим числом стартов, средний, с одним стартом;
+  - get_developer_analytics — все разделы /dev, обзор из снимка и с пересчётом.
+Отчёт — JSON в bench/reports/ (имя по коммиту); сравнить два: bench/compare.py.
+
+Запуск:
+  python bench/bench_db.py --size small
+  python bench/bench_db.py --size large --repeats 7 --json bench/reports/db-before.json
+  python bench/bench_db.py --only "races_filtered\\[upcoming"
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import re
+import sys
+import time
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.report import default_report_path, measure_async, print_cases, write_report
+from bench.synthetic_db import add_size_arguments, generate, size_from_args
+
+from db import Database
+from query_stats import query_stats
+
+# Размер страницы протокола в карточке забега (handlers.PROTOCOL_PAGE_SIZE)
+PROTOCOL_PAGE_SIZE = 15
+# Размер страницы списка забегов
+RACES_PAGE_SIZE = 10
+ANALYTICS_SECTIONS = ("runners", "races", "results", "claims", "feedback", "subscriptions")
+
+Case = Tuple[str, Callable[[], Awaitable]]
+
+
+def race_filter_values(upcoming: bool) -> Dict[str, str]:
+    """Значения фильтров, которые есть в синтетической базе (как их разбирает handlers)"""
+    today = date.today()
+    if upcoming:
+        date_from, date_to = today + timedelta(days=30), today + timedelta(days=180)
+    else:
+        date_from, date_to = today - timedelta(days=3 * 365), today - timedelta(days=30)
+    return {
+        "city": "Москва",
+        "race_type": "шоссе",
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "distance": "21.1",
+        "organizer": "RussiaRunning",
+        "query": "марафон",
+    }
+
+
+def races_filtered_cases(db: Database) -> List[Case]:
+    cases = []
+    for upcoming in (True, False):
+        values = race_filter_values(upcoming)
+        for n in range(len(values) + 1):
+            for names in itertools.combinations(values, n):
+                filters = {name: values[name] for name in names}
+                label = "+".join(names) or "none"
+                cases.append((
+                    f"races_filtered[{'upcoming' if upcoming else 'past'}:{label}]",
+                    lambda f=filters, u=upcoming: db.get_races_filtered(
+                        **f, upcoming_only=u, limit=RACES_PAGE_SIZE, offset=0),
+                ))
+        # Листание без фильтров вглубь списка
+        cases.append((
+            f"races_filtered[{'upcoming' if upcoming else 'past'}:none@page50]",
+            lambda u=upcoming: db.get_races_filtered(upcoming_only=u, limit=RACES_PAGE_SIZE,
+                                                     offset=50 * RACES_PAGE_SIZE),
+        ))
+    return cases
+
+
+async def _scalar(db: Database, sql: str, params=()):
+    async with db.db.execute(sql, params) as cursor:
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def race_results_cases(db: Database) -> List[Case]:
+    cases = []
+    biggest = await _scalar(db, "SELECT id FROM races ORDER BY results_count DESC LIMIT 1")
+    median = await _scalar(
+        db, "SELECT id FROM races WHERE results_count > 0 ORDER BY results_count "
+            "LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM races WHERE results_count > 0)")
+    for label, race_id in (("biggest", biggest), ("median", median)):
+        if race_id is None:
+            continue
+        total = await _scalar(db, "SELECT results_count FROM races WHERE id = ?", (race_id,))
+        last_page = max(0, (total - 1) // PROTOCOL_PAGE_SIZE * PROTOCOL_PAGE_SIZE)
+        offsets = {"first": 0, "25%": total // 4, "50%": total // 2, "90%": total * 9 // 10, "last": last_page}
+        for name, offset in offsets.items():
+            offset = offset // PROTOCOL_PAGE_SIZE * PROTOCOL_PAGE_SIZE
+            cases.append((
+                f"race_results[{label}:{total}@{name}]",
+                lambda r=race_id, o=offset: db.get_race_results(r, limit=PROTOCOL_PAGE_SIZE, offset=o),
+            ))
+    return cases
+
+
+async def search_cases(db: Database) -> List[Case]:
+    common = await _scalar(db, "SELECT last_name FROM runners GROUP BY last_name ORDER BY COUNT(*) DESC LIMIT 1")
+    rare = await _scalar(db, "SELECT last_name FROM runners GROUP BY last_name ORDER BY COUNT(*), last_name LIMIT 1")
+    queries = {
+        "common_last_name": common or "Иванов",
+        "rare_last_name": rare or "Карпин",
+        "first_name": "Алексей",
+        "substring": "ов",
+        "no_match": "Йцукенгшщ",
+    }
+    return [(f"search_results_by_name[{label}]",
+             lambda q=query: db.search_results_by_name(q, limit=15))
+            for label, query in queries.items()]
+
+
+async def personal_bests_cases(db: Database) -> List[Case]:
+    counts = "SELECT runner_id, COUNT(*) AS cnt FROM results GROUP BY runner_id"
+    runners = {
+        "most_results": await _scalar(db, f"{counts} ORDER BY cnt DESC LIMIT 1"),
+        "median": await _scalar(db, f"{counts} ORDER BY cnt LIMIT 1 OFFSET "
+                                    f"(SELECT COUNT(DISTINCT runner_id) / 2 FROM results)"),
+        "one_result": await _scalar(db, f"{counts} HAVING cnt = 1 LIMIT 1"),
+    }
+    return [(f"personal_bests[{label}]", lambda r=runner_id: db.get_runner_personal_bests(r))
+            for label, runner_id in runners.items() if runner_id is not None]
+
+
+def analytics_cases(db: Database) -> List[Case]:
+    cases = [
+        ("developer_analytics[overview:snapshot]", lambda: db.get_developer_analytics("overview")),
+        ("developer_analytics[overview:refresh]", lambda: db.get_developer_analytics("overview", refresh=True)),
+    ]
+    for section in ANALYTICS_SECTIONS:
+        cases.append((f"developer_analytics[{section}]", lambda s=section: db.get_developer_analytics(s)))
+    return cases
+
+
+async def run(path: str, repeats: int, warmup: int, only: str = None) -> Dict[str, Dict]:
+    db = Database()
+    await db.connect(path)
+    # Журнал медленных запросов с EXPLAIN только мешает замерам
+    query_stats.slow_ms = float("inf")
+    try:
+        cases: List[Case] = []
+        cases += races_filtered_cases(db)
+        cases += await race_results_cases(db)
+        cases += await search_cases(db)
+        cases += await personal_bests_cases(db)
+        cases += analytics_cases(db)
+        if only:
+            pattern = re.compile(only)
+            cases = [c for c in cases if pattern.search(c[0])]
+
+        results = {}
+        started = time.perf_counter()
+        for i, (name, call) in enumerate(cases, 1):
+            results[name] = await measure_async(call, repeats=repeats, warmup=warmup)
+            if i % 50 == 0:
+                print(f"   {i}/{len(cases)} случаев, {time.perf_counter() - started:.0f} с")
+        return results
+    finally:
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк запросов Database на синтетической базе")
+    add_size_arguments(parser)
+    parser.add_argument("--db", help="Готовая база вместо синтетической (например, копия seido.db)")
+    parser.add_argument("--repeats", type=int, default=5, help="Замеров на случай")
+    parser.add_argument("--warmup", type=int, default=1, help="Прогонов до замеров")
+    parser.add_argument("--only", help="Регулярное выражение по имени случая")
+    parser.add_argument("--json", help="Путь отчёта (по умолчанию bench/reports/db-<коммит>.json)")
+    parser.add_argument("--quiet", action="store_true", help="Не печатать таблицу случаев")
+    args = parser.parse_args()
+
+    runners, races, results = size_from_args(args)
+    path = args.db or generate(runners, races, results, seed=args.seed)
+    print(f"⏱ Бенчмарк: {path}")
+    cases = asyncio.run(run(path, args.repeats, args.warmup, args.only))
+
+    params = {"db": os.path.basename(path), "repeats": args.repeats, "warmup": args.warmup, "only": args.only}
+    if not args.db:
+        params.update({"runners": runners, "races": races, "results": results, "seed": args.seed})
+    report_path = args.json or default_report_path("db")
+    write_report(report_path, "db", params, cases)
+    if not args.quiet:
+        print_cases(cases, "📊 Медиана / p95, мс:")
+    slowest = sorted(cases.items(), key=lambda kv: -kv[1]["median_ms"])[:5]
+    print("\n🐢 Самые медленные:")
+    for name, stats in slowest:
+        print(f"   {stats['median_ms']:9.2f} мс  {name}")
+    print(f"\n📁 {report_path}")
+
+
+if __name__ == "__main__":
+    main()
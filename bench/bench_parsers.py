@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Seido — бенчмарк и регрессионная проверка парсеров забегов на сохранённых страницах
+Каждый парсер (RaceParser) прогоняется через parse_upcoming без сети: запросы к сайтам
+перенаправляются на локальный aiohttp-сервер, который отдаёт файлы из
+bench/fixtures/parsers/<источник>/. Для каждого источника замеряются время
+(всего / HTTP / разбор), память (tracemalloc: пик и выделено за прогон) и результат
+сравнивается с expected.json — нормализованными забегами, которые парсер должен вернуть.
+
+fixture.json источника:
+  {"parser": "parsers.ironstar.IronStarParser", "today": "2026-01-10",
+   "requests": [{"method": "GET", "url": "https://iron-star.com/event/", "file": "event.html",
+                 "content_type": "text/html; charset=utf-8"}]}
+today — «сегодняшняя» дата прогона (is_future_race), чтобы результат не зависел от дня запуска.
+Запрос с телом (POST к API) задаётся полем "json" и сопоставляется вместе с телом: страницы
+одного адреса (Skip 0, 100, …) — разные файлы, запрос с другим телом — 404.
+
+Запуск:
+  python bench/bench_parsers.py
+  python bench/bench_parsers.py --only ironstar,russiarunning --repeats 50
+  python bench/bench_parsers.py --update      # парсер изменился намеренно — переписать expected.json
+  python bench/bench_parsers.py --record      # обновить страницы с живых сайтов (нужна сеть)
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Клиент RussiaRunning (parsers/rr_api.py): страницы — как в фикстуре (Take 100),
+# без паузы между запросами — ограничение частоты нужно живому API, не локальному серверу
+os.environ["RR_PAGE_SIZE"] = "100"
+os.environ["RR_RATE"] = "0"
+
+from bench.report import BENCH_DIR, default_report_path, summarize, write_report
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures", "parsers")
+EXPECTED = "expected.json"
+
+
+def load_fixtures(only: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """{источник: fixture.json + dir} для папок bench/fixtures/parsers/*"""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        path = os.path.join(FIXTURES_DIR, name, "fixture.json")
+        if not os.path.exists(path) or (only and name not in only):
+            continue
+        with open(path, encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixture["dir"] = os.path.dirname(path)
+        fixtures[name] = fixture
+    return fixtures
+
+
+def parser_class(fixture: Dict):
+    module, _, name = fixture["parser"].rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+# ============================================
+# ЛОКАЛЬНЫЙ СЕРВЕР И ПОДМЕНА СЕССИИ
+# ============================================
+
+def _route_key(method: str, url: str) -> Tuple[str, str, str]:
+    parts = urlsplit(url)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return method.upper(), parts.netloc.lower(), path
+
+
+def _body_key(payload: Any) -> str:
+    """Тело запроса для сопоставления: JSON без учёта порядка ключей, пустое — """""
+    return "" if payload is None else json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+
+class FixtureServer:
+    """aiohttp-сервер: /<хост>/<путь> и тело → файл фикстуры; запросы без фикстуры — 404 и в unmatched"""
+
+    def __init__(self, fixtures: Dict[str, Dict]):
+        self.routes: Dict[Tuple[str, str, str, str], Tuple[str, str]] = {}
+        for fixture in fixtures.values():
+            for req in fixture["requests"]:
+                self.routes[(*_route_key(req["method"], req["url"]), _body_key(req.get("json")))] = (
+                    os.path.join(fixture["dir"], req["file"]),
+                    req.get("content_type", "text/html; charset=utf-8"),
+                )
+        self.unmatched: List[str] = []
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+        self._bodies: Dict[str, bytes] = {}
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        host, _, path = request.path_qs.lstrip("/").partition("/")
+        raw = await request.read()
+        try:
+            body_key = _body_key(json.loads(raw)) if raw else ""
+        except ValueError:
+            body_key = raw.decode("utf-8", "replace")
+        route = self.routes.get((request.method, host, "/" + path, body_key))
+        if route is None:
+            self.unmatched.append(f"{request.method} https://{host}/{path}" + (f" {body_key}" if body_key else ""))
+            return web.Response(status=404)
+        file_path, content_type = route
+        body = self._bodies.get(file_path)
+        if body is None:
+            with open(file_path, "rb") as f:
+                body = self._bodies[file_path] = f.read()
+        return web.Response(body=body, headers={"Content-Type": content_type})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class _TimedResponse:
+    """Контекст-менеджер ответа: тело читается сразу, время до конца чтения — HTTP"""
+
+    def __init__(self, session: "ReplaySession", request_cm):
+        self._session = session
+        self._request_cm = request_cm
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        started = time.perf_counter()
+        response = await self._request_cm.__aenter__()
+        await response.read()
+        self._session.http_seconds += time.perf_counter() - started
+        self._session.requests += 1
+        return response
+
+    async def __aexit__(self, *exc) -> None:
+        await self._request_cm.__aexit__(*exc)
+
+
+class ReplaySession:
+    """Вместо aiohttp.ClientSession парсера: https://host/path → <сервер>/host/path"""
+
+    def __init__(self, base_url: str):
+        self._session = aiohttp.ClientSession()
+        self._base_url = base_url
+        self.http_seconds = 0.0
+        self.requests = 0
+
+    def _rewrite(self, url: str) -> str:
+        _, host, path = _route_key("GET", str(url))
+        return f"{self._base_url}/{host}{path}"
+
+    def request(self, method: str, url: str, **kwargs) -> _TimedResponse:
+        return _TimedResponse(self, self._session.request(method, self._rewrite(url), **kwargs))
+
+    def get(self, url: str, **kwargs) -> _TimedResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _TimedResponse:
+        return self.request("POST", url, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+@contextmanager
+def frozen_today(day: date, modules: List[Any]) -> Iterator[None]:
+    """date.today() в модулях парсеров возвращает day (is_future_race, DateFrom запроса)"""
+
+    class _DateType(type):
+        # isinstance(настоящая дата, date) в модуле парсера должен остаться True
+        def __instancecheck__(cls, obj):
+            return isinstance(obj, date)
+
+    class FrozenDate(date, metaclass=_DateType):
+        @classmethod
+        def today(cls):
+            return cls(day.year, day.month, day.day)
+
+    patched = [m for m in modules if getattr(m, "date", None) is date]
+    for module in patched:
+        module.date = FrozenDate
+    try:
+        yield
+    finally:
+        for module in patched:
+            module.date = date
+
+
+# ============================================
+# ПРОГОН ИСТОЧНИКА
+# ============================================
+
+def _canonical(races: List[Dict]) -> List[Dict]:
+    # Как лежит в expected.json (даты и т. п. — строками)
+    return json.loads(json.dumps(races, ensure_ascii=False, default=str))
+
+
+def diff_races(expected: List[Dict], actual: List[Dict], limit: int = 5) -> List[str]:
+    """Различия по забегам (ключ — website_url + name + date)"""
+    def key(r: Dict) -> str:
+        return f"{r.get('name')} | {r.get('date')} | {r.get('website_url')}"
+
+    lines = []
+    if len(expected) != len(actual):
+        lines.append(f"забегов: ожидалось {len(expected)}, получено {len(actual)}")
+    exp, act = {key(r): r for r in expected}, {key(r): r for r in actual}
+    for k in [k for k in exp if k not in act][:limit]:
+        lines.append(f"нет: {k}")
+    for k in [k for k in act if k not in exp][:limit]:
+        lines.append(f"лишний: {k}")
+    for k in [k for k in exp if k in act and exp[k] != act[k]][:limit]:
+        fields = [f for f in set(exp[k]) | set(act[k]) if exp[k].get(f) != act[k].get(f)]
+        lines.append(f"изменён {k}: " + ", ".join(
+            f"{f}: {exp[k].get(f)!r} → {act[k].get(f)!r}" for f in sorted(fields)))
+    if not lines and expected != actual:
+        lines.append("другой порядок забегов")
+    return lines
+
+
+async def run_source(name: str, fixture: Dict, base_url: str, repeats: int, warmup: int) -> Dict[str, Any]:
+    cls = parser_class(fixture)
+    modules = [sys.modules["parsers.base"], sys.modules[cls.__module__]]
+    parser = cls()
+    session = parser.session = ReplaySession(base_url)
+    total_ms, http_ms, races = [], [], []
+    try:
+        with frozen_today(date.fromisoformat(fixture["today"]), modules):
+            for i in range(warmup + repeats):
+                session.http_seconds = 0.0
+                started = time.perf_counter()
+                races = await parser.parse_upcoming()
+                if i >= warmup:
+                    total_ms.append((time.perf_counter() - started) * 1000)
+                    http_ms.append(session.http_seconds * 1000)
+
+            # Память — отдельным прогоном: под tracemalloc всё в разы медленнее
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            await parser.parse_upcoming()
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        await parser.close()
+
+    allocated = sum(s.size_diff for s in after.compare_to(before, "filename") if s.size_diff > 0)
+    stats = summarize(total_ms)
+    stats.update({
+        "http_ms": round(statistics.median(http_ms), 3),
+        "parse_ms": round(statistics.median(t - h for t, h in zip(total_ms, http_ms)), 3),
+        "requests": session.requests // (warmup + repeats + 1),
+        "races": len(races),
+        "peak_kb": round(peak / 1024, 1),
+        "allocated_kb": round(allocated / 1024, 1),
+    })
+    return {"stats": stats, "races": _canonical(races)}
+
+
+def check_expected(name: str, fixture: Dict, races: List[Dict], update: bool) -> List[str]:
+    path = os.path.join(fixture["dir"], EXPECTED)
+    if update or not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(races, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        return []
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)
+    return diff_races(expected, races)
+
+
+async def run(fixtures: Dict[str, Dict], repeats: int, warmup: int, update: bool) -> Tuple[Dict, Dict]:
+    server = FixtureServer(fixtures)
+    base_url = await server.start()
+    cases, failures = {}, {}
+    try:
+        for name, fixture in fixtures.items():
+            server.unmatched.clear()
+            result = await run_source(name, fixture, base_url, repeats, warmup)
+            problems = [f"запрос без фикстуры: {u}" for u in sorted(set(server.unmatched))]
+            problems += check_expected(name, fixture, result["races"], update)
+            result["stats"]["ok"] = not problems
+            cases[name] = result["stats"]
+            if problems:
+                failures[name] = problems
+    finally:
+        await server.stop()
+    return cases, failures
+
+
+# ============================================
+# ЗАПИСЬ ФИКСТУР С ЖИВЫХ САЙТОВ
+# ============================================
+
+async def record(fixtures: Dict[str, Dict]) -> None:
+    """Скачать страницы из fixture.json заново (заголовки — как у RaceParser.get_session)"""
+    today = date.today().isoformat()
+    for name, fixture in fixtures.items():
+        if not fixture["requests"]:
+            continue
+        parser = parser_class(fixture)()
+        session = await parser.get_session()
+        try:
+            for req in fixture["requests"]:
+                payload = req.get("json")
+                if isinstance(payload, dict) and "DateFrom" in payload:
+                    payload = {**payload, "DateFrom": today}
+                async with session.request(req["method"], req["url"], json=payload) as response:
+                    body = await response.read()
+                    print(f"   {name}: {req['method']} {req['url']} → {response.status}, {len(body)} байт")
+                    if response.status != 200:
+                        continue
+                with open(os.path.join(fixture["dir"], req["file"]), "wb") as f:
+                    f.write(body)
+        finally:
+            await parser.close()
+        fixture_path = os.path.join(fixture["dir"], "fixture.json")
+        saved = {k: v for k, v in fixture.items() if k != "dir"}
+        saved["today"] = today
+        for req in saved["requests"]:
+            if isinstance(req.get("json"), dict) and "DateFrom" in req["json"]:
+                req["json"]["DateFrom"] = today
+        with open(fixture_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+    print("📝 Страницы обновлены — проверьте разбор и перепишите expected.json: --update")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Парсеры забегов на сохранённых страницах: время, память, результат")
+    parser.add_argument("--only", help="Источники через запятую (имена папок bench/fixtures/parsers)")
+    parser.add_argument("--repeats", type=int, default=20, help="Замеров на источник")
+    parser.add_argument("--warmup", type=int, default=2, help="Прогонов до замеров")
+    parser.add_argument("--update", action="store_true", help="Переписать expected.json текущим результатом")
+    parser.add_argument("--record", action="store_true", help="Скачать страницы с живых сайтов (нужна сеть)")
+    parser.add_argument("--json", help="Путь отчёта (по умолчанию bench/reports/parsers-<коммит>.json)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.only.split(",") if args.only else None)
+    if not fixtures:
+        raise SystemExit(f"❌ Нет фикстур в {FIXTURES_DIR}")
+    if args.record:
+        asyncio.run(record(fixtures))
+        return
+
+    cases, failures = asyncio.run(run(fixtures, args.repeats, args.warmup, args.update))
+    report_path = args.json or default_report_path("parsers")
+    write_report(report_path, "parsers", {"repeats": args.repeats, "warmup": args.warmup,
+                                          "sources": sorted(fixtures)}, cases)
+
+    width = max(len(n) for n in cases)
+    print(f"\n📊 {'источник':<{width}}  {'забегов':>7}  {'медиана':>8}  {'HTTP':>7}  {'разбор':>7}  "
+          f"{'пик КБ':>8}  {'выдел. КБ':>9}")
+    for name, s in cases.items():
+        print(f"   {name:<{width}}  {s['races']:>7}  {s['median_ms']:>8.2f}  {s['http_ms']:>7.2f}  "
+              f"{s['parse_ms']:>7.2f}  {s['peak_kb']:>8.1f}  {s['allocated_kb']:>9.1f}  {'✅' if s['ok'] else '❌'}")
+    for name, problems in failures.items():
+        print(f"\n❌ {name}:")
+        for line in problems:
+            print(f"   {line}")
+    if args.update:
+        print("\n📝 expected.json переписаны")
+    print(f"\n📁 {report_path}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
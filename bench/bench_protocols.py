@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Seido — бенчмарк импорта протоколов: разбор → нормализация → запись в БД
+Синтетический протокол одного забега (русские ФИО, время, категории, пустые и
+служебные строки, сошедшие) в трёх видах:
+  - raw  — готовые словари строк, как у HTML-парсеров (ProtocolImporter.import_from_raw_data);
+  - xlsx — лист «Протокол» через openpyxl (import_protocol → ExcelProtocolParser);
+  - pdf  — таблица с линейками на каждой странице (import_protocol → PDFProtocolParser).
+Каждый прогон — отдельный процесс с чистой временной БД (или копией --db): так пиковый
+RSS относится только к нему. Время по этапам берётся из ProtocolImporter.stage_seconds.
+Файлы протоколов кэшируются в bench/.data/protocols/.
+
+PDF пишется вручную (reportlab и fpdf не в зависимостях): стандартный Courier с кодировкой
+cp1251 через /Differences — глифов кириллицы в нём нет, но pdfplumber достаёт текст как
+из настоящего протокола.
+
+Запуск:
+  python bench/bench_protocols.py
+  python bench/bench_protocols.py --rows 1000 --formats raw,xlsx --repeats 3
+  python bench/bench_protocols.py --db bench/.data/synthetic_2000_400_40000_s1.db
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.report import DATA_DIR, default_report_path, summarize, write_report
+from bench.synthetic_db import CITIES, FEMALE_NAMES, LAST_NAMES, MALE_NAMES, MIDDLE_NAMES, _female, _hms
+
+PROTOCOL_DIR = os.path.join(DATA_DIR, "protocols")
+DEFAULT_ROWS = (1_000, 10_000, 50_000)
+FORMATS = ("raw", "xlsx", "pdf")
+STAGES = ("parse", "normalize", "runners", "results")
+RACE_NAME = "Синтетический забег"
+RACE_DATE = "2025-09-14"
+DISTANCE = "10 км"
+
+# Колонки: заголовок в PDF (парсер сам приводит к нижнему регистру и «_»), ключ в XLSX и raw,
+# ширина в символах для PDF
+COLUMNS = (
+    ("Место", "место", 6),
+    ("ФИО", "фио", 34),
+    ("Время", "время", 8),
+    ("Год рождения", "год_рождения", 12),
+    ("Пол", "пол", 3),
+    ("Город", "город", 16),
+    ("Клуб", "клуб", 18),
+    ("Возрастная категория", "возрастная_категория", 20),
+    ("Место в категории", "место_в_категории", 17),
+)
+CLUBS = ("", "", "", "Бегущий город", "RunLab", "Лига бега", "I Love Running", "Сокольники", "Спартак")
+# Строк протокола на страницу PDF (A4 альбомная, кегль 7)
+PDF_ROWS_PER_PAGE = 40
+
+
+def make_rows(count: int, seed: int = 1) -> List[List[str]]:
+    """Строки протокола по порядку финиша; около 2% — сошедшие, изредка — служебные строки"""
+    rng = random.Random(seed)
+    rows, category_places = [], {}
+    finish = rng.randint(1850, 2000)
+    for place in range(1, count + 1):
+        if place % 997 == 0:
+            # Заголовок группы посреди таблицы — нормализация его отбрасывает
+            rows.append(["", f"Абсолютный зачёт, {DISTANCE}", "", "", "", "", "", "", ""])
+            continue
+        male = rng.random() < 0.6
+        last = rng.choice(LAST_NAMES)
+        if male:
+            name = f"{last} {rng.choice(MALE_NAMES)}"
+            if rng.random() < 0.3:
+                name += f" {rng.choice(MIDDLE_NAMES)}"
+        else:
+            name = f"{_female(last)} {rng.choice(FEMALE_NAMES)}"
+        if rng.random() < 0.2:
+            name = name.upper()
+        year = rng.randint(1955, 2008)
+        birth = str(year) if rng.random() < 0.85 else f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{year}"
+        age = int(RACE_DATE[:4]) - year
+        low = min(70, max(18, age // 10 * 10))
+        category = f"{'М' if male else 'Ж'}{low}-{low + 9}" if low < 70 else f"{'М' if male else 'Ж'}70+"
+        finish += rng.randint(0, 4)
+        if rng.random() < 0.02:
+            time_cell, overall, in_category = "DNF", "", ""
+        else:
+            category_places[category] = category_places.get(category, 0) + 1
+            time_cell, overall, in_category = _hms(finish), str(place), str(category_places[category])
+        rows.append([overall, name, time_cell, birth, "М" if male else "Ж", rng.choice(CITIES),
+                     rng.choice(CLUBS), category, in_category])
+    return rows
+
+
+def raw_rows(rows: List[List[str]]) -> List[Dict[str, str]]:
+    keys = [key for _, key, _ in COLUMNS]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def write_xlsx(path: str, rows: List[List[str]]) -> None:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Протокол")
+    ws.append([key for _, key, _ in COLUMNS])
+    for row in rows:
+        ws.append([int(cell) if cell.isdigit() else cell for cell in row])
+    wb.save(path)
+
+
+def _pdf_text(value: str) -> bytes:
+    return value.encode("cp1251").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def write_pdf(path: str, rows: List[List[str]], font_size: int = 7) -> None:
+    """Минимальный PDF: на каждой странице таблица с сеткой линий и строкой заголовков"""
+    width, height, margin = 842, 595, 24
+    row_height = font_size * 1.9
+    xs = [margin]
+    for _, _, chars in COLUMNS:
+        xs.append(xs[-1] + chars * font_size * 0.6 + 6)
+    header = [title for title, _, _ in COLUMNS]
+
+    streams = []
+    for start in range(0, len(rows), PDF_ROWS_PER_PAGE):
+        table = [header] + rows[start:start + PDF_ROWS_PER_PAGE]
+        top, bottom = height - margin, height - margin - len(table) * row_height
+        ops = [b"0.5 w"]
+        for i in range(len(table) + 1):
+            y = top - i * row_height
+            ops.append(b"%.2f %.2f m %.2f %.2f l S" % (xs[0], y, xs[-1], y))
+        for x in xs:
+            ops.append(b"%.2f %.2f m %.2f %.2f l S" % (x, top, x, bottom))
+        ops.append(b"BT /F1 %d Tf" % font_size)
+        for i, row in enumerate(table):
+            y = top - (i + 1) * row_height + font_size * 0.6
+            for x, cell in zip(xs, row):
+                if cell:
+                    ops.append(b"1 0 0 1 %.2f %.2f Tm (%s) Tj" % (x + 3, y, _pdf_text(cell)))
+        ops.append(b"ET")
+        streams.append(zlib.compress(b"\n".join(ops)))
+
+    differences = []
+    for code in range(128, 256):
+        try:
+            differences.append(b"%d /uni%04X" % (code, ord(bytes([code]).decode("cp1251"))))
+        except UnicodeDecodeError:
+            continue
+    first_page = 4
+    kids = b" ".join(b"%d 0 R" % (first_page + 2 * i) for i in range(len(streams)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(streams)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /FirstChar 32 /LastChar 255 /Widths [%s] "
+        b"/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [%s] >> >>"
+        % (b" ".join([b"600"] * 224), b" ".join(differences)),
+    ]
+    for i, stream in enumerate(streams):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % (width, height, first_page + 2 * i + 1))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def protocol_file(fmt: str, count: int, seed: int) -> str:
+    """Файл протокола из кэша bench/.data/protocols/ (создаётся при первом запросе)"""
+    path = os.path.join(PROTOCOL_DIR, f"protocol_{count}_s{seed}.{fmt}")
+    if not os.path.exists(path):
+        os.makedirs(PROTOCOL_DIR, exist_ok=True)
+        started = time.perf_counter()
+        tmp = path + ".tmp"
+        (write_xlsx if fmt == "xlsx" else write_pdf)(tmp, make_rows(count, seed))
+        os.replace(tmp, path)
+        print(f"   создан {os.path.basename(path)} ({os.path.getsize(path) / 1024 / 1024:.1f} МБ) "
+              f"за {time.perf_counter() - started:.1f} с")
+    return path
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в Linux — КБ, в macOS — байты
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def _import(fmt: str, count: int, seed: int, db_path: str) -> Dict:
+    from bot.db import db
+    from bot.scripts.parse_protocol import ProtocolImporter
+    from query_stats import query_stats
+
+    # Журнал импорта (каждые 100 строк) и медленных запросов только мешают замеру
+    logging.disable(logging.INFO)
+    query_stats.slow_ms = float("inf")
+    raw = raw_rows(make_rows(count, seed)) if fmt == "raw" else None
+    source = protocol_file(fmt, count, seed) if fmt != "raw" else None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await db.connect(db_path)
+    importer = ProtocolImporter()
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if raw is not None:
+                await importer.import_from_raw_data(raw, RACE_NAME, RACE_DATE, distance=DISTANCE)
+            else:
+                await importer.import_protocol(source, RACE_NAME, RACE_DATE, distance=DISTANCE)
+        total = time.perf_counter() - started
+        async with db.db.execute("SELECT COUNT(*) FROM results") as cursor:
+            stored = (await cursor.fetchone())[0]
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await db.disconnect()
+    return {
+        "total_s": total,
+        "stages_s": dict(importer.stage_seconds),
+        "stats": dict(importer.stats),
+        "results_in_db": stored,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_once(fmt: str, count: int, seed: int, base_db: Optional[str]) -> Dict:
+    """Один прогон в дочернем процессе: временная БД → импорт → замеры"""
+    workdir = tempfile.mkdtemp(prefix="seido-bench-")
+    try:
+        db_path = os.path.join(workdir, "import.db")
+        if base_db:
+            shutil.copyfile(base_db, db_path)
+        return asyncio.run(_import(fmt, count, seed, db_path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def build_cases(fmt: str, count: int, runs: List[Dict]) -> Dict[str, Dict]:
+    """Случаи отчёта: весь импорт (+ строк/с, RSS, доли этапов) и каждый этап отдельно"""
+    name = f"{fmt}:{count}"
+    case = summarize([r["total_s"] * 1000 for r in runs])
+    median_s = case["median_ms"] / 1000
+    case.update({
+        "rows": count,
+        "rows_per_sec": round(count / median_s, 1) if median_s else None,
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+        "rss_growth_mb": round(max(r["peak_rss_mb"] - r["rss_before_mb"] for r in runs), 1),
+        "results_in_db": runs[-1]["results_in_db"],
+        "importer": runs[-1]["stats"],
+    })
+    cases = {name: case}
+    for stage in STAGES:
+        cases[f"{name}/{stage}"] = summarize([r["stages_s"][stage] * 1000 for r in runs])
+    return cases
+
+
+def print_summary(cases: Dict[str, Dict]) -> None:
+    print(f"\n📊 {'протокол':<12} {'всего, с':>9} {'строк/с':>9} {'RSS, МБ':>8} {'+RSS':>6}  "
+          + "  ".join(f"{stage:>9}" for stage in STAGES))
+    for name, case in cases.items():
+        if "/" in name:
+            continue
+        total = case["median_ms"] or 1
+        shares = "  ".join(f"{cases[f'{name}/{stage}']['median_ms'] / total:>9.0%}" for stage in STAGES)
+        print(f"   {name:<12} {case['median_ms'] / 1000:>9.2f} {case['rows_per_sec'] or 0:>9.0f} "
+              f"{case['peak_rss_mb']:>8.0f} {case['rss_growth_mb']:>6.0f}  {shares}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк импорта протоколов (PDF, XLSX, готовые строки)")
+    parser.add_argument("--rows", default=",".join(str(n) for n in DEFAULT_ROWS),
+                        help="Размеры протоколов через запятую (по умолчанию 1000,10000,50000)")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="raw,xlsx,pdf")
+    parser.add_argument("--repeats", type=int, default=1, help="Прогонов на случай (каждый — новый процесс и БД)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="Импортировать в копию этой базы вместо пустой")
+    parser.add_argument("--json", help="Путь отчёта (по умолчанию bench/reports/protocols-<коммит>.json)")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.rows.split(",") if n.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"неизвестные форматы: {', '.join(sorted(unknown))}")
+
+    # Файлы готовятся заранее, чтобы их создание не попало в замеры
+    for fmt in formats:
+        if fmt != "raw":
+            for count in sizes:
+                protocol_file(fmt, count, args.seed)
+
+    cases = {}
+    context = multiprocessing.get_context("spawn")
+    for fmt in formats:
+        for count in sizes:
+            runs = []
+            for _ in range(args.repeats):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(pool.submit(run_once, fmt, count, args.seed, args.db).result())
+            cases.update(build_cases(fmt, count, runs))
+            case = cases[f"{fmt}:{count}"]
+            print(f"⏱ {fmt}:{count} — {case['median_ms'] / 1000:.2f} с, {case['rows_per_sec'] or 0:.0f} строк/с, "
+                  f"пик RSS {case['peak_rss_mb']:.0f} МБ, в БД {case['results_in_db']} результатов")
+
+    params = {"rows": sizes, "formats": formats, "repeats": args.repeats, "seed": args.seed,
+              "db": os.path.basename(args.db) if args.db else None}
+    report_path = args.json or default_report_path("protocols")
+    write_report(report_path, "protocols", params, cases)
+    print_summary(cases)
+    print(f"\n📁 {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Seido — сравнение двух отчётов бенчмарков (bench/reports/*.json)
+Показывает изменение медианы (или --metric) по каждому случаю; с --fail-over N
+код возврата 1, если хоть один случай замедлился больше чем на N %.
+
+Запуск:
+  python bench/compare.py bench/reports/db-1a2b3c4.json bench/reports/db-5d6e7f8.json
+  python bench/compare.py old.json new.json --metric p95_ms --fail-over 20
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.report import compare, load_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение двух отчётов бенчмарков")
+    parser.add_argument("base", help="Отчёт «до»")
+    parser.add_argument("new", help="Отчёт «после»")
+    parser.add_argument("--metric", default="median_ms",
+                        choices=("median_ms", "p95_ms", "mean_ms", "min_ms", "max_ms"))
+    parser.add_argument("--fail-over", type=float, help="Допустимое замедление, %%")
+    parser.add_argument("--min-ms", type=float, default=0.5,
+                        help="Случаи быстрее этого (в обоих отчётах) не считаются регрессией — шум")
+    args = parser.parse_args()
+
+    base, new = load_report(args.base), load_report(args.new)
+    if base.get("suite") != new.get("suite"):
+        print(f"⚠️ Разные наборы: {base.get('suite')} и {new.get('suite')}")
+    if base.get("params") != new.get("params"):
+        print(f"⚠️ Разные параметры прогона:\n   {base.get('params')}\n   {new.get('params')}")
+    print(f"📊 {base['meta'].get('commit')} → {new['meta'].get('commit')}, {args.metric}")
+
+    rows = compare(base, new, args.metric)
+    width = max((len(r["case"]) for r in rows), default=10)
+    regressions = []
+    for r in rows:
+        if r["base"] is None or r["new"] is None:
+            print(f"   {r['case']:<{width}}  {'—' if r['base'] is None else r['base']:>9}  "
+                  f"{'—' if r['new'] is None else r['new']:>9}")
+            continue
+        mark = ""
+        noise = max(r["base"], r["new"]) < args.min_ms
+        if args.fail_over is not None and r["delta_pct"] is not None \
+                and r["delta_pct"] > args.fail_over and not noise:
+            regressions.append(r)
+            mark = " ❌"
+        delta = f"{r['delta_pct']:+.1f}%" if r["delta_pct"] is not None else ""
+        print(f"   {r['case']:<{width}}  {r['base']:>9.2f}  {r['new']:>9.2f}  {delta:>8}{mark}")
+
+    if args.fail_over is not None:
+        print(f"\n{'❌' if regressions else '✅'} Замедлений больше {args.fail_over:g}%: {len(regressions)}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
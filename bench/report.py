@@ -0,0 +1,137 @@
+"""
+Seido — общие функции бенчмарков: замер, сводка по замерам, JSON-отчёт и сравнение
+Отчёт одного прогона:
+  {"suite": "db", "meta": {commit, python, sqlite, ...}, "params": {...},
+   "cases": {"имя случая": {"calls", "min_ms", "median_ms", "p95_ms", "mean_ms", "max_ms", ...}}}
+Два отчёта сравнивает bench/compare.py.
+"""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+BOT_DIR = os.path.join(PROJECT_ROOT, "bot")
+REPORTS_DIR = os.path.join(BENCH_DIR, "reports")
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+
+# Код бота импортируется как в самом боте: from db import db
+if BOT_DIR not in sys.path:
+    sys.path.insert(0, BOT_DIR)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Замеры одного случая (мс) → min / медиана / p95 / среднее / max"""
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "calls": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(p95, 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def measure_async(call: Callable[[], Awaitable[Any]], repeats: int = 5,
+                        warmup: int = 1) -> Dict[str, Any]:
+    """
+    Замерить корутину: warmup прогонов без учёта (кэш страниц SQLite), потом repeats замеров.
+    call — функция без аргументов, возвращающая новую корутину.
+    """
+    for _ in range(warmup):
+        await call()
+    samples, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    stats = summarize(samples)
+    size = _result_size(result)
+    if size is not None:
+        stats["rows"] = size
+    return stats
+
+
+def _result_size(result: Any) -> Optional[int]:
+    # get_races_filtered / get_race_results возвращают (строки, всего)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return None
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> Dict[str, Any]:
+    """Коммит и окружение — чтобы сравнивать отчёты с одной машины"""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def default_report_path(suite: str) -> str:
+    meta = environment()
+    name = f"{suite}-{meta['commit'] or 'nogit'}{'-dirty' if meta['dirty'] else ''}.json"
+    return os.path.join(REPORTS_DIR, name)
+
+
+def write_report(path: str, suite: str, params: Dict[str, Any], cases: Dict[str, Dict]) -> Dict:
+    report = {"suite": suite, "meta": environment(), "params": params, "cases": cases}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    return report
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: Dict, new: Dict, metric: str = "median_ms") -> List[Dict[str, Any]]:
+    """
+    Случаи обоих отчётов: {case, base, new, delta_pct}.
+    delta_pct > 0 — стало медленнее; случаи только из одного отчёта — с None.
+    """
+    rows = []
+    for case in sorted(set(base["cases"]) | set(new["cases"])):
+        old_value = base["cases"].get(case, {}).get(metric)
+        new_value = new["cases"].get(case, {}).get(metric)
+        delta = None
+        if old_value and new_value is not None:
+            delta = round((new_value - old_value) / old_value * 100, 1)
+        rows.append({"case": case, "base": old_value, "new": new_value, "delta_pct": delta})
+    return rows
+
+
+def print_cases(cases: Dict[str, Dict], title: str) -> None:
+    print(f"\n{title}")
+    width = max((len(c) for c in cases), default=10)
+    print(f"   {'случай':<{width}}  {'медиана':>9}  {'p95':>9}  {'строк':>6}")
+    for case, stats in cases.items():
+        print(f"   {case:<{width}}  {stats['median_ms']:>9.2f}  {stats['p95_ms']:>9.2f}  "
+              f"{stats.get('rows', ''):>6}")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Seido — синтетическая база для бенчмарков
+Схема создаётся настоящим Database.init_db (со всеми миграциями, триггерами и индексами),
+данные — детерминированно по seed: бегуны с русскими ФИО, забеги разных типов и
+организаторов в прошлом и будущем, протоколы с местами и временем (несколько массовых
+забегов — для глубоких страниц протокола), немного заявок «это я», подписок и отзывов.
+
+Пока идёт вставка, триггеры и индексы runners/races/results сняты; после неё они
+создаются заново, а счётчики, дневные сводки и рейтинги пересобираются методами Database.
+Готовый файл кэшируется в bench/.data/ по размеру и seed.
+
+Запуск:
+  python bench/synthetic_db.py --size small
+  python bench/synthetic_db.py --runners 100000 --races 20000 --results 2000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.report import DATA_DIR
+
+from db import Database
+from distances import age_group_for, distance_meters
+from query_stats import query_stats
+
+# (бегунов, забегов, результатов)
+SIZES = {
+    "small": (2_000, 400, 40_000),
+    "medium": (20_000, 4_000, 400_000),
+    "large": (100_000, 20_000, 2_000_000),
+}
+
+MALE_NAMES = ("Александр", "Алексей", "Андрей", "Антон", "Артём", "Владимир", "Дмитрий", "Евгений",
+              "Иван", "Игорь", "Кирилл", "Максим", "Михаил", "Никита", "Николай", "Олег", "Павел",
+              "Роман", "Сергей", "Юрий")
+FEMALE_NAMES = ("Александра", "Алина", "Анастасия", "Анна", "Виктория", "Дарья", "Екатерина", "Елена",
+                "Ирина", "Ксения", "Мария", "Наталья", "Ольга", "Полина", "Светлана", "Татьяна",
+                "Юлия", "Яна")
+MIDDLE_NAMES = ("Александрович", "Андреевич", "Дмитриевич", "Игоревич", "Сергеевич", "Владимирович")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+              "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров",
+              "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин",
+              "Захаров", "Зайцев", "Соловьёв", "Борисов", "Яковлев", "Григорьев", "Романов",
+              "Воробьёв", "Сергеев", "Кудрявцев", "Ковалевский", "Белинский", "Жуковский", "Рыбин",
+              "Карпин", "Гусев", "Титов", "Кузьмин", "Ершов", "Медведев", "Калинин")
+CITIES = ("Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск", "Нижний Новгород",
+          "Краснодар", "Сочи", "Тула", "Калининград", "Самара", "Пермь", "Уфа", "Ярославль",
+          "Владимир", "Суздаль", "Мурманск", "Иркутск", "Владивосток", "Ростов-на-Дону")
+PLACES = ("Парк Горького", "Лужники", "ВДНХ", "Набережная", "Центральный парк", "Стадион", "Кремль")
+# Организатор и его доля забегов (как в реальной базе, RussiaRunning — большинство)
+ORGANIZERS = (("RussiaRunning", 60), ("IronStar", 8), ("Wild Trail", 5), ("5верст", 5),
+              ("Беговое сообщество", 4), ("RHR", 4), ("Dream Trail", 3), ("TulaMarathon", 3),
+              ("Московский марафон", 3), ("S95", 2), ("Open Band", 2), ("", 1))
+# Тип забега, доля и дистанции (написание как в протоколах)
+RACE_TYPES = {
+    "шоссе": (80, ("5 км", "10 км", "21.1 км", "42.2 км", "3 км", "1 миля")),
+    "трейл": (8, ("15 км", "30 км", "50 км", "8 км")),
+    "триатлон": (4, ("1/4 IM", "1/2 IM", "Олимпийская")),
+    "кросс": (3, ("3 км", "5 км", "10 км")),
+    "ночной": (2, ("5 км", "10 км")),
+    "ультра": (1, ("50 км", "100 км")),
+    "зимний": (1, ("5 км", "10 км")),
+    "акватлон": (1, ("Спринт",)),
+}
+# Другие написания той же дистанции в протоколах
+SPELLINGS = {"5 км": ("5км", "5 km", "5000 м"), "10 км": ("10км", "10 km", "10000 м"),
+             "21.1 км": ("21,1 км", "Полумарафон", "21.0975"), "42.2 км": ("42,195 км", "Марафон")}
+# Длина нечисловых дистанций для расчёта времени, км
+OTHER_KM = {"1/4 IM": 30, "1/2 IM": 60, "Олимпийская": 45, "Спринт": 8}
+RACE_THEMES = ("Весенний забег", "Ночной забег", "Зелёный марафон", "Забег мира", "Белые ночи",
+               "Осенний полумарафон", "Трейл «Лесная тропа»", "Забег памяти", "Новогодний забег",
+               "Кросс нации", "Гонка героев", "Марафон «Северная столица»")
+
+CHUNK = 20_000
+
+
+def db_path_for(runners: int, races: int, results: int, seed: int) -> str:
+    return os.path.join(DATA_DIR, f"synthetic_{runners}_{races}_{results}_s{seed}.db")
+
+
+def _weighted(rng: random.Random, items) -> str:
+    names, weights = zip(*items)
+    return rng.choices(names, weights)[0]
+
+
+def _female(last_name: str) -> str:
+    if last_name.endswith("ский"):
+        return last_name[:-2] + "ая"
+    if last_name.endswith(("ов", "ев", "ёв", "ин")):
+        return last_name + "а"
+    return last_name
+
+
+def _timestamp(rng: random.Random, start: date, end: date) -> str:
+    days = max(0, (end - start).days)
+    moment = datetime.combine(start, datetime.min.time()) + timedelta(
+        days=rng.randint(0, days), seconds=rng.randint(0, 86399))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _hms(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _make_runners(rng: random.Random, count: int, today: date) -> Tuple[List[tuple], List[str], List[float]]:
+    """Returns: строки runners, пол и «сила» (секунд на км) каждого бегуна по id-1"""
+    rows, genders, pace = [], [], []
+    for i in range(count):
+        gender = "M" if rng.random() < 0.6 else "F"
+        last = rng.choice(LAST_NAMES)
+        if gender == "F":
+            first, last = rng.choice(FEMALE_NAMES), _female(last)
+        else:
+            first = rng.choice(MALE_NAMES)
+        middle = rng.choice(MIDDLE_NAMES) if gender == "M" and rng.random() < 0.3 else None
+        birth = f"{rng.randint(1950, 2008)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" \
+            if rng.random() < 0.8 else None
+        telegram_id = 100_000_000 + i if rng.random() < 0.05 else None
+        rows.append((telegram_id, first, last, middle, birth, gender, rng.choice(CITIES),
+                     _timestamp(rng, today - timedelta(days=730), today)))
+        genders.append(gender)
+        pace.append(max(170.0, rng.gauss(330 if gender == "M" else 370, 55)))
+    return rows, genders, pace
+
+
+def _make_races(rng: random.Random, count: int, today: date) -> List[Dict]:
+    races = []
+    for i in range(count):
+        race_type = _weighted(rng, [(t, w) for t, (w, _) in RACE_TYPES.items()])
+        catalog = RACE_TYPES[race_type][1]
+        distances = rng.sample(catalog, rng.randint(1, min(3, len(catalog))))
+        city = rng.choice(CITIES)
+        # ~80% забегов в прошлом (6 лет), остальные — на год вперёд
+        race_date = today + timedelta(days=rng.randint(-6 * 365, -1) if rng.random() < 0.8
+                                      else rng.randint(0, 365))
+        organizer = _weighted(rng, ORGANIZERS)
+        location = f"{city}, {rng.choice(PLACES)}" if rng.random() < 0.5 else city
+        races.append({
+            "id": i + 1,
+            "name": f"{rng.choice(RACE_THEMES)} {city} {race_date.year}",
+            "date": race_date.isoformat(),
+            "location": location,
+            "organizer": organizer,
+            "race_type": race_type,
+            "distances": distances,
+            "website_url": f"https://example.org/race/{i + 1}",
+            "protocol_url": f"https://example.org/race/{i + 1}/results" if race_date < today else "",
+            "source": _weighted(rng, (("russiarunning", 60), ("ironstar", 10), ("protocol", 20), ("manual", 10))),
+            "created_at": _timestamp(rng, today - timedelta(days=730), today),
+        })
+    return races
+
+
+def _protocol_sizes(rng: random.Random, races: List[Dict], total: int, runners: int, today: date) -> Dict[int, int]:
+    """Сколько результатов у каждого прошедшего забега: лог-нормально, несколько массовых"""
+    past = [r["id"] for r in races if r["date"] < today.isoformat()]
+    with_results = [rid for rid in past if rng.random() < 0.7] or past[:1]
+    weights = {rid: rng.lognormvariate(0, 1.2) for rid in with_results}
+    # 1% забегов — массовые (городские марафоны), для глубоких страниц протокола
+    for rid in rng.sample(with_results, max(1, len(with_results) // 100)):
+        weights[rid] *= 15
+    scale = total / sum(weights.values())
+    cap = max(1, int(runners * 0.9))
+    return {rid: max(1, min(cap, int(w * scale))) for rid, w in weights.items()}
+
+
+def _results_rows(rng: random.Random, races: List[Dict], sizes: Dict[int, int], runner_count: int,
+                  genders: List[str], pace: List[float], births: List[Optional[str]]) -> Iterator[tuple]:
+    by_id = {r["id"]: r for r in races}
+    for race_id, size in sizes.items():
+        race = by_id[race_id]
+        created_at = (date.fromisoformat(race["date"]) + timedelta(days=rng.randint(1, 5))).isoformat() + " 12:00:00"
+        runner_ids = rng.sample(range(1, runner_count + 1), size)
+        by_distance: Dict[str, List[int]] = {}
+        for runner_id in runner_ids:
+            by_distance.setdefault(rng.choice(race["distances"]), []).append(runner_id)
+        for distance, ids in by_distance.items():
+            km = (distance_meters(distance) or 0) / 1000 or OTHER_KM.get(distance, 10)
+            timed = []
+            for runner_id in ids:
+                if rng.random() < 0.04:
+                    timed.append((None, runner_id))  # сошёл
+                else:
+                    timed.append((int(km * pace[runner_id - 1] * rng.uniform(0.93, 1.12)), runner_id))
+            timed.sort(key=lambda t: (t[0] is None, t[0] or 0))
+            gender_places = {"M": 0, "F": 0}
+            for place, (seconds, runner_id) in enumerate(timed, 1):
+                if distance in SPELLINGS and rng.random() < 0.15:
+                    spelling = rng.choice(SPELLINGS[distance])
+                else:
+                    spelling = distance
+                gender = genders[runner_id - 1]
+                if seconds is None:
+                    overall = gender_place = finish_time = pace_text = pace_s = None
+                else:
+                    gender_places[gender] += 1
+                    overall, gender_place = place, gender_places[gender]
+                    finish_time = _hms(seconds)
+                    pace_s = int(seconds / km)
+                    pace_text = f"{pace_s // 60}:{pace_s % 60:02d}"
+                yield (runner_id, race_id, spelling, distance_meters(spelling), finish_time, seconds,
+                       pace_text, pace_s, overall, gender_place,
+                       age_group_for(births[runner_id - 1], race["date"]), len(timed), created_at)
+
+
+def _insert(conn: sqlite3.Connection, sql: str, rows) -> int:
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def _fill(path: str, runners: int, races: int, results: int, seed: int) -> Dict[str, int]:
+    rng = random.Random(seed)
+    today = date.today()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+
+    # Триггеры и индексы основных таблиц — снять на время вставки
+    saved = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ('runners', 'races', 'results')"
+    ).fetchall()
+    for kind, name, _ in saved:
+        conn.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+
+    runner_rows, genders, pace = _make_runners(rng, runners, today)
+    _insert(conn, "INSERT INTO runners (telegram_id, first_name, last_name, middle_name, birth_date, "
+                  "gender, city, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", runner_rows)
+    births = [row[4] for row in runner_rows]
+    del runner_rows
+
+    race_list = _make_races(rng, races, today)
+    _insert(conn, "INSERT INTO races (id, name, date, location, organizer, race_type, distances, website_url, "
+                  "protocol_url, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((r["id"], r["name"], r["date"], r["location"], r["organizer"], r["race_type"],
+              json.dumps([{"name": d} for d in r["distances"]], ensure_ascii=False),
+              r["website_url"], r["protocol_url"], r["source"], r["created_at"]) for r in race_list))
+    sizes = _protocol_sizes(rng, race_list, results, runners, today)
+    added = _insert(conn, "INSERT INTO results (runner_id, race_id, distance, distance_m, finish_time, "
+                          "finish_time_seconds, pace, pace_seconds_per_km, overall_place, gender_place, "
+                          "age_group, total_runners, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _results_rows(rng, race_list, sizes, runners, genders, pace, births))
+
+    # Немного пользовательских данных для /dev-аналитики
+    telegram_runners = [i + 1 for i in range(runners) if rng.random() < 0.05] or [1]
+    upcoming = [r["id"] for r in race_list if r["date"] >= today.isoformat()] or [1]
+    conn.executemany(
+        "INSERT OR IGNORE INTO race_subscriptions (runner_id, race_id, status) VALUES (?, ?, ?)",
+        [(rng.choice(telegram_runners), rng.choice(upcoming), rng.choice(("planning", "registered")))
+         for _ in range(len(telegram_runners))])
+    conn.executemany(
+        "INSERT OR IGNORE INTO result_claims (result_id, runner_id, telegram_id, status) VALUES (?, ?, ?, ?)",
+        [(rng.randint(1, max(1, added)), rng.choice(telegram_runners), None,
+          rng.choice(("pending", "approved", "rejected"))) for _ in range(max(1, runners // 200))])
+    conn.executemany(
+        "INSERT INTO feedback (telegram_id, text, created_at) VALUES (?, ?, ?)",
+        [(100_000_000 + i, "Отзыв о боте", _timestamp(rng, today - timedelta(days=90), today))
+         for i in range(max(1, runners // 500))])
+
+    for _, _, sql in saved:
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+    return {"runners": runners, "races": races, "results": added}
+
+
+async def _rebuild(path: str) -> None:
+    """Счётчики, сводки и рейтинги — теми же методами, что чинят рабочую базу"""
+    db = Database()
+    await db.connect(path)
+    # Пересборка заведомо медленная — без журнала медленных запросов
+    query_stats.slow_ms = float("inf")
+    await db.rebuild_race_counters()
+    await db.rebuild_daily_rollups()
+    await db.rebuild_leaderboards()
+    await db.db.execute("DELETE FROM sync_changes")
+    await db.db.execute("ANALYZE")
+    await db.db.commit()
+    await db.disconnect()
+
+
+async def _init_schema(path: str) -> None:
+    db = Database()
+    await db.connect(path)
+    await db.disconnect()
+
+
+def generate(runners: int, races: int, results: int, seed: int = 1,
+             path: Optional[str] = None, force: bool = False) -> str:
+    """Создать синтетическую базу (или взять готовую из кэша). Returns: путь к файлу"""
+    path = path or db_path_for(runners, races, results, seed)
+    if os.path.exists(path) and not force:
+        return path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    started = time.perf_counter()
+    print(f"🏗 Синтетическая база: {runners} бегунов, {races} забегов, ~{results} результатов (seed {seed})")
+    asyncio.run(_init_schema(tmp))
+    counts = _fill(tmp, runners, races, results, seed)
+    print(f"   данные: {counts['results']} результатов за {time.perf_counter() - started:.0f} с, пересборка...")
+    asyncio.run(_rebuild(tmp))
+    os.replace(tmp, path)
+    print(f"✅ {path} ({os.path.getsize(path) / 1024 / 1024:.0f} МБ) за {time.perf_counter() - started:.0f} с")
+    return path
+
+
+def add_size_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--size", choices=tuple(SIZES), default="medium",
+                        help="Готовый размер базы (по умолчанию medium)")
+    parser.add_argument("--runners", type=int, help="Бегунов (вместо --size)")
+    parser.add_argument("--races", type=int, help="Забегов (вместо --size)")
+    parser.add_argument("--results", type=int, help="Результатов (вместо --size)")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def size_from_args(args: argparse.Namespace) -> Tuple[int, int, int]:
+    runners, races, results = SIZES[args.size]
+    return args.runners or runners, args.races or races, args.results or results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетическая SQLite-база для бенчмарков")
+    add_size_arguments(parser)
+    parser.add_argument("--output", help="Путь к файлу (по умолчанию bench/.data/)")
+    parser.add_argument("--force", action="store_true", help="Пересоздать, даже если файл есть")
+    args = parser.parse_args()
+    print(generate(*size_from_args(args), seed=args.seed, path=args.output, force=args.force))
+
+
+if __name__ == "__main__":
+    main()
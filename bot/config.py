@@ -20,3 +20,58 @@ PROJECT_TAGLINE = "Засейди свои результаты"
 
 # Мониторинг: URL от Healthchecks.io (опционально)
 HEALTHCHECK_URL = os.getenv("HEALTHCHECK_URL", "").strip()
+
+# Режим работы: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+
+# Webhook: публичный адрес (https://example.ru) и локальный aiohttp-сервер
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").strip().rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook").strip()
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "").strip()
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0").strip()
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", 8080))
+# Сколько апдейтов обрабатывается одновременно; остальные ждут в очереди
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", 8))
+# Сколько секунд при остановке ждать завершения начатых апдейтов
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 30))
+
+# Свой адрес Bot API (локальный telegram-bot-api или fake-сервер для проверки)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").strip().rstrip("/")
+
+# Ограничение частоты: на пользователя RATE запросов/с с запасом BURST подряд
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", 1.0))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", 5))
+# Сколько апдейтов обрабатывается одновременно во всём боте и сколько секунд ждать слота
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 16))
+IN_FLIGHT_WAIT = float(os.getenv("IN_FLIGHT_WAIT", 5))
+
+# Первичный парсинг при запуске идёт в фоне и пропускается,
+# если последний успешный прошёл меньше N часов назад
+INITIAL_PARSE_MAX_AGE_HOURS = float(os.getenv("INITIAL_PARSE_MAX_AGE_HOURS", 12))
+
+# Запросы к SQLite дольше N мс пишутся в журнал медленных (с EXPLAIN QUERY PLAN)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+
+# Метрики Prometheus: GET /metrics на локальном сервере (режим polling; 0 — выключить).
+# В режиме webhook /metrics отдаёт сервер webhook (WEBAPP_PORT)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1").strip()
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9101))
+
+# Трассировка апдейтов (tracing.py): доля трасс в logs/traces_*.jsonl
+# и порог, после которого трасса пишется всегда
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.05))
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", 1000))
+
+# Профилирование сбора и парсинга (profiling.py, --profile / /admin_profile):
+# интервал выборок и длина топа функций в итоге
+PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", 10))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", 15))
+
+# API RussiaRunning (parsers/rr_api.py): событий на страницу, одновременных запросов,
+# запросов в секунду, длина окна (дней) при разбиении длинных периодов
+# и как часто (дней) инкрементальный прогон заменяется полным
+RR_PAGE_SIZE = int(os.getenv("RR_PAGE_SIZE", 100))
+RR_CONCURRENCY = int(os.getenv("RR_CONCURRENCY", 4))
+RR_RATE = float(os.getenv("RR_RATE", 4))
+RR_SHARD_DAYS = int(os.getenv("RR_SHARD_DAYS", 31))
+RR_FULL_SWEEP_DAYS = int(os.getenv("RR_FULL_SWEEP_DAYS", 7))
@@ -3,25 +3,80 @@ Seido - Работа с базой данных (SQLite)
 """
 import aiosqlite
 from typing import Optional, List, Dict, Any
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
+import json
 import os
 import sys
 
+try:
+    from distances import age_group_for, age_group_sql, distance_meters
+    from query_stats import TimedConnection, query_stats
+    from metrics import cache_hit
+except ImportError:  # импорт как bot.db из скриптов
+    from bot.distances import age_group_for, age_group_sql, distance_meters
+    from bot.query_stats import TimedConnection, query_stats
+    from bot.metrics import cache_hit
+
 # Исправление кодировки для Windows
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding="utf-8")
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "seido.db")
 
+# Разделы аналитики со снимком в analytics_snapshots → метод, который его считает
+SNAPSHOT_SECTIONS = {"overview": "compute_overview_analytics"}
+
+# Сколько лучших бегунов хранится на каждой доске рейтинга
+LEADERBOARD_SIZE = 100
+
+
+def _board_rows_sql(where: str) -> str:
+    """
+    CTE досок: base — результаты (фильтр where по r.*), boards — каждый результат на своих
+    8 досках, personal — pb = 1 у лучшего результата бегуна на доске (время, затем id)
+    """
+    return f"""
+    base AS (
+        SELECT r.id AS result_id, r.runner_id, r.distance_m, r.finish_time_seconds AS t,
+               ru.gender AS g, {age_group_sql("ru.birth_date", "rac.date")} AS a,
+               CAST(substr(rac.date, 1, 4) AS INTEGER) AS y
+        FROM results r
+        JOIN runners ru ON ru.id = r.runner_id
+        JOIN races rac ON rac.id = r.race_id
+        WHERE r.distance_m IS NOT NULL AND r.finish_time_seconds > 0 {where}
+    ),
+    boards AS (
+        SELECT distance_m,
+               CASE WHEN d.column1 THEN g ELSE '*' END AS gender,
+               CASE WHEN d.column2 THEN a ELSE '*' END AS age_group,
+               CASE WHEN d.column3 THEN y ELSE 0 END AS year,
+               runner_id, result_id, t
+        FROM base
+        CROSS JOIN (VALUES (0,0,0), (0,0,1), (0,1,0), (0,1,1),
+                           (1,0,0), (1,0,1), (1,1,0), (1,1,1)) AS d
+        WHERE (d.column1 = 0 OR g IN ('M', 'F'))
+          AND (d.column2 = 0 OR a IS NOT NULL)
+          AND (d.column3 = 0 OR y > 0)
+    ),
+    personal AS (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY distance_m, gender, age_group, year, runner_id ORDER BY t, result_id
+        ) AS pb
+        FROM boards
+    )
+    """
+
 
 class Database:
     def __init__(self):
-        self.db: Optional[aiosqlite.Connection] = None
-
-    async def connect(self):
-        """Подключение к базе данных"""
-        self.db = await aiosqlite.connect(DB_PATH)
-        self.db.row_factory = aiosqlite.Row
+        self.db: Optional[TimedConnection] = None
+
+    async def connect(self, path: Optional[str] = None):
+        """Подключение к базе данных (path — другой файл вместо seido.db, например синтетическая БД бенчмарков)"""
+        conn = await aiosqlite.connect(path or DB_PATH)
+        conn.row_factory = aiosqlite.Row
+        # execute засекается по методам Database (см. query_stats.py, /dev → «Запросы БД»)
+        self.db = TimedConnection(conn, query_stats)
         await self.init_db()
         print("[OK] Подключение к базе данных установлено")
 
@@ -160,6 +215,22 @@ class Database:
             text TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+
+        -- Снимки аналитики разработчика (analytics_snapshots)
+        CREATE TABLE IF NOT EXISTS analytics_snapshots (
+            section TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Прогоны фоновых задач планировщика (parse_all): когда был последний успешный
+        CREATE TABLE IF NOT EXISTS job_runs (
+            job TEXT PRIMARY KEY,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            last_success_at TIMESTAMP,
+            result TEXT
+        );
         """)
         await self.db.commit()
 
@@ -181,6 +252,740 @@ class Database:
         except Exception:
             pass
 
+        # Миграция: счётчики результатов в races (денормализация, см. rebuild_race_counters)
+        counters_added = False
+        for column in ("results_count", "distances_with_results"):
+            try:
+                await self.db.execute(
+                    f"ALTER TABLE races ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                )
+                counters_added = True
+            except Exception:
+                pass
+        await self.init_race_counter_triggers()
+        if counters_added:
+            await self.rebuild_race_counters()
+        await self.db.commit()
+
+        # Миграция: источник забега (парсер, протокол, ручное добавление) для дневных сводок
+        try:
+            await self.db.execute("ALTER TABLE races ADD COLUMN source TEXT")
+            await self.db.commit()
+        except Exception:
+            pass
+
+        await self.init_daily_rollups()
+        await self.init_sync_changelog()
+
+        # Миграция: каноническая дистанция в метрах (results.distance — текст из протокола)
+        distance_m_added = False
+        try:
+            await self.db.execute("ALTER TABLE results ADD COLUMN distance_m INTEGER")
+            distance_m_added = True
+        except Exception:
+            pass
+        await self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_distance_m ON results(distance_m, finish_time_seconds)"
+        )
+        if distance_m_added:
+            await self.backfill_distance_m()
+        await self.db.commit()
+        await self.init_leaderboards()
+
+    async def init_race_counter_triggers(self):
+        """
+        Триггеры, поддерживающие races.results_count и races.distances_with_results.
+        Срабатывают на любой путь записи (бот, импорт протоколов, заявки «это я»),
+        поэтому списки забегов не агрегируют results при каждом запросе.
+        """
+        await self.db.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_results_race_distance ON results(race_id, distance);
+        CREATE INDEX IF NOT EXISTS idx_races_with_results ON races(date) WHERE results_count > 0;
+
+        CREATE TRIGGER IF NOT EXISTS trg_results_counter_insert
+        AFTER INSERT ON results
+        BEGIN
+            UPDATE races SET
+                results_count = results_count + 1,
+                distances_with_results = distances_with_results + (
+                    NOT EXISTS (
+                        SELECT 1 FROM results
+                        WHERE race_id = NEW.race_id AND distance = NEW.distance AND id != NEW.id
+                    )
+                )
+            WHERE id = NEW.race_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_results_counter_delete
+        AFTER DELETE ON results
+        BEGIN
+            UPDATE races SET
+                results_count = results_count - 1,
+                distances_with_results = distances_with_results - (
+                    NOT EXISTS (
+                        SELECT 1 FROM results
+                        WHERE race_id = OLD.race_id AND distance = OLD.distance
+                    )
+                )
+            WHERE id = OLD.race_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_results_counter_update
+        AFTER UPDATE OF race_id, distance ON results
+        WHEN OLD.race_id != NEW.race_id OR OLD.distance != NEW.distance
+        BEGIN
+            UPDATE races SET
+                results_count = results_count - 1,
+                distances_with_results = distances_with_results - (
+                    NOT EXISTS (
+                        SELECT 1 FROM results
+                        WHERE race_id = OLD.race_id AND distance = OLD.distance
+                    )
+                )
+            WHERE id = OLD.race_id;
+            UPDATE races SET
+                results_count = results_count + 1,
+                distances_with_results = distances_with_results + (
+                    NOT EXISTS (
+                        SELECT 1 FROM results
+                        WHERE race_id = NEW.race_id AND distance = NEW.distance AND id != NEW.id
+                    )
+                )
+            WHERE id = NEW.race_id;
+        END;
+        """)
+
+    async def init_daily_rollups(self):
+        """
+        Дневные сводки: регистрации бегунов, импорт результатов по организаторам,
+        добавление забегов по источникам. Пополняются триггерами на INSERT,
+        поэтому тренды и выборки за период не сканируют runners/results/races.
+        Сводки считают события добавления: удаление строк их не уменьшает.
+        """
+        async with self.db.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name LIKE 'rollup_%_daily'"
+        ) as cursor:
+            existing = (await cursor.fetchone())[0]
+
+        await self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS rollup_runners_daily (
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,            -- telegram | imported
+            cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind)
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_results_daily (
+            day TEXT NOT NULL,
+            organizer TEXT NOT NULL,
+            distance TEXT NOT NULL,
+            cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, organizer, distance)
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_races_daily (
+            day TEXT NOT NULL,
+            source TEXT NOT NULL,
+            cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, source)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_runners_insert
+        AFTER INSERT ON runners
+        BEGIN
+            INSERT INTO rollup_runners_daily (day, kind, cnt)
+            VALUES (
+                date(COALESCE(NEW.created_at, CURRENT_TIMESTAMP)),
+                CASE WHEN NEW.telegram_id IS NOT NULL THEN 'telegram' ELSE 'imported' END,
+                1
+            )
+            ON CONFLICT (day, kind) DO UPDATE SET cnt = cnt + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_results_insert
+        AFTER INSERT ON results
+        BEGIN
+            INSERT INTO rollup_results_daily (day, organizer, distance, cnt)
+            SELECT
+                date(COALESCE(NEW.created_at, CURRENT_TIMESTAMP)),
+                COALESCE(NULLIF(organizer, ''), 'Не указан'),
+                NEW.distance,
+                1
+            FROM races WHERE id = NEW.race_id
+            ON CONFLICT (day, organizer, distance) DO UPDATE SET cnt = cnt + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_races_insert
+        AFTER INSERT ON races
+        BEGIN
+            INSERT INTO rollup_races_daily (day, source, cnt)
+            VALUES (
+                date(COALESCE(NEW.created_at, CURRENT_TIMESTAMP)),
+                COALESCE(NULLIF(NEW.source, ''), 'unknown'),
+                1
+            )
+            ON CONFLICT (day, source) DO UPDATE SET cnt = cnt + 1;
+        END;
+        """)
+        if existing < 3:
+            await self.rebuild_daily_rollups()
+
+    async def rebuild_daily_rollups(self):
+        """
+        Пересобрать дневные сводки по базовым таблицам.
+        Выполняется при первой миграции и для ремонта
+        (python -m bot.scripts.repair_race_counters --rollups).
+        """
+        await self.db.executescript("""
+        DELETE FROM rollup_runners_daily;
+        INSERT INTO rollup_runners_daily (day, kind, cnt)
+        SELECT date(created_at),
+               CASE WHEN telegram_id IS NOT NULL THEN 'telegram' ELSE 'imported' END,
+               COUNT(*)
+        FROM runners WHERE created_at IS NOT NULL
+        GROUP BY 1, 2;
+
+        DELETE FROM rollup_results_daily;
+        INSERT INTO rollup_results_daily (day, organizer, distance, cnt)
+        SELECT date(res.created_at), COALESCE(NULLIF(r.organizer, ''), 'Не указан'), res.distance, COUNT(*)
+        FROM results res JOIN races r ON r.id = res.race_id
+        WHERE res.created_at IS NOT NULL
+        GROUP BY 1, 2, 3;
+
+        DELETE FROM rollup_races_daily;
+        INSERT INTO rollup_races_daily (day, source, cnt)
+        SELECT date(created_at), COALESCE(NULLIF(source, ''), 'unknown'), COUNT(*)
+        FROM races WHERE created_at IS NOT NULL
+        GROUP BY 1, 2;
+        """)
+        await self.db.commit()
+
+    async def get_daily_rollup(
+        self,
+        rollup: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        group_by: str = "day",
+    ) -> List[Dict]:
+        """
+        Выборка из дневной сводки за период (границы YYYY-MM-DD включительно).
+        rollup: runners | results | races
+        group_by: day — ряд по дням для графиков; иначе измерение сводки
+        (kind для runners, organizer/distance для results, source для races),
+        суммированное за период. Возвращает [{key, cnt}] (для day key — дата).
+        """
+        dimensions = {
+            "runners": ("rollup_runners_daily", ("kind",)),
+            "results": ("rollup_results_daily", ("organizer", "distance")),
+            "races": ("rollup_races_daily", ("source",)),
+        }
+        if rollup not in dimensions:
+            raise ValueError(f"Неизвестная сводка: {rollup}")
+        table, allowed = dimensions[rollup]
+        if group_by != "day" and group_by not in allowed:
+            raise ValueError(f"Сводка {rollup} не группируется по {group_by}")
+
+        where, params = [], []
+        if date_from:
+            where.append("day >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("day <= ?")
+            params.append(date_to)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        order = "key" if group_by == "day" else "cnt DESC"
+        async with self.db.execute(
+            f"SELECT {group_by} as key, SUM(cnt) as cnt FROM {table} {where_sql} "
+            f"GROUP BY {group_by} ORDER BY {order}",
+            params,
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def init_sync_changelog(self):
+        """
+        Журнал изменений для инкрементальной синхронизации с MySQL (scripts/sync_to_mysql.py).
+        Триггеры пишут (таблица, id строки) при INSERT/UPDATE runners, races, results;
+        sync_state хранит, до какой записи журнала каждая таблица уже выгружена.
+        """
+        await self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS sync_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_sync_changes_table ON sync_changes(table_name, id);
+
+        CREATE TABLE IF NOT EXISTS sync_state (
+            table_name TEXT PRIMARY KEY,
+            last_change_id INTEGER NOT NULL DEFAULT 0,
+            rows_synced INTEGER NOT NULL DEFAULT 0,
+            synced_at TIMESTAMP
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_sync_runners_insert AFTER INSERT ON runners
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('runners', NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sync_runners_update AFTER UPDATE ON runners
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('runners', NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_sync_races_insert AFTER INSERT ON races
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('races', NEW.id);
+        END;
+        -- Только колонки, которые уходят в MySQL: счётчики результатов меняются на каждый импорт
+        CREATE TRIGGER IF NOT EXISTS trg_sync_races_update
+        AFTER UPDATE OF name, date, location, organizer, race_type, distances,
+                        website_url, protocol_url, is_active ON races
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('races', NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_sync_results_insert AFTER INSERT ON results
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('results', NEW.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sync_results_update AFTER UPDATE ON results
+        BEGIN
+            INSERT INTO sync_changes (table_name, row_id) VALUES ('results', NEW.id);
+        END;
+        """)
+
+    async def get_sync_state(self) -> Dict[str, Dict]:
+        """Прогресс синхронизации с MySQL по таблицам: {table_name: {last_change_id, ...}}"""
+        async with self.db.execute("SELECT * FROM sync_state") as cursor:
+            return {row["table_name"]: dict(row) for row in await cursor.fetchall()}
+
+    async def get_last_sync_change_id(self) -> int:
+        """Последняя запись журнала sync_changes (граница текущего прогона синхронизации)"""
+        async with self.db.execute("SELECT COALESCE(MAX(id), 0) FROM sync_changes") as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def save_sync_state(self, table_name: str, last_change_id: int, rows_synced: int):
+        """Запомнить, что таблица выгружена до записи журнала last_change_id включительно"""
+        await self.db.execute(
+            """
+            INSERT INTO sync_state (table_name, last_change_id, rows_synced, synced_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE SET
+                last_change_id = excluded.last_change_id,
+                rows_synced = excluded.rows_synced,
+                synced_at = excluded.synced_at
+            """,
+            (table_name, last_change_id, rows_synced)
+        )
+        await self.db.commit()
+
+    async def prune_sync_changes(self, tables: tuple = ("runners", "races", "results")) -> int:
+        """Удалить записи журнала, которые уже выгружены всеми таблицами"""
+        state = await self.get_sync_state()
+        if any(t not in state for t in tables):
+            return 0
+        upto = min(state[t]["last_change_id"] for t in tables)
+        cursor = await self.db.execute("DELETE FROM sync_changes WHERE id <= ?", (upto,))
+        await self.db.commit()
+        return cursor.rowcount
+
+    async def rebuild_race_counters(self) -> int:
+        """
+        Пересчитать races.results_count и races.distances_with_results по таблице results.
+        Нужен после миграции и для ремонта (python -m bot.scripts.repair_race_counters).
+        Returns: количество забегов, у которых счётчики расходились с results
+        """
+        cursor = await self.db.execute(
+            """
+            UPDATE races SET
+                results_count = (SELECT COUNT(*) FROM results WHERE race_id = races.id),
+                distances_with_results = (
+                    SELECT COUNT(DISTINCT distance) FROM results WHERE race_id = races.id
+                )
+            WHERE results_count IS NOT (SELECT COUNT(*) FROM results WHERE race_id = races.id)
+               OR distances_with_results IS NOT (
+                    SELECT COUNT(DISTINCT distance) FROM results WHERE race_id = races.id
+               )
+            """
+        )
+        await self.db.commit()
+        return cursor.rowcount
+
+    # ============================================
+    # РЕЙТИНГИ (LEADERBOARDS)
+    # ============================================
+
+    async def backfill_distance_m(self, only_missing: bool = True) -> int:
+        """
+        Заполнить results.distance_m по тексту results.distance.
+        Разных написаний немного, поэтому разбор идёт по DISTINCT distance, а не по строкам.
+        Returns: количество обновлённых результатов
+        """
+        where = "WHERE distance_m IS NULL" if only_missing else ""
+        async with self.db.execute(f"SELECT DISTINCT distance FROM results {where}") as cursor:
+            spellings = [row[0] for row in await cursor.fetchall()]
+        updated = 0
+        for spelling in spellings:
+            meters = distance_meters(spelling)
+            if meters is None:
+                continue
+            cursor = await self.db.execute(
+                f"UPDATE results SET distance_m = ? WHERE distance = ? {'AND distance_m IS NULL' if only_missing else ''}",
+                (meters, spelling)
+            )
+            updated += cursor.rowcount
+        await self.db.commit()
+        return updated
+
+    async def init_leaderboards(self):
+        """
+        Рейтинги: топ-LEADERBOARD_SIZE лучших результатов бегунов на доске
+        (distance_m, gender, age_group, year); '*' и 0 — «все». Каждый результат попадает
+        на 8 досок (пол/все × группа/все × год/все). Доски обновляются при add_result,
+        место бегуна хранится в rank — поиск места по первичному ключу.
+        Удаление результата с доски, смена пола или даты рождения бегуна и даты забега
+        помечают дистанцию в leaderboard_stale; её пересобирает rebuild_stale_leaderboards.
+        """
+        async with self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='leaderboard'"
+        ) as cursor:
+            existed = await cursor.fetchone() is not None
+
+        await self.db.executescript("""
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            distance_m INTEGER NOT NULL,
+            gender TEXT NOT NULL,          -- M | F | *
+            age_group TEXT NOT NULL,       -- «30-39» | *
+            year INTEGER NOT NULL,         -- год забега | 0
+            runner_id INTEGER NOT NULL,
+            result_id INTEGER NOT NULL,
+            best_seconds INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            PRIMARY KEY (distance_m, gender, age_group, year, runner_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_rank ON leaderboard(distance_m, gender, age_group, year, rank);
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_result ON leaderboard(result_id);
+
+        -- Дистанции, доски которых надо пересобрать (rebuild_stale_leaderboards)
+        CREATE TABLE IF NOT EXISTS leaderboard_stale (
+            distance_m INTEGER PRIMARY KEY
+        );
+
+        -- Удалённый результат уходит с досок; места, бегуна со следующим результатом
+        -- и освободившееся место в топе вернёт пересборка дистанции
+        DROP TRIGGER IF EXISTS trg_leaderboard_result_delete;
+        CREATE TRIGGER trg_leaderboard_result_delete
+        AFTER DELETE ON results
+        WHEN EXISTS (SELECT 1 FROM leaderboard WHERE result_id = OLD.id)
+        BEGIN
+            INSERT OR IGNORE INTO leaderboard_stale (distance_m) VALUES (OLD.distance_m);
+            DELETE FROM leaderboard WHERE result_id = OLD.id;
+        END;
+
+        -- Пол и возрастная группа бегуна, год забега — часть ключа доски
+        CREATE TRIGGER IF NOT EXISTS trg_leaderboard_runner_update
+        AFTER UPDATE OF gender, birth_date ON runners
+        WHEN OLD.gender IS NOT NEW.gender OR OLD.birth_date IS NOT NEW.birth_date
+        BEGIN
+            INSERT OR IGNORE INTO leaderboard_stale (distance_m)
+            SELECT DISTINCT distance_m FROM results WHERE runner_id = NEW.id AND distance_m IS NOT NULL;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_leaderboard_race_update
+        AFTER UPDATE OF date ON races
+        WHEN OLD.date IS NOT NEW.date
+        BEGIN
+            INSERT OR IGNORE INTO leaderboard_stale (distance_m)
+            SELECT DISTINCT distance_m FROM results WHERE race_id = NEW.id AND distance_m IS NOT NULL;
+        END;
+        """)
+        await self.db.commit()
+        if not existed:
+            await self.rebuild_leaderboards()
+        else:
+            # Правки, сделанные в обход бота (скрипты, ручной SQL)
+            await self.rebuild_stale_leaderboards()
+
+    async def rebuild_leaderboards(self, distance_m: Optional[int] = None) -> int:
+        """
+        Пересобрать доски целиком (или одной дистанции) одним запросом с оконными функциями.
+        Нужен после миграции, переноса результатов между бегунами и для ремонта
+        (python -m bot.scripts.repair_race_counters --leaderboards).
+        Returns: количество строк на досках
+        """
+        where, params = ("AND r.distance_m = ?", (distance_m,)) if distance_m else ("", ())
+        if distance_m:
+            await self.db.execute("DELETE FROM leaderboard WHERE distance_m = ?", (distance_m,))
+        else:
+            await self.db.execute("DELETE FROM leaderboard")
+            await self.db.execute("DELETE FROM leaderboard_stale")
+        cursor = await self.db.execute(
+            f"""
+            INSERT INTO leaderboard (distance_m, gender, age_group, year, runner_id, result_id, best_seconds, rank)
+            WITH {_board_rows_sql(where)},
+            ranked AS (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY distance_m, gender, age_group, year ORDER BY t, result_id
+                ) AS place
+                FROM personal WHERE pb = 1
+            )
+            SELECT distance_m, gender, age_group, year, runner_id, result_id, t, place
+            FROM ranked WHERE place <= ?
+            """,
+            (*params, LEADERBOARD_SIZE)
+        )
+        await self.db.commit()
+        return cursor.rowcount
+
+    async def rebuild_stale_leaderboards(self) -> List[int]:
+        """
+        Пересобрать дистанции из leaderboard_stale (после удалений и правок бегунов и забегов).
+        Returns: пересобранные дистанции
+        """
+        async with self.db.execute("SELECT distance_m FROM leaderboard_stale") as cursor:
+            stale = [row[0] for row in await cursor.fetchall()]
+        for distance_m in stale:
+            await self.db.execute("DELETE FROM leaderboard_stale WHERE distance_m = ?", (distance_m,))
+            await self.rebuild_leaderboards(distance_m)
+        return stale
+
+    async def update_leaderboards_for_race(self, race_id: int) -> int:
+        """
+        Влить результаты забега в доски (после импорта протокола) без пересборки: лучший
+        результат бегуна в забеге на каждой доске заменяет его место, если он быстрее;
+        затем перенумеровываются и обрезаются только затронутые доски.
+        Если результат с доски стал хуже (протокол исправлен) — его дистанция пересобирается.
+        Без commit. Returns: количество затронутых досок
+        """
+        async with self.db.execute(
+            """
+            SELECT DISTINCT lb.distance_m
+            FROM results r
+            JOIN leaderboard lb ON lb.result_id = r.id
+            WHERE r.race_id = ?
+              AND (r.finish_time_seconds IS NULL OR r.finish_time_seconds > lb.best_seconds
+                   OR r.distance_m IS NOT lb.distance_m)
+            """,
+            (race_id,)
+        ) as cursor:
+            worse = [row[0] for row in await cursor.fetchall()]
+        for distance_m in worse:
+            await self.rebuild_leaderboards(distance_m)
+
+        await self.db.execute("DROP TABLE IF EXISTS temp.leaderboard_merge")
+        await self.db.execute(
+            f"""
+            CREATE TEMP TABLE leaderboard_merge AS
+            WITH {_board_rows_sql("AND r.race_id = ?")}
+            SELECT distance_m, gender, age_group, year, runner_id, result_id, t
+            FROM personal WHERE pb = 1
+            """,
+            (race_id,)
+        )
+        if worse:
+            await self.db.execute(
+                f"DELETE FROM leaderboard_merge WHERE distance_m IN ({','.join('?' * len(worse))})", worse
+            )
+        await self.db.execute("CREATE INDEX temp.idx_leaderboard_merge ON leaderboard_merge(distance_m, gender, age_group, year)")
+        await self.db.execute(
+            """
+            INSERT INTO leaderboard (distance_m, gender, age_group, year, runner_id, result_id, best_seconds, rank)
+            SELECT m.distance_m, m.gender, m.age_group, m.year, m.runner_id, m.result_id, m.t, 0
+            FROM leaderboard_merge m
+            -- Доска полна и последний в топе быстрее — не вставлять, чтобы тут же не обрезать
+            WHERE NOT EXISTS (
+                SELECT 1 FROM leaderboard lb
+                WHERE lb.distance_m = m.distance_m AND lb.gender = m.gender AND lb.age_group = m.age_group
+                  AND lb.year = m.year AND lb.rank = ?
+                  AND (lb.best_seconds, lb.result_id) < (m.t, m.result_id)
+            )
+            ON CONFLICT (distance_m, gender, age_group, year, runner_id) DO UPDATE SET
+                result_id = excluded.result_id,
+                best_seconds = excluded.best_seconds
+            WHERE excluded.best_seconds < leaderboard.best_seconds
+               OR (excluded.best_seconds = leaderboard.best_seconds AND excluded.result_id < leaderboard.result_id)
+            """,
+            (LEADERBOARD_SIZE,)
+        )
+        # Места — заново на досках, куда что-то вливалось; всё ниже топа — прочь
+        await self.db.execute(
+            """
+            UPDATE leaderboard SET rank = ranked.place
+            FROM (
+                SELECT lb.distance_m, lb.gender, lb.age_group, lb.year, lb.runner_id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY lb.distance_m, lb.gender, lb.age_group, lb.year
+                           ORDER BY lb.best_seconds, lb.result_id
+                       ) AS place
+                FROM leaderboard lb
+                WHERE (lb.distance_m, lb.gender, lb.age_group, lb.year) IN (
+                    SELECT distance_m, gender, age_group, year FROM leaderboard_merge
+                )
+            ) AS ranked
+            WHERE leaderboard.distance_m = ranked.distance_m AND leaderboard.gender = ranked.gender
+              AND leaderboard.age_group = ranked.age_group AND leaderboard.year = ranked.year
+              AND leaderboard.runner_id = ranked.runner_id AND leaderboard.rank != ranked.place
+            """
+        )
+        await self.db.execute(
+            """
+            DELETE FROM leaderboard
+            WHERE rank > ? AND (distance_m, gender, age_group, year) IN (
+                SELECT distance_m, gender, age_group, year FROM leaderboard_merge
+            )
+            """,
+            (LEADERBOARD_SIZE,)
+        )
+        async with self.db.execute(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT distance_m, gender, age_group, year FROM leaderboard_merge)"
+        ) as cursor:
+            boards = (await cursor.fetchone())[0]
+        await self.db.execute("DROP TABLE temp.leaderboard_merge")
+        return boards
+
+    async def update_leaderboards_for_result(self, result_id: int) -> int:
+        """
+        Учесть один новый или изменённый результат: на каждой из его досок бегун
+        входит в топ или улучшает место; места пересчитываются только на изменённых досках
+        (не больше LEADERBOARD_SIZE строк). Без commit — вызывается из add_result.
+        Returns: на скольких досках что-то изменилось
+        """
+        async with self.db.execute(
+            """
+            SELECT r.runner_id, r.distance_m, r.finish_time_seconds, ru.gender, ru.birth_date, rac.date
+            FROM results r
+            JOIN runners ru ON ru.id = r.runner_id
+            JOIN races rac ON rac.id = r.race_id
+            WHERE r.id = ?
+            """,
+            (result_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row or not row["distance_m"] or not row["finish_time_seconds"] or row["finish_time_seconds"] <= 0:
+            return 0
+        runner_id, distance_m, seconds = row["runner_id"], row["distance_m"], row["finish_time_seconds"]
+        genders = ["*"] + ([row["gender"]] if row["gender"] in ("M", "F") else [])
+        age_group = age_group_for(row["birth_date"], row["date"])
+        age_groups = ["*"] + ([age_group] if age_group else [])
+        try:
+            year = int(str(row["date"])[:4])
+        except (TypeError, ValueError):
+            year = 0
+        years = [0] + ([year] if year > 0 else [])
+
+        changed = 0
+        for gender in genders:
+            for group in age_groups:
+                for board_year in years:
+                    board = (distance_m, gender, group, board_year)
+                    async with self.db.execute(
+                        """
+                        SELECT best_seconds, result_id FROM leaderboard
+                        WHERE distance_m = ? AND gender = ? AND age_group = ? AND year = ? AND runner_id = ?
+                        """,
+                        (*board, runner_id)
+                    ) as cursor:
+                        current = await cursor.fetchone()
+                    if current and current["result_id"] == result_id and seconds > current["best_seconds"]:
+                        # Лучший результат стал хуже (исправление протокола) — доску дешевле пересобрать
+                        await self.rebuild_leaderboards(distance_m)
+                        return changed + 1
+                    if current and current["best_seconds"] <= seconds:
+                        continue
+                    if not current:
+                        async with self.db.execute(
+                            """
+                            SELECT COUNT(*), MAX(best_seconds) FROM leaderboard
+                            WHERE distance_m = ? AND gender = ? AND age_group = ? AND year = ?
+                            """,
+                            board
+                        ) as cursor:
+                            size, slowest = await cursor.fetchone()
+                        if size >= LEADERBOARD_SIZE and seconds >= slowest:
+                            continue
+                    await self.db.execute(
+                        """
+                        INSERT INTO leaderboard (distance_m, gender, age_group, year, runner_id, result_id, best_seconds, rank)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                        ON CONFLICT (distance_m, gender, age_group, year, runner_id) DO UPDATE SET
+                            result_id = excluded.result_id,
+                            best_seconds = excluded.best_seconds
+                        """,
+                        (*board, runner_id, result_id, seconds)
+                    )
+                    await self._rerank_board(board)
+                    changed += 1
+        return changed
+
+    async def _rerank_board(self, board: tuple) -> None:
+        """Пронумеровать места на доске заново и отрезать всё ниже топа"""
+        await self.db.execute(
+            """
+            UPDATE leaderboard SET rank = ranked.place
+            FROM (
+                SELECT runner_id, ROW_NUMBER() OVER (ORDER BY best_seconds, result_id) AS place
+                FROM leaderboard
+                WHERE distance_m = ? AND gender = ? AND age_group = ? AND year = ?
+            ) AS ranked
+            WHERE leaderboard.distance_m = ? AND leaderboard.gender = ? AND leaderboard.age_group = ?
+              AND leaderboard.year = ? AND leaderboard.runner_id = ranked.runner_id
+              AND leaderboard.rank != ranked.place
+            """,
+            (*board, *board)
+        )
+        await self.db.execute(
+            """
+            DELETE FROM leaderboard
+            WHERE distance_m = ? AND gender = ? AND age_group = ? AND year = ? AND rank > ?
+            """,
+            (*board, LEADERBOARD_SIZE)
+        )
+
+    async def get_leaderboard(
+        self,
+        distance_m: int,
+        gender: str = "*",
+        age_group: str = "*",
+        year: int = 0,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Топ доски с именами бегунов и забегом лучшего результата"""
+        async with self.db.execute(
+            """
+            SELECT lb.rank, lb.best_seconds, lb.runner_id, lb.result_id,
+                   ru.first_name, ru.last_name, ru.city,
+                   r.finish_time, rac.name AS race_name, rac.date AS race_date
+            FROM leaderboard lb
+            JOIN runners ru ON ru.id = lb.runner_id
+            JOIN results r ON r.id = lb.result_id
+            JOIN races rac ON rac.id = r.race_id
+            WHERE lb.distance_m = ? AND lb.gender = ? AND lb.age_group = ? AND lb.year = ?
+            ORDER BY lb.rank
+            LIMIT ?
+            """,
+            (distance_m, gender, age_group, year, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_runner_rank(
+        self,
+        runner_id: int,
+        distance_m: int,
+        gender: str = "*",
+        age_group: str = "*",
+        year: int = 0
+    ) -> Optional[int]:
+        """Место бегуна на доске (поиск по первичному ключу) или None, если он не в топе"""
+        async with self.db.execute(
+            """
+            SELECT rank FROM leaderboard
+            WHERE distance_m = ? AND gender = ? AND age_group = ? AND year = ? AND runner_id = ?
+            """,
+            (distance_m, gender, age_group, year, runner_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
     # ============================================
     # БЕГУНЫ (RUNNERS)
     # ============================================
@@ -250,6 +1055,7 @@ class Database:
             values
         )
         await self.db.commit()
+        await self.rebuild_stale_leaderboards()
         return True
 
     # ============================================
@@ -274,13 +1080,9 @@ class Database:
         """Получить прошедшие забеги"""
         async with self.db.execute(
             """
-            SELECT r.*, 
-                   COUNT(res.id) as results_count
-            FROM races r
-            LEFT JOIN results res ON r.id = res.race_id
-            WHERE r.date < date('now') AND r.is_active = 1
-            GROUP BY r.id
-            ORDER BY r.date DESC
+            SELECT * FROM races
+            WHERE date < date('now') AND is_active = 1
+            ORDER BY date DESC
             LIMIT ?
             """,
             (limit,)
@@ -292,14 +1094,9 @@ class Database:
         """Получить забеги с результатами"""
         async with self.db.execute(
             """
-            SELECT r.*, 
-                   COUNT(res.id) as results_count
-            FROM races r
-            INNER JOIN results res ON r.id = res.race_id
-            WHERE r.is_active = 1
-            GROUP BY r.id
-            HAVING results_count > 0
-            ORDER BY r.date DESC
+            SELECT * FROM races
+            WHERE results_count > 0 AND is_active = 1
+            ORDER BY date DESC
             LIMIT ?
             """,
             (limit,)
@@ -325,14 +1122,8 @@ class Database:
         race_date = datetime.fromisoformat(race['date']).date() if isinstance(race['date'], str) else race['date']
         today = date.today()
         
-        # Подсчёт результатов
-        async with self.db.execute(
-            "SELECT COUNT(*) FROM results WHERE race_id = ?",
-            (race_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            results_count = row[0] if row else 0
-        
+        # Счётчик поддерживается триггерами (см. init_race_counter_triggers)
+        results_count = race.get('results_count') or 0
         has_results = results_count > 0
         is_past = race_date < today
         
@@ -485,7 +1276,7 @@ class Database:
         Returns: (results, total_count)
         """
         async with self.db.execute(
-            "SELECT COUNT(*) FROM results WHERE race_id = ?",
+            "SELECT results_count FROM races WHERE id = ?",
             (race_id,)
         ) as cursor:
             row = await cursor.fetchone()
@@ -523,10 +1314,10 @@ class Database:
         cursor = await self.db.execute(
             """
             INSERT INTO races 
-            (name, date, location, organizer, race_type, distances, website_url, protocol_url, is_active)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            (name, date, location, organizer, race_type, distances, website_url, protocol_url, source, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
             """,
-            (name, date, location, organizer, race_type, distances, website_url, protocol_url)
+            (name, date, location, organizer, race_type, distances, website_url, protocol_url, source or None)
         )
         await self.db.commit()
         return cursor.lastrowid
@@ -559,15 +1350,20 @@ class Database:
         runner_id: int,
         distance: str
     ) -> Optional[Dict]:
-        """Получить лучший результат на дистанции"""
+        """Получить лучший результат на дистанции (любое написание: «5 км», «5км», «5000 м»)"""
+        meters = distance_meters(distance)
+        if meters is None:
+            query, params = "runner_id = ? AND distance = ?", (runner_id, distance)
+        else:
+            query, params = "runner_id = ? AND distance_m = ?", (runner_id, meters)
         async with self.db.execute(
-            """
+            f"""
             SELECT * FROM results
-            WHERE runner_id = ? AND distance = ?
+            WHERE {query} AND finish_time_seconds IS NOT NULL
             ORDER BY finish_time_seconds ASC
             LIMIT 1
             """,
-            (runner_id, distance)
+            params
         ) as cursor:
             row = await cursor.fetchone()
             return dict(row) if row else None
@@ -588,23 +1384,24 @@ class Database:
         """
         async with self.db.execute(
             """
-            SELECT r.distance, r.finish_time_seconds, r.finish_time,
+            SELECT r.distance, r.distance_m, r.finish_time_seconds, r.finish_time,
                    rac.name as race_name, rac.date as race_date
             FROM results r
             JOIN races rac ON r.race_id = rac.id
             WHERE r.runner_id = ? AND r.finish_time_seconds IS NOT NULL
-            ORDER BY r.distance, r.finish_time_seconds ASC
+            ORDER BY r.finish_time_seconds ASC
             """,
             (runner_id,)
         ) as cursor:
             rows = await cursor.fetchall()
-        # Оставляем лучший результат на каждую дистанцию (первый в порядке ASC)
+        # Оставляем лучший результат на каждую дистанцию (первый в порядке ASC);
+        # «5 км» и «5км» — одна дистанция по distance_m
         seen = {}
         for row in rows:
             d = dict(row)
-            dist = d['distance']
-            if dist not in seen:
-                seen[dist] = d
+            key = d['distance_m'] or d['distance']
+            if key not in seen:
+                seen[key] = d
         return list(seen.values())
 
     async def search_results_by_name(
@@ -709,6 +1506,11 @@ class Database:
             (admin_id, claim_id)
         )
         await self.db.commit()
+        # Результат сменил бегуна (и, возможно, пол/группу) — доски дистанции пересобираем
+        async with self.db.execute("SELECT distance_m FROM results WHERE id = ?", (result_id,)) as cursor:
+            moved = await cursor.fetchone()
+        if moved and moved[0]:
+            await self.rebuild_leaderboards(moved[0])
         return True
 
     async def reject_result_claim(self, claim_id: int, admin_id: Optional[int] = None, comment: str = "") -> bool:
@@ -730,16 +1532,22 @@ class Database:
         gender_place: Optional[int] = None,
         age_group_place: Optional[int] = None,
         total_runners: Optional[int] = None,
+        update_leaderboards: bool = True,
     ) -> int:
-        """Добавить результат"""
-        cursor = await self.db.execute(
+        """
+        Добавить результат (и обновить доски рейтинга).
+        update_leaderboards=False — доски не трогать: импорт протокола пересобирает
+        результаты забега один раз в конце (update_leaderboards_for_race).
+        """
+        await self.db.execute(
             """
             INSERT INTO results (
-                runner_id, race_id, distance, finish_time_seconds,
+                runner_id, race_id, distance, distance_m, finish_time_seconds,
                 overall_place, gender_place, age_group_place, total_runners
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT (runner_id, race_id, distance) DO UPDATE SET
+                distance_m = excluded.distance_m,
                 finish_time_seconds = excluded.finish_time_seconds,
                 overall_place = excluded.overall_place,
                 gender_place = excluded.gender_place,
@@ -747,11 +1555,19 @@ class Database:
                 total_runners = excluded.total_runners,
                 updated_at = CURRENT_TIMESTAMP
             """,
-            (runner_id, race_id, distance, finish_time_seconds,
+            (runner_id, race_id, distance, distance_meters(distance), finish_time_seconds,
              overall_place, gender_place, age_group_place, total_runners)
         )
+        # lastrowid после ON CONFLICT DO UPDATE не указывает на обновлённую строку
+        async with self.db.execute(
+            "SELECT id FROM results WHERE runner_id = ? AND race_id = ? AND distance = ?",
+            (runner_id, race_id, distance)
+        ) as cursor:
+            result_id = (await cursor.fetchone())[0]
+        if update_leaderboards:
+            await self.update_leaderboards_for_result(result_id)
         await self.db.commit()
-        return cursor.lastrowid
+        return result_id
 
     # ============================================
     # СТАТИСТИКА
@@ -799,54 +1615,23 @@ class Database:
     # АНАЛИТИКА ДЛЯ РАЗРАБОТЧИКА
     # ============================================
 
-    async def get_developer_analytics(self, section: str = "overview") -> dict:
+    async def get_developer_analytics(self, section: str = "overview", refresh: bool = False) -> dict:
         """
         Развёрнутая аналитика для роли разработчика.
         section: overview | runners | races | results | claims | feedback | subscriptions
+        overview читается из снимка analytics_snapshots (см. refresh_analytics_snapshot);
+        refresh=True — пересчитать снимок сейчас.
         """
-        out = {}
-        today = date.today().isoformat()
-
         if section == "overview":
-            # Общие метрики
-            for name, sql in [
-                ("total_runners", "SELECT COUNT(*) FROM runners"),
-                ("total_races", "SELECT COUNT(*) FROM races"),
-                ("total_results", "SELECT COUNT(*) FROM results"),
-                ("races_with_protocols", "SELECT COUNT(DISTINCT race_id) FROM results"),
-                ("runners_with_telegram", "SELECT COUNT(*) FROM runners WHERE telegram_id IS NOT NULL"),
-                ("total_subscriptions", "SELECT COUNT(*) FROM race_subscriptions"),
-                ("total_feedback", "SELECT COUNT(*) FROM feedback"),
-                ("result_claims_pending", "SELECT COUNT(*) FROM result_claims WHERE status='pending'"),
-                ("result_claims_approved", "SELECT COUNT(*) FROM result_claims WHERE status='approved'"),
-                ("race_submissions_pending", "SELECT COUNT(*) FROM race_submissions WHERE status='pending'"),
-            ]:
-                async with self.db.execute(sql) as c:
-                    out[name] = (await c.fetchone())[0] or 0
-            # Регистрации за период
-            async with self.db.execute(
-                "SELECT COUNT(*) FROM runners WHERE date(created_at) >= date(?, '-7 days')", (today,)
-            ) as c:
-                out["registrations_7d"] = (await c.fetchone())[0] or 0
-            async with self.db.execute(
-                "SELECT COUNT(*) FROM runners WHERE date(created_at) >= date(?, '-30 days')", (today,)
-            ) as c:
-                out["registrations_30d"] = (await c.fetchone())[0] or 0
-            # Забеги по периодам
-            for period, from_d, to_d in [
-                ("races_2023", "2023-01-01", "2024-01-01"),
-                ("races_2024", "2024-01-01", "2025-01-01"),
-                ("races_2025", "2025-01-01", "2026-01-01"),
-                ("races_2026", "2026-01-01", "2027-01-01"),
-                ("races_upcoming", today, "2099-12-31"),
-            ]:
-                async with self.db.execute(
-                    "SELECT COUNT(*) FROM races WHERE date >= ? AND date < ? AND is_active=1",
-                    (from_d, to_d),
-                ) as c:
-                    out[period] = (await c.fetchone())[0] or 0
-
-        elif section == "runners":
+            if not refresh:
+                snapshot = await self.get_analytics_snapshot("overview")
+                cache_hit("analytics_snapshot", snapshot is not None)
+                if snapshot is not None:
+                    return snapshot
+            return await self.refresh_analytics_snapshot("overview")
+
+        out = {}
+        if section == "runners":
             async with self.db.execute(
                 "SELECT city, COUNT(*) as cnt FROM runners WHERE city IS NOT NULL AND city != '' GROUP BY city ORDER BY cnt DESC LIMIT 15"
             ) as c:
@@ -855,10 +1640,11 @@ class Database:
                 "SELECT gender, COUNT(*) as cnt FROM runners WHERE gender IS NOT NULL GROUP BY gender"
             ) as c:
                 out["by_gender"] = [dict(row) for row in await c.fetchall()]
-            async with self.db.execute(
-                "SELECT date(created_at) as d, COUNT(*) as cnt FROM runners GROUP BY d ORDER BY d DESC LIMIT 14"
-            ) as c:
-                out["registrations_by_day"] = [dict(row) for row in await c.fetchall()]
+            since = (datetime.now(timezone.utc) - timedelta(days=13)).strftime("%Y-%m-%d")
+            out["registrations_by_day"] = [
+                {"d": row["key"], "cnt": row["cnt"]}
+                for row in reversed(await self.get_daily_rollup("runners", date_from=since))
+            ]
             out["total"] = await self.get_total_runners()
 
         elif section == "races":
@@ -879,21 +1665,30 @@ class Database:
             ) as c:
                 out["with_protocol_url"] = (await c.fetchone())[0] or 0
             async with self.db.execute(
-                "SELECT COUNT(*) FROM races r WHERE EXISTS (SELECT 1 FROM results res WHERE res.race_id=r.id) AND r.is_active=1"
+                "SELECT COUNT(*) FROM races WHERE results_count > 0 AND is_active=1"
             ) as c:
                 out["with_imported_results"] = (await c.fetchone())[0] or 0
+            since = (datetime.now(timezone.utc) - timedelta(days=29)).strftime("%Y-%m-%d")
+            out["added_by_source_30d"] = await self.get_daily_rollup(
+                "races", date_from=since, group_by="source"
+            )
             out["total"] = await self.get_total_races()
 
         elif section == "results":
             out["total"] = await self.get_total_results()
             async with self.db.execute(
-                "SELECT rac.name, rac.date, COUNT(res.id) as cnt FROM results res JOIN races rac ON res.race_id=rac.id GROUP BY res.race_id ORDER BY cnt DESC LIMIT 10"
+                "SELECT name, date, results_count as cnt FROM races WHERE results_count > 0 ORDER BY results_count DESC LIMIT 10"
             ) as c:
                 out["top_races_by_results"] = [dict(row) for row in await c.fetchall()]
+            # Текущее состояние (после удалений) — по самой таблице, не по журналу импортов
             async with self.db.execute(
                 "SELECT distance, COUNT(*) as cnt FROM results WHERE distance IS NOT NULL AND distance != '' GROUP BY distance ORDER BY cnt DESC LIMIT 15"
             ) as c:
                 out["by_distance"] = [dict(row) for row in await c.fetchall()]
+            since = (datetime.now(timezone.utc) - timedelta(days=29)).strftime("%Y-%m-%d")
+            out["imported_by_organizer_30d"] = (
+                await self.get_daily_rollup("results", date_from=since, group_by="organizer")
+            )[:10]
 
         elif section == "claims":
             async with self.db.execute(
@@ -942,6 +1737,122 @@ class Database:
 
         return out
 
+    async def compute_overview_analytics(self) -> dict:
+        """
+        Обзор сервиса за три агрегирующих запроса (условные SUM вместо ~17 COUNT(*)).
+        total_results и races_with_protocols берутся из счётчиков races.
+        """
+        out = {}
+        today = date.today().isoformat()
+
+        async with self.db.execute(
+            """
+            SELECT COUNT(*) AS total_runners,
+                   SUM(CASE WHEN telegram_id IS NOT NULL THEN 1 ELSE 0 END) AS runners_with_telegram,
+                   SUM(CASE WHEN date(created_at) >= date(:today, '-7 days') THEN 1 ELSE 0 END) AS registrations_7d,
+                   SUM(CASE WHEN date(created_at) >= date(:today, '-30 days') THEN 1 ELSE 0 END) AS registrations_30d
+            FROM runners
+            """,
+            {"today": today},
+        ) as c:
+            out.update(dict(await c.fetchone()))
+
+        async with self.db.execute(
+            """
+            SELECT COUNT(*) AS total_races,
+                   SUM(results_count) AS total_results,
+                   SUM(CASE WHEN results_count > 0 THEN 1 ELSE 0 END) AS races_with_protocols,
+                   SUM(CASE WHEN is_active = 1 AND date >= '2023-01-01' AND date < '2024-01-01' THEN 1 ELSE 0 END) AS races_2023,
+                   SUM(CASE WHEN is_active = 1 AND date >= '2024-01-01' AND date < '2025-01-01' THEN 1 ELSE 0 END) AS races_2024,
+                   SUM(CASE WHEN is_active = 1 AND date >= '2025-01-01' AND date < '2026-01-01' THEN 1 ELSE 0 END) AS races_2025,
+                   SUM(CASE WHEN is_active = 1 AND date >= '2026-01-01' AND date < '2027-01-01' THEN 1 ELSE 0 END) AS races_2026,
+                   SUM(CASE WHEN is_active = 1 AND date >= :today THEN 1 ELSE 0 END) AS races_upcoming
+            FROM races
+            """,
+            {"today": today},
+        ) as c:
+            out.update(dict(await c.fetchone()))
+
+        async with self.db.execute(
+            """
+            SELECT (SELECT COUNT(*) FROM race_subscriptions) AS total_subscriptions,
+                   (SELECT COUNT(*) FROM feedback) AS total_feedback,
+                   (SELECT COUNT(*) FROM race_submissions WHERE status = 'pending') AS race_submissions_pending,
+                   SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) AS result_claims_pending,
+                   SUM(CASE WHEN status = 'approved' THEN 1 ELSE 0 END) AS result_claims_approved
+            FROM result_claims
+            """
+        ) as c:
+            out.update(dict(await c.fetchone()))
+
+        return {k: v or 0 for k, v in out.items()}
+
+    async def refresh_analytics_snapshot(self, section: str = "overview") -> dict:
+        """
+        Пересчитать снимок раздела аналитики и сохранить в analytics_snapshots.
+        Вызывается планировщиком, после парсинга и сбора протоколов.
+        section — раздел из SNAPSHOT_SECTIONS (пока снимок есть только у overview)
+        """
+        compute = SNAPSHOT_SECTIONS.get(section)
+        if compute is None:
+            raise ValueError(f"Нет снимка для раздела аналитики: {section}")
+        data = await getattr(self, compute)()
+        computed_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        await self.db.execute(
+            """
+            INSERT INTO analytics_snapshots (section, data, computed_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(section) DO UPDATE SET
+                data = excluded.data,
+                computed_at = excluded.computed_at
+            """,
+            (section, json.dumps(data), computed_at),
+        )
+        await self.db.commit()
+        data["computed_at"] = computed_at
+        return data
+
+    async def get_analytics_snapshot(self, section: str = "overview") -> Optional[dict]:
+        """Снимок аналитики с полем computed_at (UTC) или None, если снимка ещё нет"""
+        async with self.db.execute(
+            "SELECT data, computed_at FROM analytics_snapshots WHERE section = ?",
+            (section,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        data = json.loads(row["data"])
+        data["computed_at"] = row["computed_at"]
+        return data
+
+    async def get_job_run(self, job: str) -> Optional[dict]:
+        """Последний прогон задачи планировщика (result — разобранный JSON) или None"""
+        async with self.db.execute("SELECT * FROM job_runs WHERE job = ?", (job,)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        run = dict(row)
+        run["result"] = json.loads(run["result"]) if run["result"] else None
+        return run
+
+    async def save_job_run(self, job: str, started_at: str, finished_at: str,
+                           success: bool, result: Optional[dict] = None):
+        """Записать прогон задачи; last_success_at обновляется только при success"""
+        await self.db.execute(
+            """
+            INSERT INTO job_runs (job, started_at, finished_at, last_success_at, result)
+            VALUES (?, ?, ?, CASE WHEN ? THEN ? END, ?)
+            ON CONFLICT(job) DO UPDATE SET
+                started_at = excluded.started_at,
+                finished_at = excluded.finished_at,
+                last_success_at = COALESCE(excluded.last_success_at, job_runs.last_success_at),
+                result = excluded.result
+            """,
+            (job, started_at, finished_at, success, finished_at,
+             json.dumps(result, ensure_ascii=False) if result is not None else None),
+        )
+        await self.db.commit()
+
     # ============================================
     # ПОДПИСКИ НА ЗАБЕГИ
     # ============================================
@@ -1054,6 +1965,7 @@ class Database:
         )
         
         await self.db.commit()
+        await self.rebuild_stale_leaderboards()
         return True
     
     async def delete_race(self, race_id: int) -> Dict[str, int]:
@@ -1103,6 +2015,7 @@ class Database:
         )
         
         await self.db.commit()
+        await self.rebuild_stale_leaderboards()
         return stats
     
     async def delete_races_by_organizer(self, organizer: str) -> Dict[str, int]:
@@ -1166,6 +2079,7 @@ class Database:
         )
         
         await self.db.commit()
+        await self.rebuild_stale_leaderboards()
         return stats
 
     # ============================================
@@ -1188,12 +2102,9 @@ class Database:
         """Получить забеги организатора (по строке organizer) — для сценария привязки"""
         async with self.db.execute(
             """
-            SELECT r.*, COUNT(res.id) as results_count
-            FROM races r
-            LEFT JOIN results res ON r.id = res.race_id
-            WHERE r.organizer = ? AND r.is_active = 1
-            GROUP BY r.id
-            ORDER BY r.date DESC
+            SELECT * FROM races
+            WHERE organizer = ? AND is_active = 1
+            ORDER BY date DESC
             """,
             (organizer_name,)
         ) as cursor:
@@ -0,0 +1,108 @@
+"""
+Seido - Канонические дистанции и возрастные группы
+В results.distance лежит текст из протокола («5 км», «5км», «5.0», «5000 м», «Полумарафон»),
+для рейтингов и рекордов используется целое число метров results.distance_m.
+"""
+import re
+from typing import Optional
+
+# Стандартные дистанции, которые пишут округлённо: 21.1 / 21.0975 / «21 км» — один полумарафон
+STANDARD_DISTANCES = {
+    21000: 21097,
+    21100: 21097,
+    21098: 21097,
+    42000: 42195,
+    42200: 42195,
+    42190: 42195,
+}
+NAMED_DISTANCES = (
+    ("полумарафон", 21097),
+    ("half", 21097),
+    ("марафон", 42195),
+    ("marathon", 42195),
+)
+MILE_M = 1609
+
+_NUMBER_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+_UNIT_RE = re.compile(r"\s*([a-zа-яё]+)")
+
+# Возрастные группы: по возрасту в году забега, нижние границы
+AGE_GROUP_BOUNDS = (20, 30, 40, 50, 60, 70)
+
+
+def distance_meters(text) -> Optional[int]:
+    """
+    Дистанция из протокола → метры (5 км → 5000, 5000 м → 5000, 21.1 км → 21097).
+    Число без единиц до 200 считается километрами, больше — метрами.
+    None, если число не найдено (эстафета, «детский забег» и т. п.).
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        value, unit = float(text), ""
+    else:
+        s = str(text).strip().lower()
+        if not s:
+            return None
+        match = _NUMBER_RE.search(s)
+        if not match:
+            for name, meters in NAMED_DISTANCES:
+                if name in s:
+                    return meters
+            return None
+        value = float(match.group(1).replace(",", "."))
+        unit_match = _UNIT_RE.match(s, match.end())
+        unit = unit_match.group(1) if unit_match else ""
+
+    if unit.startswith(("mi", "мил")):
+        meters = value * MILE_M
+    elif unit.startswith(("к", "k")):
+        meters = value * 1000
+    elif unit.startswith(("м", "m")):
+        meters = value
+    else:
+        meters = value * 1000 if value <= 200 else value
+    meters = int(round(meters))
+    if meters <= 0:
+        return None
+    return STANDARD_DISTANCES.get(meters, meters)
+
+
+def distance_label(meters: Optional[int]) -> str:
+    """Метры → подпись: 5000 → «5 км», 21097 → «21.1 км», 800 → «800 м»"""
+    if not meters:
+        return ""
+    if meters < 1000:
+        return f"{meters} м"
+    km = f"{meters / 1000:.1f}".rstrip("0").rstrip(".")
+    return f"{km} км"
+
+
+def age_group_for(birth_date: Optional[str], race_date: Optional[str]) -> Optional[str]:
+    """Возрастная группа по году рождения и году забега: «до 20», «30-39», ..., «70+»"""
+    if not birth_date or not race_date:
+        return None
+    try:
+        age = int(str(race_date)[:4]) - int(str(birth_date)[:4])
+    except ValueError:
+        return None
+    if age < 5 or age > 110:
+        return None
+    if age < AGE_GROUP_BOUNDS[0]:
+        return f"до {AGE_GROUP_BOUNDS[0]}"
+    for low, high in zip(AGE_GROUP_BOUNDS, AGE_GROUP_BOUNDS[1:]):
+        if age < high:
+            return f"{low}-{high - 1}"
+    return f"{AGE_GROUP_BOUNDS[-1]}+"
+
+
+def age_group_sql(birth_date: str, race_date: str) -> str:
+    """То же, что age_group_for, выражением SQLite (для пересчёта рейтингов одним запросом)"""
+    age = f"(CAST(substr({race_date}, 1, 4) AS INTEGER) - CAST(substr({birth_date}, 1, 4) AS INTEGER))"
+    cases = [f"WHEN {age} < {AGE_GROUP_BOUNDS[0]} THEN 'до {AGE_GROUP_BOUNDS[0]}'"]
+    for low, high in zip(AGE_GROUP_BOUNDS, AGE_GROUP_BOUNDS[1:]):
+        cases.append(f"WHEN {age} < {high} THEN '{low}-{high - 1}'")
+    return (
+        f"CASE WHEN {birth_date} GLOB '[12][0-9][0-9][0-9]*' AND {race_date} GLOB '[12][0-9][0-9][0-9]*' "
+        f"AND {age} BETWEEN 5 AND 110 THEN CASE {' '.join(cases)} ELSE '{AGE_GROUP_BOUNDS[-1]}+' END END"
+    )
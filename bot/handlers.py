@@ -1,18 +1,24 @@
 """
 Seido Bot - Обработчики команд
 """
+import os
+
 from aiogram import Router, F, types
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
     ReplyKeyboardMarkup, KeyboardButton,
-    InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery,
+    InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile,
 )
 
 from db import db
+from distances import distance_label
 from config import PROJECT_NAME, PROJECT_TAGLINE, ADMINS, DEVELOPER_ID
-from parsers.scheduler import run_parse
+from parsers.scheduler import run_parse, scheduler as parse_scheduler
+from profiling import MODES as PROFILE_MODES, is_profiling, profiled
+from query_stats import query_stats
+from tracing import traced, tracer
 
 router = Router()
 
@@ -755,13 +761,15 @@ async def cb_profile_records(callback: CallbackQuery):
 
     text = "🏆 Личные рекорды\n\n"
     text += "Рассчитаны только из результатов в базе (ручной ввод не предусмотрен).\n\n"
-    for b in sorted(bests, key=lambda x: (x.get('distance') or '')):
-        dist = b.get('distance', '?')
+    for b in sorted(bests, key=lambda x: (x.get('distance_m') or 10**9, x.get('distance') or '')):
+        dist = distance_label(b.get('distance_m')) or b.get('distance', '?')
         sec = b.get('finish_time_seconds')
         time_str = b.get('finish_time') or _format_seconds(sec)
         race = b.get('race_name', '—')
         date = b.get('race_date', '')
-        text += f"• {dist}: {time_str}\n  {race} ({date})\n\n"
+        rank = await db.get_runner_rank(user['id'], b['distance_m']) if b.get('distance_m') else None
+        rank_str = f" — {rank} место в рейтинге Seido" if rank else ""
+        text += f"• {dist}: {time_str}{rank_str}\n  {race} ({date})\n\n"
 
     await callback.answer()
     await callback.message.answer(text)
@@ -941,6 +949,7 @@ async def cmd_help(message: types.Message):
 # КАЛЕНДАРЬ ЗАБЕГОВ (с пагинацией и поиском)
 # ============================================
 
+@traced("format")
 def _format_race(race: dict, show_type: bool = False, show_protocol: bool = True) -> str:
     """Форматирование одного забега для вывода"""
     import json
@@ -1084,10 +1093,13 @@ async def cb_race_card(callback: CallbackQuery):
         await callback.answer("Забег не найден")
         return
 
-    _, total_in_protocol = await db.get_race_results(race_id, limit=1, offset=0)
+    total_in_protocol = race.get("results_count") or 0
+    distances_count = race.get("distances_with_results") or 0
 
     text = _format_race(race, show_type=True)
     text += f"\n\n📊 Финишеров в протоколе: {total_in_protocol}"
+    if distances_count > 1:
+        text += f" (дистанций: {distances_count})"
 
     buttons = []
     if total_in_protocol > 0:
@@ -1431,20 +1443,34 @@ async def cb_history_page(callback: CallbackQuery):
 # ============================================
 @router.message(Command("parse"))
 async def cmd_parse(message: types.Message):
-    """Ручной запуск парсинга забегов (только для админов)"""
+    """Ручной запуск парсинга забегов (только для админов); если парсинг уже идёт — его ход"""
     if message.from_user.id not in ADMINS or ADMINS[0] == 0:
         await message.answer("⚠️ Эта команда доступна только администраторам.")
         return
 
-    await message.answer("🔄 Запускаю парсинг забегов...\n\nЭто может занять несколько минут.")
+    if parse_scheduler.is_running:
+        await message.answer(_format_parse_progress(parse_scheduler.progress))
+        return
+
+    last_run = await db.get_job_run("parse_all")
+    last_line = ""
+    if last_run and last_run["last_success_at"]:
+        last_line = f"Последний успешный: {last_run['last_success_at']} UTC\n"
+    await message.answer(f"🔄 Запускаю парсинг забегов...\n{last_line}\nЭто может занять несколько минут. "
+                         f"Ход парсинга — повторной командой /parse.")
 
     try:
         results = await run_parse()
+        if not results:
+            # Параллельно стартовал другой прогон (ночной или первичный)
+            await message.answer(_format_parse_progress(parse_scheduler.progress))
+            return
         total = sum(results.values())
 
         response = "✅ **Парсинг завершён!**\n\n"
         for source, count in results.items():
-            response += f"• {source}: {count} забегов\n"
+            mark = " ⚠️" if source in parse_scheduler.progress.get("errors", {}) else ""
+            response += f"• {_escape_md(source)}: {count} забегов{mark}\n"
         response += f"\n📊 Всего добавлено: {total}"
 
         await message.answer(response)
@@ -1452,6 +1478,26 @@ async def cmd_parse(message: types.Message):
         await message.answer(f"❌ Ошибка парсинга: {e}")
 
 
+def _format_parse_progress(progress: dict) -> str:
+    """Ход идущего парсинга для /parse"""
+    triggers = {"startup": "первичный", "cron": "ночной", "manual": "ручной"}
+    results = progress.get("results", {})
+    errors = progress.get("errors", {})
+    lines = [
+        f"⏳ **Идёт парсинг** ({triggers.get(progress.get('trigger'), progress.get('trigger'))}, "
+        f"с {progress.get('started_at')} UTC)",
+        f"Источников: {progress.get('done', 0)} из {progress.get('total', 0)}",
+    ]
+    if progress.get("current"):
+        lines.append(f"Сейчас: {_escape_md(progress['current'])}")
+    if results:
+        lines.append("")
+        for source, count in results.items():
+            lines.append(f"• {_escape_md(source)}: {'ошибка' if source in errors else f'{count} забегов'}")
+        lines.append(f"\n📊 Добавлено пока: {sum(results.values())}")
+    return "\n".join(lines)
+
+
 # ============================================
 # КОМАНДА /delete - Удаление данных
 # ============================================
@@ -1518,6 +1564,58 @@ async def cmd_admin_collect(message: types.Message):
         await message.answer(f"❌ Ошибка: {e}")
 
 
+# ============================================
+# АДМИН: Профилирование сбора и парсинга
+# ============================================
+@router.message(Command("admin_profile"))
+async def cmd_admin_profile(message: types.Message):
+    """Один прогон парсинга или сбора под профилировщиком: итог по этапам и файлы для flamegraph"""
+    if message.from_user.id not in ADMINS or ADMINS[0] == 0:
+        await message.answer("⚠️ Только для администраторов.")
+        return
+
+    parts = message.text.split()
+    target = parts[1].lower() if len(parts) > 1 else ""
+    mode = parts[2].lower() if len(parts) > 2 else "sample"
+    if target not in ("parse", "collect") or mode not in PROFILE_MODES:
+        await message.answer(
+            "🔬 Профилирование одного прогона\n\n"
+            "• /admin_profile parse — парсинг забегов (как /parse)\n"
+            "• /admin_profile collect — сбор результатов (как /admin_collect)\n\n"
+            "Режим третьим словом: sample (по умолчанию — время по этапам, .folded для flamegraph) "
+            "или cprofile (.prof: snakeviz, flameprof).",
+            parse_mode=None,
+        )
+        return
+    if is_profiling():
+        await message.answer("⏳ Профилирование уже идёт — дождитесь его отчёта.")
+        return
+    if target == "parse" and parse_scheduler.is_running:
+        await message.answer(_format_parse_progress(parse_scheduler.progress))
+        return
+
+    what = "парсинг забегов" if target == "parse" else "сбор результатов"
+    await message.answer(f"🔬 Запускаю {what} под профилировщиком ({mode})...")
+    try:
+        async with profiled(target, mode) as profiler:
+            if target == "parse":
+                await run_parse()
+            else:
+                from bot.scripts.collect_results import run_collect
+                await run_collect()
+    except Exception as e:
+        await message.answer(f"❌ Ошибка прогона: {e}\nПрофиль до ошибки — в logs/profiles/.")
+        return
+
+    text = profiler.report.format()
+    if len(text) > 4000:
+        text = text[:4000] + "\n…"
+    await message.answer(text, parse_mode=None)
+    for path in profiler.report.files:
+        if os.path.exists(path):
+            await message.answer_document(FSInputFile(path))
+
+
 # ============================================
 # АДМИН: Заявки «это я»
 # ============================================
@@ -1695,6 +1793,8 @@ def _format_dev_overview(data: dict) -> str:
     t += f"• Заявок «это я» approved: {data.get('result_claims_approved', 0)}\n"
     t += f"• Заявок на забеги pending: {data.get('race_submissions_pending', 0)}\n\n"
     t += "_⚠ Время в боте, кол-во запросов по командам — требуют таблицы events (логирование)_"
+    if data.get("computed_at"):
+        t += f"\n_Данные на {data['computed_at']} UTC (🔄 — пересчитать)_"
     return t
 
 
@@ -1730,6 +1830,10 @@ def _format_dev_section(section: str, data: dict) -> str:
             t += "\nТоп локаций:\n"
             for r in data["top_locations"][:5]:
                 t += f"  {r['location']}: {r['cnt']}\n"
+        if data.get("added_by_source_30d"):
+            t += "\nДобавлено за 30 дн (по источникам):\n"
+            for r in data["added_by_source_30d"][:8]:
+                t += f"  {r['key']}: {r['cnt']}\n"
         return t
     if section == "results":
         t = "📈 **Результаты**\n\n"
@@ -1743,6 +1847,10 @@ def _format_dev_section(section: str, data: dict) -> str:
             t += "\nПо дистанциям:\n"
             for r in data["by_distance"][:10]:
                 t += f"  {r['distance']}: {r['cnt']}\n"
+        if data.get("imported_by_organizer_30d"):
+            t += "\nИмпорт за 30 дн (по организаторам):\n"
+            for r in data["imported_by_organizer_30d"][:8]:
+                t += f"  {r['key']}: {r['cnt']}\n"
         return t
     if section == "claims":
         t = "🔗 **Заявки «это я»**\n\n"
@@ -1776,18 +1884,68 @@ def _format_dev_section(section: str, data: dict) -> str:
                 name = (r.get("name") or "")[:30]
                 t += f"  {name} ({r.get('date','')}): {r['cnt']}\n"
         return t
+    if section == "queries":
+        return _format_dev_queries(data)
+    if section == "traces":
+        return _format_dev_traces(data)
     return "Нет данных"
 
 
+def _format_dev_traces(data: dict) -> str:
+    """Самые медленные из последних апдейтов с разбивкой по БД / Bot API / форматированию / коду"""
+    kinds = {"db": "БД", "api": "API", "format": "формат", "code": "код"}
+    traces = data.get("slowest", [])
+    t = f"🧭 **Медленные апдейты** (из последних {data.get('traces', 0)})\n\n"
+    if not traces:
+        return t + "Апдейтов ещё не было."
+    for tr in traces:
+        t += f"{tr['ts'][11:]} {_escape_md(tr['handler'])} — {tr['duration_ms']:.0f} мс"
+        t += " ❌\n" if tr["status"] == "error" else "\n"
+        parts = []
+        for kind, b in sorted(tr["breakdown"].items(), key=lambda kv: -kv[1]["ms"]):
+            count = f"×{b['count']}" if kind != "code" else ""
+            parts.append(f"{kinds.get(kind, kind)} {b['ms']:.0f}{count}")
+        t += "  " + ", ".join(parts) + "\n"
+        worst = max((s for s in tr["spans"] if s["kind"] != "format"), key=lambda s: s["ms"], default=None)
+        if worst:
+            t += f"  ↳ {_escape_md(worst['name'])} {worst['ms']:.0f} мс\n"
+    t += f"\nЗаписано в журнал трасс (logs/): {data.get('written', 0)}"
+    return t[:3900]
+
+
+def _format_dev_queries(data: dict) -> str:
+    """Время запросов к SQLite по методам Database и последние медленные (query_stats)"""
+    t = f"🐢 **Запросы БД** (за {data.get('uptime_s', 0) // 60} мин)\n\n"
+    methods = data.get("methods", [])
+    if not methods:
+        return t + "Запросов ещё не было."
+    t += "Метод: вызовов, ср/p95/макс мс, строк\n"
+    for m in methods[:12]:
+        t += (f"  {_escape_md(m['method'])}: {m['calls']}, "
+              f"{m['avg_ms']:.1f}/{m['p95_ms']:g}/{m['max_ms']:.0f}, {m['rows']}")
+        t += f", ошибок {m['errors']}\n" if m["errors"] else "\n"
+    slow = data.get("slow", [])
+    t += f"\nМедленные (> {data.get('slow_ms', 0):g} мс): {len(slow)}\n"
+    for q in slow[:3]:
+        t += f"\n{q['at']} {_escape_md(q['method'])} — {q['ms']:.0f} мс, строк {q['rows']}\n"
+        t += f"`{q['sql'][:150].replace('`', '')}`\n"
+        for line in q["plan"][:4]:
+            t += f"  ↳ {_escape_md(line)}\n"
+    return t[:3900]
+
+
 def _get_developer_menu_kb() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📊 Обзор", callback_data="dev:overview")],
+        [InlineKeyboardButton(text="📊 Обзор", callback_data="dev:overview"),
+         InlineKeyboardButton(text="🔄 Пересчитать", callback_data="dev:refresh")],
         [InlineKeyboardButton(text="👥 Бегуны", callback_data="dev:runners"),
          InlineKeyboardButton(text="🏁 Забеги", callback_data="dev:races")],
         [InlineKeyboardButton(text="📈 Результаты", callback_data="dev:results"),
          InlineKeyboardButton(text="🔗 Заявки «это я»", callback_data="dev:claims")],
         [InlineKeyboardButton(text="💬 Обратная связь", callback_data="dev:feedback"),
          InlineKeyboardButton(text="📋 Подписки", callback_data="dev:subscriptions")],
+        [InlineKeyboardButton(text="🐢 Запросы БД", callback_data="dev:queries"),
+         InlineKeyboardButton(text="🧭 Медленные апдейты", callback_data="dev:traces")],
     ])
 
 
@@ -1813,7 +1971,15 @@ async def cb_developer_section(callback: CallbackQuery):
         return
 
     section = callback.data.split(":")[1] if ":" in callback.data else "overview"
-    data = await db.get_developer_analytics(section)
+    if section == "refresh":
+        section = "overview"
+        data = await db.get_developer_analytics(section, refresh=True)
+    elif section == "queries":
+        data = query_stats.snapshot()
+    elif section == "traces":
+        data = {"slowest": tracer.slowest(8), "traces": len(tracer.recent), **tracer.stats}
+    else:
+        data = await db.get_developer_analytics(section)
     text = _format_dev_section(section, data)
     text += "\n_◀ Меню: /developer_"
     await callback.message.edit_text(text, reply_markup=_get_developer_menu_kb())
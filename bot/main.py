@@ -19,11 +19,18 @@ os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, f"bot_{datetime.now().strftime('%Y%m%d')}.log")
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.types import BotCommand
-from config import BOT_TOKEN, PROJECT_NAME, HEALTHCHECK_URL
+from config import (
+    BOT_TOKEN, PROJECT_NAME, HEALTHCHECK_URL, BOT_MODE, TELEGRAM_API_URL, METRICS_HOST, METRICS_PORT,
+)
 from db import db
 from handlers import router
+from metrics import HEALTHCHECK_PINGS, start_metrics_server
+from middlewares import api_tracing, throttling, update_metrics, update_tracing
 from parsers.scheduler import scheduler as parse_scheduler
 
 # Настройка логгирования
@@ -43,9 +50,22 @@ logging.basicConfig(
 )
 
 # Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN, parse_mode=ParseMode.MARKDOWN)
+# TELEGRAM_API_URL — свой Bot API (например, fake-сервер: python -m bot.scripts.fake_telegram)
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
 dp = Dispatcher()
 
+# Метрики апдейтов — самым внешним, чтобы считались и сброшенные ограничением
+dp.update.outer_middleware(update_metrics)
+# Трасса на апдейт: запросы к БД и вызовы Bot API — дочерние спаны (tracing.py)
+dp.update.outer_middleware(update_tracing)
+bot.session.middleware(api_tracing)
+# Ограничение частоты и общий лимит параллельной обработки (см. middlewares.py)
+dp.update.outer_middleware(throttling)
+
+# Локальный сервер GET /metrics в режиме polling (в webhook — маршрут того же приложения)
+_metrics_runner = None
+
 # Регистрируем роутер с обработчиками
 dp.include_router(router)
 
@@ -73,16 +93,14 @@ async def on_startup():
     # Запуск планировщика парсинга
     parse_scheduler.start()
     
-    # Первичный парсинг забегов
-    print("🔄 Запуск первичного парсинга забегов...")
-    try:
-        results = await parse_scheduler.parse_all()
-        total = sum(results.values())
-        print(f"✅ Парсинг завершён. Добавлено забегов: {total}")
-    except Exception as e:
-        print(f"⚠️ Ошибка парсинга: {e}")
+    # Первичный парсинг забегов — в фоне, бот начинает отвечать сразу (ход — в /parse)
+    if await parse_scheduler.start_initial_parse():
+        print("🔄 Первичный парсинг забегов запущен в фоне (ход — /parse)")
+    else:
+        print("⏭ Первичный парсинг пропущен: недавно был успешный")
     
-    # Пинг мониторинга (Healthchecks.io) — раз в 4 мин
+    # Пинг мониторинга (Healthchecks.io) — раз в 4 мин.
+    # В режиме webhook вместо него мониторинг опрашивает GET /health
     async def _healthcheck_loop():
         if not HEALTHCHECK_URL:
             return
@@ -91,13 +109,22 @@ async def on_startup():
             try:
                 async with aiohttp.ClientSession() as session:
                     await session.get(HEALTHCHECK_URL, timeout=aiohttp.ClientTimeout(total=5))
+                HEALTHCHECK_PINGS.inc(result="ok")
             except Exception:
-                pass
+                HEALTHCHECK_PINGS.inc(result="error")
             await asyncio.sleep(240)  # 4 мин
 
-    if HEALTHCHECK_URL:
+    if HEALTHCHECK_URL and BOT_MODE != "webhook":
         asyncio.create_task(_healthcheck_loop())
 
+    global _metrics_runner
+    if METRICS_PORT and BOT_MODE != "webhook":
+        try:
+            _metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+            print(f"📈 Метрики: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"⚠️ Сервер метрик не запущен ({METRICS_HOST}:{METRICS_PORT}): {e}")
+
     print(f"✅ Бот {PROJECT_NAME} запущен!\n")
 
 
@@ -105,6 +132,8 @@ async def on_shutdown():
     """Действия при остановке"""
     print(f"\n🛑 Остановка бота {PROJECT_NAME}...")
     parse_scheduler.stop()
+    if _metrics_runner:
+        await _metrics_runner.cleanup()
     await db.disconnect()
     await bot.session.close()
     print(f"✅ Бот {PROJECT_NAME} остановлен\n")
@@ -116,8 +145,13 @@ async def main():
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
 
-    # Запускаем polling
-    await dp.start_polling(bot)
+    if BOT_MODE == "webhook":
+        from webhook_server import run_webhook
+        await run_webhook(dp, bot)
+    else:
+        # Запускаем polling (webhook, оставшийся от режима webhook, мешает getUpdates)
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+"""
+Seido Bot - Метрики в формате Prometheus
+Реестр счётчиков, gauge и гистограмм без внешних зависимостей; текст для скрейпа
+отдаёт GET /metrics — отдельный локальный сервер (METRICS_HOST:METRICS_PORT) в режиме
+polling или маршрут приложения webhook. Проверка без Prometheus:
+  curl http://127.0.0.1:9101/metrics
+"""
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм времени по умолчанию, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Больше разных наборов меток на метрику не заводится — остальное уходит в "other"
+MAX_SERIES = 200
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        if key not in self._series and len(self._series) >= MAX_SERIES:
+            key = tuple("other" for _ in self.labelnames)
+        return key
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._series[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [счётчики корзин..., +Inf], сумма
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total) in sorted(self._series.items()):
+            lines.extend(histogram_lines(self.name, self.labelnames, key, self.buckets, counts, total))
+        return lines
+
+
+def histogram_lines(name: str, labelnames: Sequence[str], labelvalues: Sequence[str],
+                    buckets: Sequence[float], counts: Sequence[int], total: float) -> List[str]:
+    """Строки _bucket/_sum/_count по счётчикам корзин (не накопленным, последний — +Inf)"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + [float("inf")], counts):
+        cumulative += count
+        le = 'le="' + _format_value(bound) + '"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+    labels = _format_labels(labelnames, labelvalues)
+    lines.append(f"{name}_sum{labels} {_format_value(total)}")
+    lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
+
+
+class Registry:
+    """Метрики процесса и сборщики — функции, которые отдают строки в момент скрейпа"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[str]]] = {}
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def register_collector(self, name: str, collect: Callable[[], Iterable[str]]) -> None:
+        """Сборщик с уже занятым именем не заменяется (модуль-двойник bot.* регистрирует свой)"""
+        self._collectors.setdefault(name, collect)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP seido_process_start_time_seconds Время запуска процесса (unix)",
+            "# TYPE seido_process_start_time_seconds gauge",
+            f"seido_process_start_time_seconds {_format_value(round(self.started_at, 3))}",
+        ]
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, collect in self._collectors.items():
+            try:
+                lines.extend(collect())
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# Один реестр на процесс, даже если модуль импортирован и как metrics (бот),
+# и как bot.metrics (скрипты, /admin_collect)
+_twin = sys.modules.get("bot.metrics" if __name__ == "metrics" else "metrics")
+registry: Registry = getattr(_twin, "registry", None) or Registry()
+
+
+# ============================================
+# МЕТРИКИ БОТА
+# ============================================
+UPDATES = registry.counter(
+    "seido_updates_total", "Апдейты Telegram по типу", ("type",))
+HANDLER_SECONDS = registry.histogram(
+    "seido_handler_seconds", "Время обработки апдейта по команде / префиксу callback", ("handler",))
+HANDLER_ERRORS = registry.counter(
+    "seido_handler_errors_total", "Исключения в обработчиках", ("handler",))
+
+PARSER_SECONDS = registry.histogram(
+    "seido_parser_seconds", "Время парсинга одного источника забегов", ("source",),
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+PARSER_RACES = registry.counter(
+    "seido_parser_races_total", "Забегов получено парсером", ("source",))
+PARSER_ADDED = registry.counter(
+    "seido_parser_added_total", "Новых забегов добавлено в БД", ("source",))
+PARSER_ERRORS = registry.counter(
+    "seido_parser_errors_total", "Ошибки парсеров", ("source",))
+PARSE_SWEEP_SECONDS = registry.gauge(
+    "seido_parse_sweep_seconds", "Длительность последнего прогона parse_all", ("trigger",))
+PARSE_LAST_SUCCESS = registry.gauge(
+    "seido_parse_last_success_timestamp_seconds", "Время последнего успешного парсинга (unix)")
+
+PROTOCOL_ROWS = registry.counter(
+    "seido_protocol_rows_total", "Строк протоколов импортировано в results", ("source",))
+PROTOCOL_IMPORT_SECONDS = registry.histogram(
+    "seido_protocol_import_seconds", "Время импорта одного протокола", ("source",),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+PROTOCOL_ROWS_PER_SECOND = registry.gauge(
+    "seido_protocol_rows_per_second", "Скорость импорта последнего протокола, строк/с", ("source",))
+PLAYWRIGHT_PAGE_SECONDS = registry.histogram(
+    "seido_playwright_page_seconds", "Загрузка страницы протокола в Playwright", ("source",),
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120))
+
+CACHE_REQUESTS = registry.counter(
+    "seido_cache_requests_total", "Обращения к кэшам: hit / miss", ("cache", "result"))
+HEALTHCHECK_PINGS = registry.counter(
+    "seido_healthcheck_pings_total", "Пинги Healthchecks.io", ("result",))
+
+
+def cache_hit(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+async def metrics_handler(request) -> "web.Response":
+    """GET /metrics (aiohttp)"""
+    from aiohttp import web
+    return web.Response(body=registry.render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def start_metrics_server(host: str, port: int):
+    """Локальный HTTP-сервер только с GET /metrics (режим polling). Returns: AppRunner"""
+    from aiohttp import web
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
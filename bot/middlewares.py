@@ -0,0 +1,281 @@
+"""
+Seido Bot - Middleware: ограничение частоты и защита от перегрузки, метрики и трассировка апдейтов
+Каждое нажатие/команда стоит нескольких запросов к SQLite на одном соединении,
+поэтому спам одного пользователя (или группового чата) не должен тормозить остальных.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from config import THROTTLE_RATE, THROTTLE_BURST, MAX_IN_FLIGHT, IN_FLIGHT_WAIT
+from metrics import HANDLER_ERRORS, HANDLER_SECONDS, UPDATES, registry
+from tracing import span, tracer
+
+logger = logging.getLogger(__name__)
+
+# Групповой чат получает общий лимит в несколько раз больше личного
+GROUP_CHAT_FACTOR = 3
+# Не чаще раза в N секунд отвечать пользователю «слишком часто» на сообщения
+NOTIFY_COOLDOWN = 10.0
+# Порог, после которого из словаря выбрасываются давно заполненные корзины
+MAX_BUCKETS = 5000
+
+
+class TokenBucket:
+    """Корзина токенов: пополняется со скоростью rate, вмещает не больше burst"""
+
+    __slots__ = ("tokens", "updated", "notified")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.notified = 0.0
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на update:
+    - корзина токенов на пользователя (и на групповой чат);
+    - общий лимит одновременно обрабатываемых апдейтов;
+    - повторное нажатие той же кнопки, пока первое ещё обрабатывается,
+      только гасит «часики» и не запускает обработчик второй раз;
+    - сброшенные апдейты считаются и раз в report_interval пишутся в лог.
+    """
+
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        burst: int = THROTTLE_BURST,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        in_flight_wait: float = IN_FLIGHT_WAIT,
+        report_interval: float = 60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight_wait = in_flight_wait
+        self.report_interval = report_interval
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._buckets: Dict[Tuple[str, int], TokenBucket] = {}
+        self._callbacks_in_flight: Set[Tuple[Any, ...]] = set()
+        self._window = {"rate": 0, "overload": 0}
+        # Первый сброс после затишья пишется в лог сразу, дальше — сводкой за окно
+        self._window_started = time.monotonic() - report_interval
+        self.stats = {
+            "passed": 0,
+            "coalesced": 0,
+            "shed_rate": 0,
+            "shed_overload": 0,
+            "in_flight": 0,
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        chat: Optional[Chat] = data.get("event_chat")
+        inner = event.event
+
+        callback_key = None
+        if isinstance(inner, CallbackQuery):
+            message_id = inner.message.message_id if inner.message else inner.inline_message_id
+            callback_key = (user.id, message_id, inner.data)
+            if callback_key in self._callbacks_in_flight:
+                self.stats["coalesced"] += 1
+                await self._answer_silently(inner)
+                return None
+
+        if not self._allow(user, chat):
+            self._shed("rate")
+            await self._notify(inner, user, "⏳ Слишком часто. Подождите пару секунд.")
+            return None
+
+        # Ключ кнопки занимаем до ожидания слота: повторные нажатия в очереди тоже склеиваются
+        if callback_key is not None:
+            self._callbacks_in_flight.add(callback_key)
+        try:
+            # Не wait_for: в Python 3.11 он может выдать таймаут уже после acquire(),
+            # и занятый слот так и не освободится
+            try:
+                async with asyncio.timeout(self.in_flight_wait):
+                    await self._slots.acquire()
+            except TimeoutError:
+                self._shed("overload")
+                await self._notify(inner, user, "⚠️ Бот сейчас перегружен. Попробуйте через минуту.")
+                return None
+
+            self.stats["passed"] += 1
+            self.stats["in_flight"] += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.stats["in_flight"] -= 1
+                self._slots.release()
+        finally:
+            if callback_key is not None:
+                self._callbacks_in_flight.discard(callback_key)
+
+    def _allow(self, user: User, chat: Optional[Chat]) -> bool:
+        now = time.monotonic()
+        if len(self._buckets) > MAX_BUCKETS:
+            self._prune(now)
+        if not self._bucket(("user", user.id), now).take(self.rate, self.burst, now):
+            return False
+        if chat is not None and chat.type != "private":
+            factor = GROUP_CHAT_FACTOR
+            bucket = self._bucket(("chat", chat.id), now, self.burst * factor)
+            return bucket.take(self.rate * factor, self.burst * factor, now)
+        return True
+
+    def _bucket(self, key: Tuple[str, int], now: float, burst: Optional[float] = None) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(burst or self.burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Выбросить корзины, которые уже успели заполниться (их состояние = новой корзине)"""
+        full_after = GROUP_CHAT_FACTOR * self.burst / self.rate if self.rate > 0 else float("inf")
+        for key in [k for k, b in self._buckets.items() if now - b.updated > full_after]:
+            del self._buckets[key]
+
+    def _shed(self, reason: str) -> None:
+        self.stats[f"shed_{reason}"] += 1
+        self._window[reason] += 1
+        now = time.monotonic()
+        if now - self._window_started >= self.report_interval:
+            logger.warning(
+                f"Сброс нагрузки за {now - self._window_started:.0f} с: "
+                f"лимит частоты={self._window['rate']}, перегрузка={self._window['overload']}, "
+                f"в работе={self.stats['in_flight']}/{self.max_in_flight}"
+            )
+            self._window = {"rate": 0, "overload": 0}
+            self._window_started = now
+
+    async def _notify(self, inner: Any, user: User, text: str) -> None:
+        if isinstance(inner, CallbackQuery):
+            await self._answer_silently(inner, text)
+            return
+        if isinstance(inner, Message):
+            now = time.monotonic()
+            bucket = self._buckets.get(("user", user.id))
+            if bucket is not None and now - bucket.notified < NOTIFY_COOLDOWN:
+                return
+            if bucket is not None:
+                bucket.notified = now
+            try:
+                await inner.answer(text)
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _answer_silently(callback: CallbackQuery, text: Optional[str] = None) -> None:
+        try:
+            await callback.answer(text)
+        except Exception:
+            pass  # query мог устареть — не важно
+
+
+throttling = ThrottlingMiddleware()
+
+
+def handler_label(event: Update) -> str:
+    """Метка обработчика для метрик: /команда, cb:префикс callback_data или тип апдейта"""
+    inner = event.event
+    if isinstance(inner, Message):
+        text = inner.text or ""
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0].split("@", 1)[0].lower()
+            return command[:32]
+        return "message"
+    if isinstance(inner, CallbackQuery):
+        return "cb:" + (inner.data or "").split(":", 1)[0][:32]
+    return event.event_type or "unknown"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer-middleware на update: число апдейтов по типу, время и ошибки по обработчику"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        UPDATES.inc(type=event.event_type or "unknown")
+        label = handler_label(event)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=label)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=label)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer-middleware на update: трасса на апдейт, спаны пишут query_stats и ApiTracingMiddleware"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace, token = tracer.start(event.update_id, handler_label(event))
+        error = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            error = True
+            raise
+        finally:
+            tracer.finish(trace, token, error)
+
+
+class ApiTracingMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: каждый вызов Bot API — спан «api» текущей трассы"""
+
+    async def __call__(self, make_request, bot, method):
+        with span("api", type(method).__name__):
+            return await make_request(bot, method)
+
+
+def _throttling_lines():
+    lines = [
+        "# HELP seido_throttling_total Апдейты после ограничения частоты по исходу",
+        "# TYPE seido_throttling_total counter",
+    ]
+    for outcome in ("passed", "coalesced", "shed_rate", "shed_overload"):
+        lines.append(f'seido_throttling_total{{outcome="{outcome}"}} {throttling.stats[outcome]}')
+    lines += [
+        "# HELP seido_updates_in_flight Апдейтов в обработке",
+        "# TYPE seido_updates_in_flight gauge",
+        f"seido_updates_in_flight {throttling.stats['in_flight']}",
+    ]
+    return lines
+
+
+update_metrics = UpdateMetricsMiddleware()
+update_tracing = TracingMiddleware()
+api_tracing = ApiTracingMiddleware()
+registry.register_collector("throttling", _throttling_lines)
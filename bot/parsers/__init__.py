@@ -1,7 +1,13 @@
-# Импортируем только то, что нужно для RussiaRunning
-from .russiarunning import fetch_russiarunning_events, fetch_events_until_date
-
+# Импортируем только то, что нужно для RussiaRunning — и только при обращении,
+# чтобы import parsers.scheduler не тянул модули парсеров при запуске бота
 __all__ = [
     'fetch_russiarunning_events',
     'fetch_events_until_date'
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import russiarunning
+        return getattr(russiarunning, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,10 +4,12 @@ Seido - Базовый класс для парсеров забегов
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional, Any
 from datetime import datetime, date
-import re
 import aiohttp
 import logging
 
+from .classifier import get_classifier
+from .dates import parse_date
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,9 +18,14 @@ class RaceParser(ABC):
     
     SOURCE_NAME: str = "unknown"
     BASE_URL: str = ""
+    # Имя записи job_runs с состоянием инкрементального парсера (None — парсер без состояния)
+    STATE_JOB: Optional[str] = None
     
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
+        # Состояние прошлого прогона ({} — первый); планировщик кладёт его перед
+        # parse_upcoming и сохраняет после. None — полный прогон без состояния
+        self.state: Optional[Dict] = None
     
     async def get_session(self) -> aiohttp.ClientSession:
         """Получить HTTP сессию"""
@@ -57,13 +64,14 @@ class RaceParser(ABC):
             Нормализованные данные
         """
         name = self.clean_string(raw.get('name', ''))
-        race_type = raw.get('race_type') or self.detect_race_type(name)
+        # Организатор и тип — за один проход классификатора по URL и названию
+        organizer, race_type = get_classifier().classify(raw.get('url', ''), name)
         return {
             'name': name,
             'date': self.parse_date(raw.get('date')),
             'location': self.clean_string(raw.get('city', raw.get('location', ''))),
-            'organizer': self.detect_organizer(raw),
-            'race_type': race_type,
+            'organizer': organizer or raw.get('organizer', 'Не указан'),
+            'race_type': raw.get('race_type') or race_type,
             'distances': self.parse_distances(raw.get('distances', [])),
             'website_url': raw.get('url', raw.get('website_url', '')),
             'protocol_url': raw.get('protocol_url', ''),
@@ -79,144 +87,36 @@ class RaceParser(ABC):
     
     def parse_date(self, date_str: str) -> Optional[str]:
         """
-        Парсинг даты из различных форматов
-        
+        Парсинг даты из различных форматов (parsers/dates.py)
+
         Поддерживаемые форматы:
         - DD.MM.YYYY
         - YYYY-MM-DD
         - DD Month YYYY
         - Month DD, YYYY
+        - диапазон дней (12–13 июня 2026) — берётся первый день
         """
         if not date_str:
             return None
-        
-        # Уже дата
-        if isinstance(date_str, date):
-            return date_str.isoformat()
-        
-        date_str = self.clean_string(date_str)
-        
-        # Форматы для парсинга
-        formats = [
-            '%d.%m.%Y',      # 15.03.2026
-            '%Y-%m-%d',      # 2026-03-15
-            '%d %B %Y',      # 15 марта 2026
-            '%d %b %Y',      # 15 мар 2026
-            '%B %d, %Y',     # March 15, 2026
-            '%b %d, %Y',     # Mar 15, 2026
-            '%d.%m.%Y %H:%M', # 15.03.2026 10:00
-        ]
-        
-        # Русские месяцы
-        month_map = {
-            'января': 'January', 'февраля': 'February', 'марта': 'March',
-            'апреля': 'April', 'мая': 'May', 'июня': 'June',
-            'июля': 'July', 'августа': 'August', 'сентября': 'September',
-            'октября': 'October', 'ноября': 'November', 'декабря': 'December',
-            'янв': 'Jan', 'фев': 'Feb', 'мар': 'Mar', 'апр': 'Apr',
-            'июн': 'Jun', 'июл': 'Jul', 'авг': 'Aug', 'сен': 'Sep',
-            'окт': 'Oct', 'ноя': 'Nov', 'дек': 'Dec',
-        }
-        
-        # Замена русских месяцев на английские
-        for ru, en in month_map.items():
-            date_str = date_str.lower().replace(ru, en)
-        
-        for fmt in formats:
-            try:
-                parsed = datetime.strptime(date_str, fmt)
-                return parsed.date().isoformat()
-            except ValueError:
-                continue
-        
-        # Попытка найти дату в строке
-        date_match = re.search(r'\d{1,2}\.\d{1,2}\.\d{4}', date_str)
-        if date_match:
-            try:
-                parsed = datetime.strptime(date_match.group(), '%d.%m.%Y')
-                return parsed.date().isoformat()
-            except ValueError:
-                pass
-        
-        logger.warning(f"Не удалось распарсить дату: {date_str}")
-        return None
+        parsed = parse_date(date_str)
+        if parsed is None:
+            logger.warning(f"Не удалось распарсить дату: {date_str}")
+        return parsed
     
     def detect_organizer(self, raw: Dict) -> str:
         """
         Определение организатора по URL или названию.
-        Канонические имена см. в docs/ORGANIZERS.md
+        Ключевые слова — parsers/keywords.json, канонические имена — docs/ORGANIZERS.md
         """
-        url = raw.get('url', '').lower()
-        name = raw.get('name', '').lower()
-        
-        organizers = {
-            '5verst': '5верст',
-            '5 верст': '5верст',
-            's95': 'S95',
-            'sport-95': 'S95',
-            'rhr': 'RHR',
-            'runhide': 'RHR',
-            'rhr-marathon': 'RHR',
-            'moscow marathon': 'Московский марафон',
-            'moscowmarathon': 'Московский марафон',
-            'ironstar': 'IronStar',
-            'iron-star': 'IronStar',
-            'russiarunning': 'RussiaRunning',
-            'myrace': 'MyRace',
-            'timerman': 'TIMERMAN',
-            'kazan.run': 'TIMERMAN',
-            'kazan marathon': 'TIMERMAN',
-            'казанский марафон': 'TIMERMAN',
-            'runc.run': 'Беговое сообщество',
-            'unistar': 'Беговое сообщество',
-            'юнистар': 'Беговое сообщество',
-            'белые ночи': 'Марафон «Белые ночи»',
-            'whitenights': 'Марафон «Белые ночи»',
-            'runup': 'RUNUP',
-            'iloverunning': 'I Love Running',
-            'orgeo': 'Orgeo',
-            'cronosport': 'CronoSport',
-            'goldenultra': 'RHR',
-            'rhr': 'RHR',
-            'wildtrail': 'Wild Trail',
-            'openband': 'Open Band',
-            'topliga': 'Высшая лига',
-            'vysshaya liga': 'Высшая лига',
-            'dream trail': 'Dream Trail',
-            'dtrail': 'Dream Trail',
-            'tulamarathon': 'TulaMarathon',
-            'o-time': 'reg.o-time.ru',
-        }
-        
-        for key, value in organizers.items():
-            if key in url or key in name:
-                return value
-        
-        return raw.get('organizer', 'Не указан')
+        organizer = get_classifier().organizer(raw.get('url', ''), raw.get('name', ''))
+        return organizer or raw.get('organizer', 'Не указан')
 
     def detect_race_type(self, name: str) -> str:
         """
-        Определение типа забега по ключевым словам в названии.
+        Определение типа забега по ключевым словам в названии (parsers/keywords.json).
         См. docs/ANNOUNCEMENTS_LOGIC.md
         """
-        if not name:
-            return 'шоссе'
-        name_lower = name.lower()
-        keywords = {
-            'трейл': ['трейл', 'trail', 'трейлраннинг', 'trailrunning'],
-            'кросс': ['кросс', 'cross'],
-            'горный': ['горный', 'mountain', 'skyrace', 'skyrunning'],
-            'ультра': ['ультра', 'ultra', '50 км', '100 км'],
-            'триатлон': ['триатлон', 'triathlon', 'ironstar', 'iron star'],
-            'ночной': ['ночной', 'night run', 'ночная'],
-            'зимний': ['зимний', 'снежный', 'ледовый', 'ice', 'snow'],
-            'стадион': ['стадион', 'indoor', 'индор'],
-            'акватлон': ['акватлон', 'aquathlon'],
-        }
-        for race_type, kws in keywords.items():
-            if any(kw in name_lower for kw in kws):
-                return race_type
-        return 'шоссе'
+        return get_classifier().race_type(name)
     
     def parse_distances(self, distances: Any) -> str:
         """
@@ -0,0 +1,131 @@
+"""
+Seido - Классификатор забегов: организатор и тип забега по ключевым словам
+Словарь — parsers/keywords.json (канонические имена совпадают с docs/ORGANIZERS.md,
+проверка: python -m bot.scripts.check_organizers). Все ключевые слова обоих словарей
+собраны в один автомат Ахо — Корасик: URL и название проходятся за один проход,
+стоимость классификации зависит от длины текста, а не от числа ключевых слов.
+
+Приоритет: при нескольких совпадениях побеждает запись с большим "priority",
+при равном — стоящая в файле раньше (как порядок ключей в прежних словарях base.py).
+"""
+import json
+import os
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(__file__), "keywords.json")
+# Разделитель URL и названия: ключевые слова его не содержат, совпадение через границу невозможно
+SEPARATOR = "\n"
+
+
+class KeywordAutomaton:
+    """
+    Автомат Ахо — Корасик над строчными ключевыми словами.
+    Переходы достроены до полного ДКА по алфавиту ключевых слов: на символ — один
+    поиск в словаре; символ вне алфавита возвращает в корень.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[int, Any]]] = [[]]
+        for keyword, payload in keywords:
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append((len(keyword), payload))
+
+        # Ссылки неудач обходом в ширину; выходы состояния дополняются выходами по ссылке
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            # Переходы состояния по ссылке неудачи уже достроены — наследуем их
+            delta[state] = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                delta[state][ch] = nxt
+                queue.append(nxt)
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+        self.states = len(goto)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Все вхождения в строчный текст: (начало, конец, payload)"""
+        delta, outputs = self._delta, self._outputs
+        found = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for length, payload in outputs[state]:
+                    found.append((end - length, end, payload))
+        return found
+
+
+class RaceClassifier:
+    """Организатор (по URL и названию) и тип забега (по названию) из keywords.json"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.default_race_type = data.get("default_race_type", "шоссе")
+        self.organizers = data.get("organizers", [])
+        self.race_types = data.get("race_types", [])
+        keywords = []
+        # payload: (вид, ранг, значение); ранг меньше — приоритет выше
+        for kind, entries, value_key in (("organizer", self.organizers, "canonical_name"),
+                                         ("race_type", self.race_types, "race_type")):
+            for index, entry in enumerate(entries):
+                rank = (-entry.get("priority", 0), index)
+                for keyword in entry.get("keywords", []):
+                    keywords.append((keyword, (kind, rank, entry[value_key])))
+        self.automaton = KeywordAutomaton(keywords)
+        self.keyword_count = len(keywords)
+
+    @classmethod
+    def load(cls, path: str = KEYWORDS_PATH) -> "RaceClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def classify(self, url: str = "", name: str = "") -> Tuple[Optional[str], str]:
+        """
+        Один проход по «URL + разделитель + название».
+        Returns: (организатор или None, тип забега)
+        """
+        url = (url or "").lower().replace(SEPARATOR, " ")
+        name_start = len(url) + len(SEPARATOR)
+        best: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        for start, _, (kind, rank, value) in self.automaton.find_all(f"{url}{SEPARATOR}{(name or '').lower()}"):
+            if kind == "race_type" and start < name_start:
+                continue  # тип — только по названию
+            if kind not in best or rank < best[kind][0]:
+                best[kind] = (rank, value)
+        organizer = best["organizer"][1] if "organizer" in best else None
+        race_type = best["race_type"][1] if "race_type" in best else self.default_race_type
+        return organizer, race_type
+
+    def organizer(self, url: str = "", name: str = "") -> Optional[str]:
+        return self.classify(url, name)[0]
+
+    def race_type(self, name: str) -> str:
+        return self.classify("", name)[1]
+
+
+# Глобальный экземпляр (словарь читается один раз при первом обращении)
+_classifier: Optional[RaceClassifier] = None
+
+
+def get_classifier() -> RaceClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = RaceClassifier.load()
+    return _classifier
@@ -0,0 +1,167 @@
+"""
+Seido - Разбор дат забегов из календарей и страниц организаторов
+Одно заранее скомпилированное регулярное выражение на семейство форматов, месяц —
+прямым поиском слова в словаре (без замен строк и перебора strptime), результат
+запоминается в LRU-кэше: в календарях одни и те же строки дат повторяются.
+
+Поддерживаемые форматы (в том числе внутри строки: «Сб, 15 марта 2026 г.»):
+- 2026-03-15, 2026-03-15T10:00:00
+- 15.03.2026, 15.03.2026 10:00
+- 15 марта 2026, 15 мар. 2026, 15 март 2026, 15 March 2026
+- March 15, 2026, Mar 15, 2026
+- диапазоны дней: 12–13 июня 2026, 30 мая – 1 июня 2026, 30 декабря 2025 – 2 января 2026,
+  30 декабря – 2 января 2026, 12–13.06.2026, 30.12.2025–02.01.2026, 30.12–02.01.2026,
+  June 12–13, 2026, May 30 – June 1, 2026
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Сколько различных строк дат держать в кэше
+CACHE_SIZE = 4096
+
+_MONTH_WORDS = {
+    1: ('января', 'январь', 'янв', 'january', 'jan'),
+    2: ('февраля', 'февраль', 'фев', 'february', 'feb'),
+    3: ('марта', 'март', 'мар', 'march', 'mar'),
+    4: ('апреля', 'апрель', 'апр', 'april', 'apr'),
+    5: ('мая', 'май', 'may'),
+    6: ('июня', 'июнь', 'июн', 'june', 'jun'),
+    7: ('июля', 'июль', 'июл', 'july', 'jul'),
+    8: ('августа', 'август', 'авг', 'august', 'aug'),
+    9: ('сентября', 'сентябрь', 'сен', 'сент', 'september', 'sep', 'sept'),
+    10: ('октября', 'октябрь', 'окт', 'october', 'oct'),
+    11: ('ноября', 'ноябрь', 'ноя', 'нояб', 'november', 'nov'),
+    12: ('декабря', 'декабрь', 'дек', 'december', 'dec'),
+}
+MONTHS = {word: month for month, words in _MONTH_WORDS.items() for word in words}
+
+_DASH = r'\s*[-–—]\s*'
+_DAY = r'(\d{1,2})'
+_YEAR = r'(\d{4})'
+_WORD = r'([a-zа-яё]+)\.?'
+
+# Порядок важен: диапазоны раньше одиночных дат, иначе «12–13 июня» даст 13-е
+_ISO_RANGE = re.compile(rf'(?<!\d){_YEAR}-(\d{{1,2}})-{_DAY}{_DASH}{_YEAR}-(\d{{1,2}})-{_DAY}(?!\d)')
+_ISO = re.compile(rf'(?<!\d){_YEAR}-(\d{{1,2}})-{_DAY}(?!\d)')
+_NUMERIC_RANGE = re.compile(rf'(?<![\d.]){_DAY}(?:\.(\d{{1,2}})(?:\.{_YEAR})?)?\.?{_DASH}{_DAY}\.(\d{{1,2}})\.{_YEAR}(?!\d)')
+_NUMERIC = re.compile(rf'(?<![\d.]){_DAY}\.(\d{{1,2}})\.{_YEAR}(?!\d)')
+_TEXT_RANGE = re.compile(rf'(?<!\d){_DAY}(?:\s+{_WORD}(?:\s+{_YEAR})?)?{_DASH}{_DAY}\s+{_WORD},?\s+{_YEAR}(?!\d)')
+_TEXT = re.compile(rf'(?<!\d){_DAY}\s+{_WORD},?\s+{_YEAR}(?!\d)')
+_TEXT_EN = re.compile(rf'\b{_WORD}\s+{_DAY}(?:{_DASH}(?:{_WORD}\s+)?{_DAY})?,?\s+{_YEAR}(?!\d)')
+
+DateRange = Tuple[date, date]
+
+
+def _make(year, month, day) -> Optional[date]:
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _range(start: Optional[date], end: Optional[date]) -> Optional[DateRange]:
+    if start is None or end is None or end < start:
+        return None
+    return start, end
+
+
+def _start_year(y1, y2, m1, m2) -> int:
+    """Год начала диапазона: без своего года и месяц позже конечного — предыдущий («30.12–02.01.2026»)"""
+    if y1:
+        return int(y1)
+    return int(y2) - 1 if int(m1) > int(m2) else int(y2)
+
+
+def _match_iso_range(m) -> Optional[DateRange]:
+    y1, m1, d1, y2, m2, d2 = m.groups()
+    return _range(_make(y1, m1, d1), _make(y2, m2, d2))
+
+
+def _match_iso(m) -> Optional[DateRange]:
+    day = _make(*m.groups())
+    return (day, day) if day else None
+
+
+def _match_numeric_range(m) -> Optional[DateRange]:
+    d1, m1, y1, d2, m2, y2 = m.groups()
+    m1 = m1 or m2
+    return _range(_make(_start_year(y1, y2, m1, m2), m1, d1), _make(y2, m2, d2))
+
+
+def _match_numeric(m) -> Optional[DateRange]:
+    d, mo, y = m.groups()
+    day = _make(y, mo, d)
+    return (day, day) if day else None
+
+
+def _match_text_range(m) -> Optional[DateRange]:
+    d1, w1, y1, d2, w2, y2 = m.groups()
+    m2 = MONTHS.get(w2)
+    m1 = MONTHS.get(w1) if w1 else m2
+    if not m1 or not m2:
+        return None
+    return _range(_make(_start_year(y1, y2, m1, m2), m1, d1), _make(y2, m2, d2))
+
+
+def _match_text(m) -> Optional[DateRange]:
+    d, word, y = m.groups()
+    month = MONTHS.get(word)
+    day = _make(y, month, d) if month else None
+    return (day, day) if day else None
+
+
+def _match_text_en(m) -> Optional[DateRange]:
+    w1, d1, w2, d2, y = m.groups()
+    m1 = MONTHS.get(w1)
+    m2 = MONTHS.get(w2) if w2 else m1
+    if not m1 or not m2:
+        return None
+    return _range(_make(_start_year(None, y, m1, m2), m1, d1), _make(y, m2, d2 or d1))
+
+
+_FAMILIES = (
+    (_ISO_RANGE, _match_iso_range),
+    (_ISO, _match_iso),
+    (_NUMERIC_RANGE, _match_numeric_range),
+    (_NUMERIC, _match_numeric),
+    (_TEXT_RANGE, _match_text_range),
+    (_TEXT, _match_text),
+    (_TEXT_EN, _match_text_en),
+)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(text: str) -> Optional[Tuple[str, str]]:
+    text = ' '.join(text.lower().split())
+    for pattern, build in _FAMILIES:
+        for m in pattern.finditer(text):
+            parsed = build(m)
+            if parsed:
+                return parsed[0].isoformat(), parsed[1].isoformat()
+    return None
+
+
+def parse_date_range(value) -> Optional[Tuple[str, str]]:
+    """
+    Первый и последний день забега (ISO). Для одиночной даты они совпадают.
+    Returns: (начало, конец) или None, если дату не удалось разобрать
+    """
+    if not value:
+        return None
+    if isinstance(value, date):
+        day = value.date() if isinstance(value, datetime) else value
+        return day.isoformat(), day.isoformat()
+    return _parse(str(value))
+
+
+def parse_date(value) -> Optional[str]:
+    """Дата забега в ISO (для диапазона — первый день) или None"""
+    parsed = parse_date_range(value)
+    return parsed[0] if parsed else None
+
+
+def cache_info():
+    """Статистика LRU-кэша (попадания, промахи, размер)"""
+    return _parse.cache_info()
@@ -0,0 +1,246 @@
+"""
+Seido - Клиент API RussiaRunning (russiarunning.com/api/events/list/ru)
+Один клиент для парсера и скриптов импорта:
+- постраничная выборка (Take/Skip, RR_PAGE_SIZE событий) — без многомегабайтных ответов;
+- страницы запрашиваются параллельно (RR_CONCURRENCY) не чаще RR_RATE запросов в секунду,
+  при 429/5xx — повтор с паузой;
+- длинный период делится на окна по RR_SHARD_DAYS дней (DateFrom/DateTo);
+- инкрементальный режим: закрытые окна с прежним числом событий не перезапрашиваются,
+  возвращаются только новые и изменившиеся с прошлого прогона события.
+"""
+import asyncio
+import logging
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+try:
+    from config import RR_PAGE_SIZE, RR_CONCURRENCY, RR_RATE, RR_FULL_SWEEP_DAYS
+except ImportError:
+    from bot.config import RR_PAGE_SIZE, RR_CONCURRENCY, RR_RATE, RR_FULL_SWEEP_DAYS
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://russiarunning.com/api/events/list/ru"
+HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+EVENT_URL = "https://russiarunning.com/event/{code}/"
+# Повторы запроса при 429, 5xx и сетевых ошибках (паузы 1, 2, 4 с)
+RETRIES = 3
+
+Window = Tuple[date, Optional[date]]
+
+
+def event_from_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Событие из ответа API (c — код, t — название, p — место, d — дата); None без даты"""
+    try:
+        event_date = date.fromisoformat((item.get("d") or "").split("T")[0])
+    except ValueError:
+        return None
+    code = str(item.get("c", ""))
+    return {
+        "source": "russiarunning",
+        "external_id": code,
+        "title": (item.get("t") or "").strip(),
+        "city": (item.get("p") or "").strip(),
+        "event_date": event_date,
+        "url": EVENT_URL.format(code=code),
+    }
+
+
+def fingerprint(event: Dict[str, Any]) -> str:
+    """Дата и контрольная сумма полей: по ней видно, что событие изменилось"""
+    fields = f"{event['title']}|{event['city']}|{event['event_date']}"
+    return f"{event['event_date'].isoformat()}:{zlib.crc32(fields.encode('utf-8')):08x}"
+
+
+def date_windows(date_from: date, date_to: Optional[date], days: Optional[int] = None) -> List[Window]:
+    """Период → окна не длиннее days дней (None или открытый конец — одно окно)"""
+    if not days or date_to is None:
+        return [(date_from, date_to)]
+    windows = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=days - 1), date_to)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def _event_key(event: Dict[str, Any]) -> str:
+    return event["external_id"] or f"{event['title']}|{event['event_date']}"
+
+
+class RussiaRunningClient:
+    """
+    Клиент API событий. Сессию можно передать свою (сессия парсера),
+    иначе клиент открывает и закрывает собственную (async with).
+    """
+
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None,
+                 page_size: int = RR_PAGE_SIZE, concurrency: int = RR_CONCURRENCY, rate: float = RR_RATE):
+        self._session = session
+        self._own_session = session is None
+        self.page_size = page_size
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        # Статистика для логов: запросов, окон пропущено инкрементальным режимом
+        self.requests = 0
+        self.skipped_windows = 0
+
+    async def __aenter__(self) -> "RussiaRunningClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self):
+        if self._own_session and self._session and not self._session.closed:
+            await self._session.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=HEADERS, timeout=aiohttp.ClientTimeout(total=30))
+            self._own_session = True
+        return self._session
+
+    async def _wait_slot(self):
+        """Равномерно: не чаще одного запроса в 1/rate секунд на весь клиент"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def fetch_page(self, date_from: date, date_to: Optional[date] = None,
+                         skip: int = 0, take: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+        """Одна страница: (сырые события, TotalCount или None, если API его не вернул)"""
+        payload = {"Take": take or self.page_size, "Skip": skip, "DateFrom": date_from.isoformat()}
+        if date_to:
+            payload["DateTo"] = date_to.isoformat()
+        session = self._get_session()
+        error = ""
+        for attempt in range(RETRIES + 1):
+            async with self._semaphore:
+                await self._wait_slot()
+                self.requests += 1
+                try:
+                    async with session.post(API_URL, json=payload, headers=HEADERS) as resp:
+                        if resp.status == 200:
+                            data = await resp.json()
+                            return data.get("Items") or [], data.get("TotalCount")
+                        if resp.status != 429 and resp.status < 500:
+                            raise RuntimeError(f"RussiaRunning API error: {resp.status}")
+                        error = f"HTTP {resp.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e) or type(e).__name__
+            if attempt < RETRIES:
+                logger.debug(f"RussiaRunning API: {error}, повтор {attempt + 1} (skip={skip})")
+                await asyncio.sleep(2 ** attempt)
+        raise RuntimeError(f"RussiaRunning API error: {error} (попыток: {RETRIES + 1})")
+
+    async def _fetch_window(self, date_from: date, date_to: Optional[date]) -> Tuple[List[Dict], Optional[int]]:
+        items, total = await self.fetch_page(date_from, date_to)
+        pages = [items]
+        if len(items) >= self.page_size and (total is None or len(items) < total):
+            if total is not None:
+                # Число событий известно — остальные страницы параллельно
+                skips = range(self.page_size, total, self.page_size)
+                pages += await asyncio.gather(*(self.fetch_page(date_from, date_to, skip) for skip in skips))
+                pages = [pages[0]] + [page for page, _ in pages[1:]]
+            else:
+                # Без TotalCount — подряд до неполной страницы (или страницы без новых событий)
+                seen = {str(item.get("c")) for item in items}
+                skip = self.page_size
+                while True:
+                    page, _ = await self.fetch_page(date_from, date_to, skip)
+                    new = [item for item in page if str(item.get("c")) not in seen]
+                    if not new:
+                        break
+                    pages.append(page)
+                    seen.update(str(item.get("c")) for item in new)
+                    if len(page) < self.page_size:
+                        break
+                    skip += self.page_size
+
+        events: Dict[str, Dict] = {}
+        for page in pages:
+            for item in page:
+                event = event_from_item(item)
+                # DateTo фильтруем и сами: окна не должны пересекаться
+                if event is None or event["event_date"] < date_from or (date_to and event["event_date"] > date_to):
+                    continue
+                events.setdefault(_event_key(event), event)
+        return list(events.values()), total
+
+    async def fetch_window(self, date_from: date, date_to: Optional[date] = None) -> List[Dict]:
+        """Все события окна [date_from, date_to] (все страницы), в порядке API"""
+        events, _ = await self._fetch_window(date_from, date_to)
+        return events
+
+    async def fetch_range(self, date_from: date, date_to: Optional[date] = None,
+                          shard_days: Optional[int] = None) -> List[Dict]:
+        """Все события периода; с shard_days — окнами, окна запрашиваются параллельно"""
+        windows = date_windows(date_from, date_to, shard_days)
+        results = await asyncio.gather(*(self.fetch_window(start, end) for start, end in windows))
+        events: Dict[str, Dict] = {}
+        for window_events in results:
+            for event in window_events:
+                events.setdefault(_event_key(event), event)
+        return list(events.values())
+
+    async def fetch_changed(self, date_from: date, date_to: Optional[date] = None,
+                            state: Optional[Dict] = None, shard_days: Optional[int] = None,
+                            today: Optional[date] = None,
+                            full_every_days: int = RR_FULL_SWEEP_DAYS) -> Tuple[List[Dict], Dict]:
+        """
+        Инкрементальная выборка: только новые и изменившиеся с прошлого прогона события.
+        state — состояние, которое вернул прошлый вызов; пустое или старше full_every_days
+        дней — полный прогон (возвращаются все события).
+        Окно, закончившееся до прошлого прогона, проверяется страницей из одного события:
+        если TotalCount тот же, окно не перезапрашивается.
+
+        Returns: (события, новое состояние — сохранить до следующего прогона)
+        """
+        today = today or date.today()
+        full_at = (state or {}).get("full_sweep_at")
+        if not full_at or date.fromisoformat(full_at) <= today - timedelta(days=full_every_days):
+            state = {}
+        old_events: Dict[str, str] = state.get("events", {})
+        old_windows: Dict[str, int] = state.get("windows", {})
+        swept_at = state.get("swept_at", "")
+
+        async def sweep(start: date, end: Optional[date]):
+            key = f"{start}/{end or ''}"
+            if end and end.isoformat() < swept_at and key in old_windows:
+                _, total = await self.fetch_page(start, end, take=1)
+                if total is not None and total == old_windows[key]:
+                    self.skipped_windows += 1
+                    return key, total, []
+            events, total = await self._fetch_window(start, end)
+            return key, total if total is not None else -1, events
+
+        results = await asyncio.gather(*(sweep(start, end) for start, end in date_windows(date_from, date_to, shard_days)))
+
+        floor = date_from.isoformat()
+        events_state = {code: fp for code, fp in old_events.items() if fp[:10] >= floor}
+        changed: Dict[str, Dict] = {}
+        for _, _, window_events in results:
+            for event in window_events:
+                code, fp = _event_key(event), fingerprint(event)
+                if old_events.get(code) != fp:
+                    changed.setdefault(code, event)
+                events_state[code] = fp
+        new_state = {
+            "full_sweep_at": state.get("full_sweep_at") or today.isoformat(),
+            "swept_at": today.isoformat(),
+            "windows": {key: total for key, total, _ in results},
+            "events": events_state,
+        }
+        return list(changed.values()), new_state
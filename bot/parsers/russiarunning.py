@@ -1,28 +1,23 @@
 """
 Seido - Парсер RussiaRunning (russiarunning.com)
-Парсинг через API
+Парсинг через API (клиент — rr_api.py)
 """
-import aiohttp
-import asyncio
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date
 from typing import List, Dict, Optional
 from .base import RaceParser
+from .rr_api import API_URL, HEADERS, RussiaRunningClient  # API_URL, HEADERS — для старых импортов
 
 logger = logging.getLogger(__name__)
 
-API_URL = "https://russiarunning.com/api/events/list/ru"
-HEADERS = {
-    "Content-Type": "application/json",
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-}
-
 
 class RussiaRunningParser(RaceParser):
     """Парсер RussiaRunning через API"""
     
     SOURCE_NAME = "RussiaRunning"
     BASE_URL = "https://russiarunning.com"
+    # Инкрементальный режим: состояние между прогонами — в job_runs под этим именем
+    STATE_JOB = "russiarunning_events"
     
     async def parse_upcoming(self) -> List[Dict]:
         """
@@ -57,40 +52,21 @@ class RussiaRunningParser(RaceParser):
         return races
     
     async def _fetch_events_until_date(self, end_date: date) -> List[Dict]:
-        """Получает все события до указанной даты"""
-        today = date.today()
-        
+        """
+        События с сегодняшнего дня до end_date (все страницы API).
+        Если планировщик передал self.state — только новые и изменившиеся с прошлого
+        прогона, новое состояние остаётся в self.state
+        """
+        client = RussiaRunningClient(session=await self.get_session())
         try:
-            payload = {
-                "Take": 500,
-                "DateFrom": today.isoformat()
-            }
-            
-            session = await self.get_session()
-            async with session.post(API_URL, json=payload, headers=HEADERS) as resp:
-                if resp.status != 200:
-                    raise Exception(f"RussiaRunning API error: {resp.status}")
-                data = await resp.json()
-            
-            events = []
-            for item in data.get("Items", []):
-                event_date_str = item.get("d", "").split("T")[0]
-                try:
-                    event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
-                    if event_date <= end_date:
-                        events.append({
-                            "source": "russiarunning",
-                            "external_id": str(item.get("c", "")),
-                            "title": item.get("t", "").strip(),
-                            "city": item.get("p", "").strip(),
-                            "event_date": event_date,
-                            "url": f"https://russiarunning.com/event/{item.get('c', '')}/"
-                        })
-                except ValueError:
-                    continue
-            
+            if self.state is None:
+                return await client.fetch_range(date.today(), end_date)
+            events, self.state = await client.fetch_changed(
+                date.today(), end_date, state=self.state, today=date.today()
+            )
+            logger.info(f"RussiaRunning: новых и изменившихся событий {len(events)} "
+                        f"(известно {len(self.state['events'])}, запросов {client.requests})")
             return events
-            
         except Exception as e:
             logger.error(f"RussiaRunning: ошибка получения событий - {e}")
             return []
@@ -128,59 +104,21 @@ class RussiaRunningParser(RaceParser):
 # Оставляем старые функции для обратной совместимости
 async def fetch_russiarunning_events(
     date_from: str = None,
-    take: int = 500
+    take: int = None
 ) -> List[Dict]:
     """
-    Получает список событий с API RussiaRunning.
+    Получает список событий с API RussiaRunning (все страницы по take событий).
     """
     if date_from is None:
         date_from = date.today().isoformat()
     
-    payload = {
-        "Take": take,
-        "DateFrom": date_from
-    }
-    
-    async with aiohttp.ClientSession(headers=HEADERS) as session:
-        async with session.post(API_URL, json=payload) as resp:
-            if resp.status != 200:
-                raise Exception(f"RussiaRunning API error: {resp.status}")
-            data = await resp.json()
-    
-    events = []
-    for item in data.get("Items", []):
-        event_date_str = item.get("d", "").split("T")[0]
-        try:
-            event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
-        except ValueError:
-            continue
-        
-        events.append({
-            "source": "russiarunning",
-            "external_id": str(item.get("c", "")),
-            "title": item.get("t", "").strip(),
-            "city": item.get("p", "").strip(),
-            "event_date": event_date,
-            "url": f"https://russiarunning.com/event/{item.get('c', '')}/"
-        })
-    
-    return events
+    async with RussiaRunningClient(**({"page_size": take} if take else {})) as client:
+        return await client.fetch_range(date.fromisoformat(date_from))
 
 
 async def fetch_events_until_date(end_date: date) -> List[Dict]:
     """
     Получает все события до указанной даты.
     """
-    today = date.today()
-    events = await fetch_russiarunning_events(
-        date_from=today.isoformat(),
-        take=500
-    )
-    
-    # Фильтруем по дате окончания
-    filtered_events = [
-        ev for ev in events 
-        if ev["event_date"] <= end_date
-    ]
-    
-    return filtered_events
+    async with RussiaRunningClient() as client:
+        return await client.fetch_range(date.today(), end_date)
@@ -3,87 +3,219 @@ Seido - Планировщик парсинга забегов
 Автоматический запуск парсеров по расписанию
 """
 import asyncio
+import importlib
 import logging
-from datetime import datetime
-from typing import List, Dict
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, TYPE_CHECKING
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from parsers.base import RaceParser
-from parsers.russiarunning import RussiaRunningParser
-from parsers.ironstar import IronStarParser
-from parsers.runc import RunCParser
-from parsers.timerman import TimerManParser
-from parsers.goldenultra import GoldenUltraParser
-from parsers.wildtrail import WildTrailParser
-from parsers.openband import OpenBandParser
-from parsers.dtrail import DreamTrailParser
-from parsers.tulamarathon import TulaMarathonParser
-from parsers.topliga import TopligaParser
 from db import db
+from config import INITIAL_PARSE_MAX_AGE_HOURS
+from metrics import (
+    PARSE_LAST_SUCCESS, PARSE_SWEEP_SECONDS, PARSER_ADDED, PARSER_ERRORS, PARSER_RACES, PARSER_SECONDS,
+)
+
+if TYPE_CHECKING:
+    from parsers.base import RaceParser
 
 logger = logging.getLogger(__name__)
 
+# Ключ в таблице job_runs
+PARSE_JOB = "parse_all"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Парсеры (модуль, класс). Модули с BeautifulSoup импортируются только
+# при первом прогоне parse_all — бот стартует без них
+PARSER_CLASSES = (
+    ("parsers.russiarunning", "RussiaRunningParser"),
+    ("parsers.ironstar", "IronStarParser"),
+    ("parsers.runc", "RunCParser"),
+    ("parsers.timerman", "TimerManParser"),
+    ("parsers.goldenultra", "GoldenUltraParser"),
+    ("parsers.wildtrail", "WildTrailParser"),
+    ("parsers.openband", "OpenBandParser"),
+    ("parsers.dtrail", "DreamTrailParser"),
+    ("parsers.tulamarathon", "TulaMarathonParser"),
+    ("parsers.topliga", "TopligaParser"),
+)
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
 
 class ParseScheduler:
     """Планировщик парсинга забегов"""
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
-        self.parsers: List[RaceParser] = []
-        self._setup_parsers()
+        # Заполняется при первом прогоне (см. PARSER_CLASSES)
+        self.parsers: List["RaceParser"] = []
+        # Один прогон parse_all за раз: первичный, ночной и /parse не пересекаются
+        self._lock = asyncio.Lock()
+        self._initial_task: Optional[asyncio.Task] = None
+        # Ход текущего (или последнего) прогона — показывается админу в /parse
+        self.progress: Dict = {}
     
     def _setup_parsers(self):
-        """Настройка парсеров"""
+        """Импорт модулей парсеров и создание экземпляров"""
         self.parsers = [
-            RussiaRunningParser(),
-            IronStarParser(),
-            RunCParser(),
-            TimerManParser(),
-            GoldenUltraParser(),
-            WildTrailParser(),
-            OpenBandParser(),
-            DreamTrailParser(),
-            TulaMarathonParser(),
-            TopligaParser(),
+            getattr(importlib.import_module(module), name)()
+            for module, name in PARSER_CLASSES
         ]
     
-    async def parse_all(self) -> Dict[str, int]:
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    async def parse_all(self, trigger: str = "cron") -> Dict[str, int]:
         """
         Запуск всех парсеров
         
+        Args:
+            trigger: кто запустил — startup / cron / manual (для /parse)
+        
         Returns:
             Словарь с количеством добавленных забегов по источникам
+            (пустой, если парсинг уже идёт)
         """
-        results = {}
-        
-        logger.info("🔄 Запуск парсинга забегов...")
-        
-        for parser in self.parsers:
+        if self._lock.locked():
+            logger.info(f"Парсинг уже идёт ({self.progress.get('trigger')}), запуск {trigger} пропущен")
+            return {}
+
+        async with self._lock:
+            if not self.parsers:
+                self._setup_parsers()
+            results = {}
+            errors = {}
+            self.progress = {
+                "trigger": trigger,
+                "started_at": _utcnow(),
+                "finished_at": None,
+                "total": len(self.parsers),
+                "done": 0,
+                "current": None,
+                "results": results,
+                "errors": errors,
+            }
+
+            logger.info(f"🔄 Запуск парсинга забегов ({trigger})...")
+            sweep_started = time.perf_counter()
+
+            for parser in self.parsers:
+                source = parser.SOURCE_NAME
+                self.progress["current"] = source
+                started = time.perf_counter()
+                try:
+                    logger.info(f"Парсинг {source}...")
+                    if parser.STATE_JOB:
+                        parser.state = await self._load_parser_state(parser.STATE_JOB)
+                    races = await parser.parse_upcoming()
+                    PARSER_RACES.inc(len(races), source=source)
+
+                    added = 0
+                    for race in races:
+                        is_new = await self._save_race(race)
+                        if is_new:
+                            added += 1
+                    # Состояние — после записи забегов: упавший прогон повторит те же события
+                    if parser.STATE_JOB and parser.state:
+                        await db.save_job_run(parser.STATE_JOB, self.progress["started_at"], _utcnow(),
+                                              success=True, result=parser.state)
+
+                    results[source] = added
+                    PARSER_ADDED.inc(added, source=source)
+                    logger.info(f"{source}: добавлено {added} забегов")
+
+                except Exception as e:
+                    logger.error(f"Ошибка парсинга {source}: {e}")
+                    results[source] = 0
+                    errors[source] = str(e)[:200]
+                    PARSER_ERRORS.inc(source=source)
+                finally:
+                    await parser.close()
+                    PARSER_SECONDS.observe(time.perf_counter() - started, source=source)
+                    self.progress["done"] += 1
+
+            PARSE_SWEEP_SECONDS.set(round(time.perf_counter() - sweep_started, 3), trigger=trigger)
+            if len(errors) < len(self.parsers):
+                PARSE_LAST_SUCCESS.set(round(time.time()))
+
+            self.progress["current"] = None
+            self.progress["finished_at"] = _utcnow()
+            total = sum(results.values())
+            logger.info(f"✅ Парсинг завершён. Всего добавлено: {total} забегов")
+
+            # Успешный — если ответил хотя бы один источник (сайты падают по одному)
             try:
-                logger.info(f"Парсинг {parser.SOURCE_NAME}...")
-                races = await parser.parse_upcoming()
-                
-                added = 0
-                for race in races:
-                    is_new = await self._save_race(race)
-                    if is_new:
-                        added += 1
-                
-                results[parser.SOURCE_NAME] = added
-                logger.info(f"{parser.SOURCE_NAME}: добавлено {added} забегов")
-                
-                await parser.close()
-                
+                await db.save_job_run(
+                    PARSE_JOB, self.progress["started_at"], self.progress["finished_at"],
+                    success=len(errors) < len(self.parsers),
+                    result={"trigger": trigger, "results": results, "errors": errors},
+                )
             except Exception as e:
-                logger.error(f"Ошибка парсинга {parser.SOURCE_NAME}: {e}")
-                results[parser.SOURCE_NAME] = 0
-        
-        total = sum(results.values())
-        logger.info(f"✅ Парсинг завершён. Всего добавлено: {total} забегов")
-        
+                logger.error(f"Ошибка сохранения прогона парсинга: {e}")
+
+        await self.refresh_analytics()
+
         return results
+
+    async def _load_parser_state(self, job: str) -> Dict:
+        """Состояние инкрементального парсера из job_runs ({} — первый прогон, полный)"""
+        try:
+            run = await db.get_job_run(job)
+        except Exception as e:
+            logger.error(f"Не удалось прочитать состояние {job}: {e}")
+            return {}
+        return (run or {}).get("result") or {}
+
+    async def last_success_age(self) -> Optional[timedelta]:
+        """Сколько прошло с последнего успешного парсинга (None — не было или неизвестно)"""
+        run = await db.get_job_run(PARSE_JOB)
+        if not run or not run["last_success_at"]:
+            return None
+        last = datetime.strptime(run["last_success_at"], TIME_FORMAT).replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - last
+
+    async def start_initial_parse(self) -> Optional[asyncio.Task]:
+        """
+        Первичный парсинг при запуске — фоновой задачей, бот отвечает сразу.
+        Пропускается, если последний успешный был меньше INITIAL_PARSE_MAX_AGE_HOURS назад.
+        Returns: задача или None, если парсинг не нужен
+        """
+        try:
+            age = await self.last_success_age()
+        except Exception as e:
+            logger.error(f"Не удалось прочитать время последнего парсинга: {e}")
+            age = None
+        if age is not None and age < timedelta(hours=INITIAL_PARSE_MAX_AGE_HOURS):
+            logger.info(f"Первичный парсинг пропущен: последний успешный {age.total_seconds() / 3600:.1f} ч назад")
+            return None
+
+        async def _run():
+            try:
+                results = await self.parse_all(trigger="startup")
+                logger.info(f"✅ Первичный парсинг завершён. Добавлено забегов: {sum(results.values())}")
+            except asyncio.CancelledError:
+                logger.info("Первичный парсинг прерван остановкой бота")
+                raise
+            except Exception as e:
+                logger.error(f"⚠️ Ошибка первичного парсинга: {e}")
+
+        self._initial_task = asyncio.create_task(_run(), name="initial_parse")
+        return self._initial_task
+
+    async def refresh_analytics(self):
+        """Пересчёт снимка аналитики разработчика (/dev читает только снимок)"""
+        try:
+            await db.refresh_analytics_snapshot("overview")
+        except Exception as e:
+            logger.error(f"Ошибка пересчёта аналитики: {e}")
     
     async def _save_race(self, race: Dict) -> bool:
         """
@@ -112,6 +244,7 @@ class ParseScheduler:
                 distances=race.get('distances', '[]'),
                 website_url=race.get('website_url', ''),
                 protocol_url=race.get('protocol_url', ''),
+                source=race.get('source', ''),
             )
             return True
             
@@ -128,12 +261,22 @@ class ParseScheduler:
             id='daily_parse',
             name='Ежедневный парсинг забегов'
         )
+
+        # Снимок аналитики для /dev — каждые 30 минут
+        self.scheduler.add_job(
+            self.refresh_analytics,
+            IntervalTrigger(minutes=30),
+            id='analytics_snapshot',
+            name='Пересчёт аналитики разработчика'
+        )
         
         self.scheduler.start()
-        logger.info("📅 Планировщик запущен (парсинг в 3:00 ежедневно)")
+        logger.info("📅 Планировщик запущен (парсинг в 3:00 ежедневно, аналитика каждые 30 мин)")
     
     def stop(self):
-        """Остановка планировщика"""
+        """Остановка планировщика (и первичного парсинга, если он ещё идёт)"""
+        if self._initial_task and not self._initial_task.done():
+            self._initial_task.cancel()
         self.scheduler.shutdown()
         logger.info("📅 Планировщик остановлен")
 
@@ -145,4 +288,4 @@ scheduler = ParseScheduler()
 # Функция для ручного запуска из бота
 async def run_parse() -> Dict[str, int]:
     """Ручной запуск парсинга (для команды /parse)"""
-    return await scheduler.parse_all()
+    return await scheduler.parse_all(trigger="manual")
@@ -0,0 +1,368 @@
+"""
+Seido Bot - Профилирование долгих прогонов: сбор результатов (collect_results) и парсинг забегов
+Режимы:
+  - sample — выборочный, раз в PROFILE_SAMPLE_MS снимается:
+      * цепочка await профилируемой задачи — «стена»: куда уходит время прогона, включая
+        ожидание сети, браузера и SQLite → <метка>.wall.folded;
+      * стеки всех потоков (с потоком aiosqlite) — процессор → <метка>.cpu.folded;
+    .folded — формат flamegraph.pl / speedscope / inferno: «кадр;кадр;...;кадр число».
+  - cprofile — cProfile потока цикла событий: точные вызовы, но без ожиданий → <метка>.prof
+    (snakeviz, flameprof, pstats).
+Итог по этапам — download, browser, parse, normalize, db (+ import, other) — по модулю ближайшего
+к вершине стека кадра (STAGE_RULES) и топ функций в каждом этапе → <метка>.txt.
+Файлы — logs/profiles/. Запуск: --profile у collect_results и parse_races, /admin_profile в боте.
+"""
+import asyncio
+import cProfile
+import linecache
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    from config import PROFILE_SAMPLE_MS, PROFILE_TOP
+except ImportError:
+    from bot.config import PROFILE_SAMPLE_MS, PROFILE_TOP
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "logs", "profiles")
+MODES = ("sample", "cprofile")
+STAGES = ("download", "browser", "parse", "normalize", "db", "import", "other")
+BOT_DIR = os.path.dirname(os.path.abspath(__file__)).replace("\\", "/")
+
+# Этап по пути файла кадра; кадры проверяются от вершины стека вниз, первое совпадение — этап
+STAGE_RULES = (
+    # Первый импорт модулей парсеров (bs4, aiohttp, pandas) — отдельно, иначе он попадёт в их этап
+    ("import", ("<frozen importlib",)),
+    ("browser", ("playwright", "rr_results_parser.py", "runc_results_parser.py", "raceresult_parser.py")),
+    ("download", ("aiohttp", "aiohappyeyeballs", "yarl", "multidict", "/ssl.py", "/socket.py",
+                  "/asyncio/sslproto.py", "/http/")),
+    ("parse", ("bs4", "soupsieve", "lxml", "html5lib", "/html/parser.py", "/json/", "pdfplumber", "pdfminer",
+               "pypdfium2", "openpyxl", "pandas", "/parsers/", "pdf_parser.py", "excel_parser.py")),
+    ("normalize", ("normalize_data.py", "distances.py")),
+    ("db", ("aiosqlite", "sqlite3", "/db.py", "query_stats.py")),
+)
+# Поток ждёт, если верхний кадр стоит на блокирующем вызове из C (select цикла событий,
+# SimpleQueue.get в потоке aiosqlite, Event.wait) — такие выборки в процессорный профиль не идут
+IDLE_CALLS = ("select(", "poll(", ".get(", ".wait(", ".acquire(", "sleep(")
+
+# Кадр: (файл, функция, первая строка)
+Frame = Tuple[str, str, int]
+
+
+def frame_stage(filename: str) -> Optional[str]:
+    path = filename.replace("\\", "/")
+    for stage, patterns in STAGE_RULES:
+        if any(p in path for p in patterns):
+            return stage
+    return None
+
+
+def stack_stage(stack: Tuple[Frame, ...]) -> str:
+    """Этап выборки: стек от корня к вершине"""
+    for filename, _, _ in reversed(stack):
+        stage = frame_stage(filename)
+        if stage:
+            return stage
+    return "other"
+
+
+def frame_label(frame: Frame) -> str:
+    filename, name, line = frame
+    if filename == "~":  # встроенная функция в cProfile
+        return name
+    parts = filename.replace("\\", "/").split("/")
+    return f"{name} ({'/'.join(parts[-2:])}:{line})"
+
+
+def _is_bot_code(filename: str) -> bool:
+    path = filename.replace("\\", "/")
+    return path.startswith(BOT_DIR) and not path.endswith("/profiling.py")
+
+
+def _frames(frame) -> List:
+    """Кадры потока от корня к вершине"""
+    out = []
+    while frame is not None:
+        out.append(frame)
+        frame = frame.f_back
+    out.reverse()
+    return out
+
+
+def _is_waiting(frame) -> bool:
+    line = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+    return any(call in line for call in IDLE_CALLS)
+
+
+def _key(frame) -> Frame:
+    code = frame.f_code
+    return code.co_filename, code.co_name, code.co_firstlineno
+
+
+class ProfileReport:
+    """Итог профилирования: доли этапов, топ функций по этапам и в коде бота, файлы"""
+
+    def __init__(self, label: str, mode: str, seconds: float, samples: int,
+                 stages: Dict[str, float], top: Dict[str, List[Tuple[str, float]]],
+                 bot_code: List[Tuple[str, float]], cpu_stages: Optional[Dict[str, float]] = None):
+        self.label = label
+        self.mode = mode
+        self.seconds = seconds
+        self.samples = samples
+        self.stages = stages
+        self.cpu_stages = cpu_stages or {}
+        self.top = top
+        self.bot_code = bot_code
+        self.files: List[str] = []
+
+    def format(self) -> str:
+        unit = "выборок" if self.mode == "sample" else "функций"
+        lines = [f"⏱ Профиль {self.label}: {self.seconds:.1f} с, режим {self.mode}, {self.samples} {unit}", ""]
+        title = "Этапы (доля времени прогона):" if self.mode == "sample" else "Этапы (доля собственного времени функций):"
+        lines.append(title)
+        for stage in STAGES:
+            share = self.stages.get(stage, 0.0)
+            cpu = f"   процессор {self.cpu_stages[stage]:5.1%}" if stage in self.cpu_stages else ""
+            lines.append(f"  {stage:<10} {share:6.1%}  {share * self.seconds:8.1f} с{cpu}")
+        for stage in STAGES:
+            if not self.top.get(stage):
+                continue
+            lines.append(f"\n{stage} — топ:")
+            lines.extend(f"  {share:6.1%}  {label}" for label, share in self.top[stage])
+        if self.bot_code:
+            lines.append("\nКод бота (ближайший к вершине стека кадр из bot/):")
+            lines.extend(f"  {share:6.1%}  {label}" for label, share in self.bot_code)
+        if self.files:
+            lines.append("\nФайлы:")
+            lines.extend(f"  {path}" for path in self.files)
+        return "\n".join(lines)
+
+
+class _Sampler(threading.Thread):
+    """Поток выборок: цепочка await задачи и стеки всех потоков"""
+
+    def __init__(self, interval: float, task: Optional[asyncio.Task], loop_thread: int):
+        super().__init__(name="seido-profiler", daemon=True)
+        self.interval = interval
+        self.task = task
+        self.loop_thread = loop_thread
+        self.loop_name = threading.current_thread().name
+        self.wall: Counter = Counter()
+        self.cpu: Counter = Counter()
+        self.ticks = 0
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop_event.wait(self.interval):
+            if self.ticks % 100 == 0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            self.ticks += 1
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own or _is_waiting(frame):
+                    continue
+                stack = tuple(_key(f) for f in _frames(frame))
+                self.cpu[(names.get(ident, str(ident)), stack)] += 1
+            if self.task is not None and not self.task.done():
+                stack = self._task_stack(frames.get(self.loop_thread))
+                if stack:
+                    self.wall[stack] += 1
+
+    def _task_stack(self, loop_frame) -> Tuple[Frame, ...]:
+        """Цепочка await задачи; если задача сейчас выполняется — плюс синхронные кадры под ней"""
+        chain = []
+        coro = self.task.get_coro()
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            chain.append(frame)
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+            # asyncio.wait_for и подобные ждут отдельную задачу — идём в её корутину
+            if isinstance(coro, asyncio.Task):
+                coro = coro.get_coro()
+        if not chain:
+            return ()
+        stack = [_key(f) for f in chain]
+        if loop_frame is not None:
+            thread_frames = _frames(loop_frame)
+            for i, frame in enumerate(thread_frames):
+                if frame is chain[-1]:
+                    stack.extend(_key(f) for f in thread_frames[i + 1:])
+                    break
+        return tuple(stack)
+
+
+class Profiler:
+    """Профилирование одного прогона: start() в задаче прогона, stop() → ProfileReport и файлы"""
+
+    def __init__(self, label: str, mode: str = "sample", interval_ms: float = PROFILE_SAMPLE_MS,
+                 top: int = PROFILE_TOP, out_dir: str = PROFILE_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode} (есть {', '.join(MODES)})")
+        self.label = label
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.top = top
+        self.out_dir = out_dir
+        self.report: Optional[ProfileReport] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        global _active
+        if _active is not None:
+            raise RuntimeError(f"Уже идёт профилирование: {_active.label}")
+        _active = self
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                task = None
+            self._sampler = _Sampler(self.interval, task, threading.get_ident())
+            self._sampler.start()
+
+    def stop(self) -> ProfileReport:
+        global _active
+        seconds = time.perf_counter() - self._started
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self.report = self._cprofile_report(seconds)
+            else:
+                self._sampler.stop()
+                self.report = self._sample_report(seconds)
+        finally:
+            _active = None
+        self._write()
+        return self.report
+
+    def _top(self, counter: Counter, total: float) -> List[Tuple[str, float]]:
+        return [(frame_label(frame), value / total) for frame, value in counter.most_common(self.top)]
+
+    def _sample_report(self, seconds: float) -> ProfileReport:
+        sampler = self._sampler
+        # Без задачи (запуск вне цикла событий) «стеной» служит стек потока, где вызван start()
+        wall = sampler.wall
+        if sampler.task is None:
+            wall = Counter({stack: n for (name, stack), n in sampler.cpu.items() if name == sampler.loop_name})
+        total = sum(wall.values()) or 1
+        stages, leaves, bot_code = Counter(), {}, Counter()
+        for stack, count in wall.items():
+            stage = stack_stage(stack)
+            stages[stage] += count
+            leaves.setdefault(stage, Counter())[stack[-1]] += count
+            own = next((f for f in reversed(stack) if _is_bot_code(f[0])), None)
+            if own:
+                bot_code[own] += count
+
+        cpu_stages, cpu_total = Counter(), 0
+        for (_, stack), count in sampler.cpu.items():
+            if not stack:
+                continue
+            cpu_stages[stack_stage(stack)] += count
+            cpu_total += count
+        return ProfileReport(
+            self.label, self.mode, seconds, sampler.ticks,
+            stages={stage: stages[stage] / total for stage in STAGES},
+            top={stage: self._top(counter, total) for stage, counter in leaves.items()},
+            bot_code=self._top(bot_code, total),
+            cpu_stages={stage: cpu_stages[stage] / cpu_total for stage in STAGES} if cpu_total else None,
+        )
+
+    def _cprofile_report(self, seconds: float) -> ProfileReport:
+        stats = pstats.Stats(self._profile).stats
+        stages, by_stage, bot_code = Counter(), {}, Counter()
+        for (filename, line, name), (_, _, tottime, _, callers) in stats.items():
+            if filename == "~":
+                # Встроенная функция: её время — этапу вызывающего кадра, ожидание select цикла событий не считается
+                for (caller_file, _, _), caller_stats in callers.items():
+                    if caller_file.endswith("selectors.py"):
+                        continue
+                    stage = frame_stage(caller_file) or "other"
+                    stages[stage] += caller_stats[2]
+                    by_stage.setdefault(stage, Counter())[(filename, name, line)] += caller_stats[2]
+                continue
+            stage = frame_stage(filename) or "other"
+            stages[stage] += tottime
+            by_stage.setdefault(stage, Counter())[(filename, name, line)] += tottime
+            if _is_bot_code(filename):
+                bot_code[(filename, name, line)] += tottime
+        total = sum(stages.values()) or 1
+        return ProfileReport(
+            self.label, self.mode, seconds, len(stats),
+            stages={stage: stages[stage] / total for stage in STAGES},
+            top={stage: self._top(counter, total) for stage, counter in by_stage.items()},
+            bot_code=self._top(bot_code, total),
+        )
+
+    def _write(self) -> None:
+        base = os.path.join(self.out_dir, f"{self.label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            if self._profile is not None:
+                self._profile.dump_stats(base + ".prof")
+                self.report.files.append(base + ".prof")
+            else:
+                _write_folded(base + ".wall.folded", ((stack, n) for stack, n in self._sampler.wall.items()))
+                _write_folded(base + ".cpu.folded", (((("thread", name, 0),) + stack, n)
+                                                     for (name, stack), n in self._sampler.cpu.items()))
+                self.report.files += [base + ".wall.folded", base + ".cpu.folded"]
+            self.report.files.append(base + ".txt")
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(self.report.format() + "\n")
+        except OSError as e:
+            logger.warning(f"Не удалось записать профиль: {e}")
+
+
+def _write_folded(path: str, stacks) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks:
+            names = [name if filename == "thread" else frame_label((filename, name, line))
+                     for filename, name, line in stack]
+            f.write(";".join(n.replace(";", ",") for n in names) + f" {count}\n")
+
+
+# Профилировщик, который сейчас работает (cProfile и выборки — по одному на процесс)
+_active: Optional[Profiler] = None
+
+
+def is_profiling() -> bool:
+    return _active is not None
+
+
+@asynccontextmanager
+async def profiled(label: str, mode: Optional[str] = "sample", **kwargs) -> AsyncIterator[Optional[Profiler]]:
+    """
+    async with profiled("collect", "sample") as profiler: ...
+    После выхода — profiler.report; mode=None — без профилирования (для флага --profile)
+    """
+    if not mode:
+        yield None
+        return
+    profiler = Profiler(label, mode, **kwargs)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
@@ -0,0 +1,300 @@
+"""
+Seido Bot - Время запросов к SQLite
+Database.db оборачивается в TimedConnection: каждый execute засекается и
+записывается в гистограмму метода Database, который его вызвал (get_races_filtered,
+search_results_by_name, ...). Запросы дольше SLOW_QUERY_MS попадают в журнал медленных
+вместе с EXPLAIN QUERY PLAN — так видно, какой индекс перестал использоваться.
+Смотреть: /dev → «Запросы БД», GET /metrics/db (режим webhook).
+"""
+import logging
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+import aiosqlite
+
+try:
+    from config import SLOW_QUERY_MS
+    from metrics import cache_hit, histogram_lines, registry
+    from tracing import add_span
+except ImportError:
+    from bot.config import SLOW_QUERY_MS
+    from bot.metrics import cache_hit, histogram_lines, registry
+    from bot.tracing import add_span
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы, мс (последняя корзина — всё, что больше)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# Сколько последних медленных запросов хранить
+SLOW_LOG_SIZE = 50
+# Планы запросов кэшируются по тексту SQL
+PLAN_CACHE_SIZE = 200
+# EXPLAIN QUERY PLAN имеет смысл только для этих операторов
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class MethodStats:
+    """Счётчики и гистограмма времени одного метода"""
+
+    __slots__ = ("calls", "errors", "rows", "total", "max", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds: float, rows: int) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по гистограмме (верхняя граница корзины), мс"""
+        if not self.calls:
+            return 0.0
+        max_ms = round(self.max * 1000, 1)
+        need = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= need and i < len(BUCKETS_MS):
+                return min(BUCKETS_MS[i], max_ms)
+        return max_ms
+
+
+class QueryStats:
+    """Статистика запросов по методам и журнал медленных"""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.started_at = time.monotonic()
+        self.methods: Dict[str, MethodStats] = {}
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=SLOW_LOG_SIZE)
+        self._plans: Dict[str, List[str]] = {}
+
+    def _method(self, method: str) -> MethodStats:
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+        return stats
+
+    def add(self, method: str, seconds: float, rows: int = 0) -> None:
+        self._method(method).add(seconds, rows)
+
+    def error(self, method: str) -> None:
+        self._method(method).errors += 1
+
+    async def record(self, conn: aiosqlite.Connection, method: str, sql: str,
+                     params: Any, seconds: float, rows: int) -> None:
+        self.add(method, seconds, rows)
+        if seconds * 1000 < self.slow_ms:
+            return
+        entry = {
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "method": method,
+            "ms": round(seconds * 1000, 1),
+            "rows": rows,
+            "sql": " ".join(sql.split())[:500],
+            "plan": await self._explain(conn, sql, params),
+        }
+        self.slow.append(entry)
+        logger.warning(f"Медленный запрос {method}: {entry['ms']} мс, строк {rows}; "
+                       f"план: {' | '.join(entry['plan']) or '—'}")
+
+    async def _explain(self, conn: aiosqlite.Connection, sql: str, params: Any) -> List[str]:
+        plan = self._plans.get(sql)
+        cache_hit("query_plan", plan is not None)
+        if plan is not None:
+            return plan
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()) as cursor:
+                plan = [row[-1] for row in await cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN не удался: {e}"]
+        if len(self._plans) >= PLAN_CACHE_SIZE:
+            self._plans.pop(next(iter(self._plans)))
+        self._plans[sql] = plan
+        return plan
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Сводка для /dev и /metrics/db: методы по суммарному времени, медленные — новые первыми"""
+        methods = []
+        for name, s in sorted(self.methods.items(), key=lambda kv: -kv[1].total):
+            methods.append({
+                "method": name,
+                "calls": s.calls,
+                "errors": s.errors,
+                "rows": s.rows,
+                "total_ms": round(s.total * 1000, 1),
+                "avg_ms": round(s.total * 1000 / s.calls, 2) if s.calls else 0.0,
+                "p50_ms": s.percentile(0.5),
+                "p95_ms": s.percentile(0.95),
+                "max_ms": round(s.max * 1000, 1),
+                "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], s.buckets)),
+            })
+        return {
+            "uptime_s": round(time.monotonic() - self.started_at),
+            "slow_ms": self.slow_ms,
+            "methods": methods,
+            "slow": list(reversed(self.slow)),
+        }
+
+    def prometheus_lines(self) -> List[str]:
+        """Гистограммы по методам для GET /metrics (корзины — в секундах)"""
+        buckets = [b / 1000 for b in BUCKETS_MS]
+        lines = [
+            "# HELP seido_db_query_seconds Время запросов SQLite по методам Database",
+            "# TYPE seido_db_query_seconds histogram",
+        ]
+        for name, s in sorted(self.methods.items()):
+            lines.extend(histogram_lines("seido_db_query_seconds", ("method",), (name,),
+                                         buckets, s.buckets, s.total))
+        for metric, attr, doc in (("seido_db_query_rows_total", "rows", "Строк выбрано / изменено"),
+                                  ("seido_db_query_errors_total", "errors", "Ошибки запросов")):
+            lines.append(f"# HELP {metric} {doc}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, s in sorted(self.methods.items()):
+                lines.append(f'{metric}{{method="{name}"}} {getattr(s, attr)}')
+        lines.append("# HELP seido_db_slow_queries Медленных запросов в журнале")
+        lines.append("# TYPE seido_db_slow_queries gauge")
+        lines.append(f"seido_db_slow_queries {len(self.slow)}")
+        return lines
+
+    def reset(self) -> None:
+        self.methods.clear()
+        self.slow.clear()
+        self.started_at = time.monotonic()
+
+
+class _CountingCursor:
+    """Курсор, который считает выбранные строки"""
+
+    def __init__(self, cursor: aiosqlite.Cursor):
+        self._cursor = cursor
+        self.rows = 0
+
+    async def fetchone(self):
+        row = await self._cursor.fetchone()
+        if row is not None:
+            self.rows += 1
+        return row
+
+    async def fetchall(self):
+        rows = await self._cursor.fetchall()
+        self.rows += len(rows)
+        return rows
+
+    async def fetchmany(self, size: Optional[int] = None):
+        rows = await (self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+        self.rows += len(rows)
+        return rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for row in self._cursor:
+            self.rows += 1
+            yield row
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class _TimedQuery:
+    """
+    То же, что aiosqlite Result: можно `await` (время execute, строки — rowcount)
+    и `async with` (время до выхода из блока, строки — сколько выбрано)
+    """
+
+    __slots__ = ("_conn", "_stats", "_method", "_sql", "_params", "_started", "_cursor")
+
+    def __init__(self, conn: aiosqlite.Connection, stats: QueryStats, method: str, sql: str, params: Any):
+        self._conn = conn
+        self._stats = stats
+        self._method = method
+        self._sql = sql
+        self._params = params
+        self._started = 0.0
+        self._cursor: Optional[_CountingCursor] = None
+
+    async def _execute(self) -> aiosqlite.Cursor:
+        self._started = time.perf_counter()
+        try:
+            return await self._conn.execute(self._sql, self._params)
+        except Exception:
+            add_span("db", self._method, self._started, time.perf_counter() - self._started, error=True)
+            self._stats.error(self._method)
+            raise
+
+    def __await__(self):
+        return self._await().__await__()
+
+    async def _await(self) -> aiosqlite.Cursor:
+        cursor = await self._execute()
+        elapsed = time.perf_counter() - self._started
+        rows = max(cursor.rowcount, 0)
+        add_span("db", self._method, self._started, elapsed, rows=rows)
+        await self._stats.record(self._conn, self._method, self._sql, self._params, elapsed, rows)
+        return cursor
+
+    async def __aenter__(self) -> _CountingCursor:
+        self._cursor = _CountingCursor(await self._execute())
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._started
+        await self._cursor.close()
+        add_span("db", self._method, self._started, elapsed, rows=self._cursor.rows)
+        if exc_type is None:
+            await self._stats.record(self._conn, self._method, self._sql, self._params,
+                                     elapsed, self._cursor.rows)
+        else:
+            self._stats.error(self._method)
+
+
+class TimedConnection:
+    """Обёртка aiosqlite.Connection: execute и commit засекаются, остальное — как есть"""
+
+    def __init__(self, conn: aiosqlite.Connection, stats: QueryStats):
+        self._conn = conn
+        self._stats = stats
+
+    @property
+    def raw(self) -> aiosqlite.Connection:
+        return self._conn
+
+    def execute(self, sql: str, parameters: Any = None) -> _TimedQuery:
+        # Имя вызывающей функции — метод Database (или скрипта, который ходит в db.db напрямую)
+        method = sys._getframe(1).f_code.co_name
+        return _TimedQuery(self._conn, self._stats, method, sql, parameters)
+
+    async def commit(self) -> None:
+        started = time.perf_counter()
+        await self._conn.commit()
+        elapsed = time.perf_counter() - started
+        add_span("db", "commit", started, elapsed)
+        self._stats.add("commit", elapsed)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+# Глобальный экземпляр
+query_stats = QueryStats()
+registry.register_collector("db", query_stats.prometheus_lines)
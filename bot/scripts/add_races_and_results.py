@@ -81,7 +81,8 @@ async def add_race_manually(
             race_type=race_type,
             distances=distances_json,
             website_url=website_url,
-            protocol_url=protocol_url
+            protocol_url=protocol_url,
+            source='manual',
         )
         
         print(f"✅ Забег добавлен: {name} (ID: {race_id})")
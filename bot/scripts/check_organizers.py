@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Seido — сверка словаря классификатора (bot/parsers/keywords.json) с docs/ORGANIZERS.md
+Канонические имена в таблице «Канонические имена организаторов» и в keywords.json должны
+совпадать; одно ключевое слово не может вести к двум организаторам или типам забега.
+При расхождении — код возврата 1 (можно запускать перед коммитом).
+С --classify показывает, как классифицируется строка: организатор и тип забега.
+
+Запуск: python -m bot.scripts.check_organizers
+        python -m bot.scripts.check_organizers --classify "https://iron-star.com/event/x" "IronStar Сочи"
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Set
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "bot"))
+
+from parsers.classifier import KEYWORDS_PATH, RaceClassifier
+
+ORGANIZERS_DOC = os.path.join(PROJECT_ROOT, "docs", "ORGANIZERS.md")
+TABLE_TITLE = "## Канонические имена организаторов"
+
+
+def doc_canonical_names(path: str = ORGANIZERS_DOC) -> List[str]:
+    """Второй столбец таблицы канонических имён"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    section = text.split(TABLE_TITLE, 1)[1].split("\n## ", 1)[0]
+    names = []
+    for line in section.splitlines():
+        cells = [c.strip() for c in line.strip().strip("|").split("|")]
+        if len(cells) > 2 and cells[0].isdigit():
+            names.append(cells[1])
+    return names
+
+
+def keyword_conflicts(data: Dict) -> List[str]:
+    """Ключевые слова, ведущие к разным значениям внутри одного словаря"""
+    problems = []
+    for kind, key in (("organizers", "canonical_name"), ("race_types", "race_type")):
+        seen: Dict[str, str] = {}
+        for entry in data.get(kind, []):
+            for keyword in entry.get("keywords", []):
+                keyword = keyword.lower()
+                if keyword in seen and seen[keyword] != entry[key]:
+                    problems.append(f"{kind}: «{keyword}» → {seen[keyword]} и {entry[key]}")
+                seen.setdefault(keyword, entry[key])
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка keywords.json с docs/ORGANIZERS.md")
+    parser.add_argument("--keywords", default=KEYWORDS_PATH)
+    parser.add_argument("--doc", default=ORGANIZERS_DOC)
+    parser.add_argument("--classify", nargs=2, metavar=("URL", "NAME"), help="Классифицировать URL и название")
+    args = parser.parse_args()
+
+    with open(args.keywords, encoding="utf-8") as f:
+        data = json.load(f)
+    classifier = RaceClassifier(data)
+    if args.classify:
+        organizer, race_type = classifier.classify(*args.classify)
+        print(f"Организатор: {organizer or '— (не найден)'}\nТип забега: {race_type}")
+        return
+
+    in_data: Set[str] = {entry["canonical_name"] for entry in data.get("organizers", [])}
+    in_doc = set(doc_canonical_names(args.doc))
+    problems = []
+    for name in sorted(in_data - in_doc):
+        problems.append(f"нет в {os.path.relpath(args.doc, PROJECT_ROOT)}: {name}")
+    for name in sorted(in_doc - in_data):
+        problems.append(f"нет в {os.path.relpath(args.keywords, PROJECT_ROOT)}: {name}")
+    problems += keyword_conflicts(data)
+
+    no_keywords = [e["canonical_name"] for e in data.get("organizers", []) if not e.get("keywords")]
+    print(f"📋 Организаторов: {len(in_data)} (в справочнике {len(in_doc)}), ключевых слов: "
+          f"{classifier.keyword_count}, состояний автомата: {classifier.automaton.states}")
+    if no_keywords:
+        print(f"ℹ️ Без ключевых слов (не определяются автоматически): {', '.join(no_keywords)}")
+    if problems:
+        print("❌ Расхождения:")
+        for problem in problems:
+            print(f"   {problem}")
+        sys.exit(1)
+    print("✅ keywords.json и docs/ORGANIZERS.md совпадают")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ from datetime import datetime, timedelta, date
 import re
 from bs4 import BeautifulSoup
 
+from bot.config import RR_SHARD_DAYS
+from bot.parsers.rr_api import RussiaRunningClient
+
 PROTOCOLS_DIR = Path(__file__).parent.parent / "protocols"
 PROTOCOLS_DIR.mkdir(exist_ok=True)
 
@@ -149,33 +152,22 @@ async def find_russiarunning_protocols():
     """
     print("🔍 Поиск забегов RussiaRunning (2026)...")
     
-    api_url = "https://russiarunning.com/api/events/list/ru"
     events = []
     
     try:
-        payload = {
-            "Take": 500,
-            "DateFrom": f"{RESULTS_YEAR}-01-01",
-            "DateTo": f"{RESULTS_YEAR}-12-31"
-        }
-        headers = {"Content-Type": "application/json", "User-Agent": "Mozilla/5.0"}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(api_url, json=payload, headers=headers) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    for item in data.get("Items", []):
-                        event_date = item.get("d", "").split("T")[0]
-                        if str(RESULTS_YEAR) in event_date:
-                            event_id = item.get("c", "")
-                            events.append({
-                                'url': f"https://russiarunning.com/event/{event_id}/",
-                                'name': f"russiarunning_{item.get('t', 'event')}_{event_date}",
-                                'source': 'RussiaRunning',
-                                'event_id': event_id,
-                                'event_date': event_date
-                            })
-        print(f"   Найдено событий 2026: {len(events)}")
+        async with RussiaRunningClient() as client:
+            items = await client.fetch_range(date(RESULTS_YEAR, 1, 1), date(RESULTS_YEAR, 12, 31),
+                                             shard_days=RR_SHARD_DAYS)
+        for item in items:
+            event_date = item['event_date'].isoformat()
+            events.append({
+                'url': item['url'],
+                'name': f"russiarunning_{item['title'] or 'event'}_{event_date}",
+                'source': 'RussiaRunning',
+                'event_id': item['external_id'],
+                'event_date': event_date
+            })
+        print(f"   Найдено событий {RESULTS_YEAR}: {len(events)}")
     except Exception as e:
         print(f"Ошибка RussiaRunning API: {e}")
     
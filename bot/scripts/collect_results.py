@@ -4,12 +4,14 @@ Seido - Сбор результатов с протоколов завершён
 Загружает протоколы по URL из БД, парсит и импортирует с матчингом бегунов.
 Запуск: python -m bot.scripts.collect_results
         python -m bot.scripts.collect_results --exclude-rr-5verst-s95  # без RR, 5верст, S95
+        python -m bot.scripts.collect_results --max-races 50 --profile sample  # профиль по этапам
 """
 import argparse
 import asyncio
 import logging
 import sys
 import tempfile
+import time
 from pathlib import Path
 
 import aiohttp
@@ -18,6 +20,8 @@ import aiohttp
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from bot.db import db
+from bot.metrics import PLAYWRIGHT_PAGE_SECONDS, PROTOCOL_IMPORT_SECONDS, PROTOCOL_ROWS, PROTOCOL_ROWS_PER_SECOND
+from bot.profiling import MODES as PROFILE_MODES, PROFILE_TOP, profiled
 from bot.scripts.parse_protocol import ProtocolImporter
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
@@ -56,6 +60,21 @@ def _is_downloadable_protocol(url: str) -> bool:
     return False
 
 
+async def _import_timed(importer: ProtocolImporter, source: str, coro) -> None:
+    """Импорт протокола с метриками: строк, время, строк/с по источнику"""
+    before = importer.stats["results_added"]
+    started = time.perf_counter()
+    try:
+        await coro
+    finally:
+        elapsed = time.perf_counter() - started
+        rows = importer.stats["results_added"] - before
+        PROTOCOL_ROWS.inc(rows, source=source)
+        PROTOCOL_IMPORT_SECONDS.observe(elapsed, source=source)
+        if elapsed > 0:
+            PROTOCOL_ROWS_PER_SECOND.set(round(rows / elapsed, 1), source=source)
+
+
 # Источники для исключения (--exclude-rr-5verst-s95)
 EXCLUDE_URL_PATTERNS = (
     "results.russiarunning.com",
@@ -151,9 +170,10 @@ async def run_collect(
                 continue
             try:
                 from bot.scripts.rr_results_parser import fetch_rr_results
-                raw_data = await fetch_rr_results(url)
+                with PLAYWRIGHT_PAGE_SECONDS.time(source="rr"):
+                    raw_data = await fetch_rr_results(url)
                 if raw_data:
-                    await importer.import_from_raw_data(
+                    await _import_timed(importer, "rr", importer.import_from_raw_data(
                         raw_data=raw_data,
                         race_name=race["name"],
                         race_date=race["date"],
@@ -163,7 +183,7 @@ async def run_collect(
                         distance="",
                         website_url=race.get("website_url", ""),
                         protocol_url=url,
-                    )
+                    ))
                 else:
                     logger.warning(f"  Не удалось извлечь результаты")
             except ImportError as e:
@@ -180,9 +200,10 @@ async def run_collect(
                 continue
             try:
                 from bot.scripts.runc_results_parser import fetch_runc_results
-                raw_data = await fetch_runc_results(url)
+                with PLAYWRIGHT_PAGE_SECONDS.time(source="runc"):
+                    raw_data = await fetch_runc_results(url)
                 if raw_data:
-                    await importer.import_from_raw_data(
+                    await _import_timed(importer, "runc", importer.import_from_raw_data(
                         raw_data=raw_data,
                         race_name=race["name"],
                         race_date=race["date"],
@@ -192,7 +213,7 @@ async def run_collect(
                         distance="",
                         website_url=race.get("website_url", ""),
                         protocol_url=url,
-                    )
+                    ))
                 else:
                     logger.warning(f"  Не удалось извлечь результаты RunC")
             except ImportError as e:
@@ -209,9 +230,10 @@ async def run_collect(
                 continue
             try:
                 from bot.scripts.raceresult_parser import fetch_raceresult_results
-                raw_data = await fetch_raceresult_results(url)
+                with PLAYWRIGHT_PAGE_SECONDS.time(source="raceresult"):
+                    raw_data = await fetch_raceresult_results(url)
                 if raw_data:
-                    await importer.import_from_raw_data(
+                    await _import_timed(importer, "raceresult", importer.import_from_raw_data(
                         raw_data=raw_data,
                         race_name=race["name"],
                         race_date=race["date"],
@@ -221,7 +243,7 @@ async def run_collect(
                         distance="",
                         website_url=race.get("website_url", ""),
                         protocol_url=url,
-                    )
+                    ))
                 else:
                     logger.warning(f"  Не удалось извлечь результаты RaceResult")
             except ImportError as e:
@@ -236,7 +258,7 @@ async def run_collect(
             logger.warning(f"  Пропуск (не удалось скачать)")
             continue
         try:
-            await importer.import_protocol(
+            await _import_timed(importer, "file", importer.import_protocol(
                 file_path=str(path),
                 race_name=race["name"],
                 race_date=race["date"],
@@ -246,7 +268,7 @@ async def run_collect(
                 distance="",
                 website_url=race.get("website_url", ""),
                 protocol_url=url,
-            )
+            ))
         except Exception as e:
             logger.warning(f"  Ошибка импорта: {e}")
         finally:
@@ -257,6 +279,8 @@ async def run_collect(
         f"результатов {importer.stats['results_added']}, "
         f"ошибок {importer.stats['errors']}"
     )
+    # Снимок аналитики /dev — пересчёт один раз после прогона, а не при каждом открытии
+    await db.refresh_analytics_snapshot("overview")
 
 
 async def main():
@@ -275,19 +299,25 @@ async def main():
                         help="Только забеги до даты (YYYY-MM-DD), например 2024-01-01 для 2023")
     parser.add_argument("--loop", type=int, default=1,
                         help="Запустить N раз подряд (для долгого сбора)")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="Профилировать прогон: sample (время по этапам, .folded) или cprofile (.prof)")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_TOP, help="Функций в топе каждого этапа")
     args = parser.parse_args()
     await db.connect()
     for i in range(args.loop):
         if args.loop > 1:
             logger.info(f"=== Прогон {i + 1}/{args.loop} ===")
-        await run_collect(
-            exclude_rr_5verst_s95=args.exclude_rr_5verst_s95,
-            max_races=args.max_races,
-            runc_limit=args.runc_limit,
-            raceresult_limit=args.raceresult_limit,
-            rr_limit=args.rr_limit,
-            date_to=args.date_to,
-        )
+        async with profiled("collect", args.profile, top=args.profile_top) as profiler:
+            await run_collect(
+                exclude_rr_5verst_s95=args.exclude_rr_5verst_s95,
+                max_races=args.max_races,
+                runc_limit=args.runc_limit,
+                raceresult_limit=args.raceresult_limit,
+                rr_limit=args.rr_limit,
+                date_to=args.date_to,
+            )
+        if profiler:
+            print(profiler.report.format())
         if i < args.loop - 1:
             import time
             time.sleep(5)  # пауза между прогонами
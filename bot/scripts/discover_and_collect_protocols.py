@@ -10,47 +10,41 @@ import asyncio
 import re
 import sys
 from pathlib import Path
-from datetime import date, datetime
+from datetime import date, timedelta
 
 import aiohttp
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from bot.config import RR_SHARD_DAYS
 from bot.db import db
+from bot.parsers.rr_api import RussiaRunningClient
 
 
 DATE_FROM = "2025-01-01"
 DATE_TO = "2026-02-20"
-RUSSIA_RUNNING_API = "https://russiarunning.com/api/events/list/ru"
 
 
 async def fetch_rr_events() -> list:
     """События RussiaRunning за период (включая прошедшие)"""
-    payload = {"Take": 1000, "DateFrom": DATE_FROM}
-    async with aiohttp.ClientSession() as session:
-        async with session.post(RUSSIA_RUNNING_API, json=payload) as resp:
-            if resp.status != 200:
-                log(f"RussiaRunning API error: {resp.status}")
-                return []
-            data = await resp.json()
     today = date.today()
-    date_to = datetime.strptime(DATE_TO, "%Y-%m-%d").date()
-    events = []
-    for item in data.get("Items", []):
-        try:
-            ds = item.get("d", "").split("T")[0]
-            d = datetime.strptime(ds, "%Y-%m-%d").date()
-            if d < today and d <= date_to:  # только прошедшие
-                events.append({
-                    "title": item.get("t", "").strip(),
-                    "city": item.get("p", "").strip(),
-                    "date": d.isoformat(),
-                    "url": f"https://russiarunning.com/event/{item.get('c', '')}/",
-                    "external_id": str(item.get("c", "")),
-                })
-        except (ValueError, TypeError):
-            continue
-    return events
+    date_to = min(date.fromisoformat(DATE_TO), today - timedelta(days=1))  # только прошедшие
+    try:
+        async with RussiaRunningClient() as client:
+            items = await client.fetch_range(date.fromisoformat(DATE_FROM), date_to, shard_days=RR_SHARD_DAYS)
+    except Exception as e:
+        log(f"RussiaRunning API error: {e}")
+        return []
+    return [
+        {
+            "title": ev["title"],
+            "city": ev["city"],
+            "date": ev["event_date"].isoformat(),
+            "url": ev["url"],
+            "external_id": ev["external_id"],
+        }
+        for ev in sorted(items, key=lambda ev: ev["event_date"])
+    ]
 
 
 async def find_protocol_url(page_url: str) -> str | None:
@@ -133,7 +127,7 @@ async def _upsert_race_with_protocol(ev: dict, organizer: str, race_type: str, p
     rid = await db.add_race(
         name=ev["name"], date=ev["date"], location=ev.get("location", ""),
         organizer=organizer, race_type=race_type, distances="[]",
-        website_url=website_url, protocol_url=protocol_url or "",
+        website_url=website_url, protocol_url=protocol_url or "", source="discover",
     )
     return rid, True
 
@@ -208,6 +202,7 @@ async def main():
                     distances="[]",
                     website_url=url,
                     protocol_url="",
+                    source="RussiaRunning",
                 )
                 added_races += 1
             except Exception as e:
@@ -88,7 +88,7 @@ async def _upsert_race(ev: dict) -> bool:
     await db.add_race(
         name=ev["name"], date=ev["date"], location=ev.get("location", ""),
         organizer=ev["organizer"], race_type=ev.get("race_type", "шоссе"), distances="[]",
-        website_url=website_url, protocol_url=protocol_url or "",
+        website_url=website_url, protocol_url=protocol_url or "", source="discover",
     )
     return True
 
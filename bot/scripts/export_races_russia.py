@@ -55,8 +55,7 @@ async def run_export(date_from: str = "2025-01-01", date_to: str = "2026-02-22")
 
     sql = """
         SELECT r.id, r.name, r.date, r.location, r.organizer, r.race_type,
-               r.distances, r.website_url, r.protocol_url,
-               (SELECT COUNT(*) FROM results res WHERE res.race_id = r.id) as results_count
+               r.distances, r.website_url, r.protocol_url, r.results_count
         FROM races r
         WHERE r.date >= ? AND r.date <= ?
           AND r.is_active = 1
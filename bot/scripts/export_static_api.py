@@ -0,0 +1,286 @@
+"""
+Экспорт API сайта в статические JSON-файлы
+
+Вместо запросов к api/api.php (каждый раз GROUP BY по MySQL) сайт читает
+готовые файлы из api/static/:
+  races_upcoming.json, races_past.json   — как action=races_upcoming / races_past
+  calendar/YYYY-MM.json                  — забеги месяца
+  race/<id>.json                         — забег с протоколом (action=race)
+  rating/index.json, rating/<метры>.json — рейтинги по дистанциям (action=rating&distance_m=)
+  runner_bests/<telegram_id>.json        — личные рекорды (action=runner_bests)
+  manifest.json                          — версия и ETag (sha256) каждого файла
+
+Файл перезаписывается, только если изменилось содержимое; версия manifest растёт,
+когда изменился хотя бы один файл. Загрузка на хостинг — только изменённых:
+  python scripts/upload_to_hosting.py --static
+
+Запуск:
+  python export_static_api.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from distances import distance_label
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "seido.db")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, "api", "static")
+MANIFEST = "manifest.json"
+
+# Лимиты как в api/api.php
+UPCOMING_LIMIT = 100
+PAST_LIMIT = 50
+RATING_LIMIT = 50
+
+# Кэширование на стороне Apache (reg.ru): браузер перепроверяет файл раз в 5 минут,
+# ETag/Last-Modified не меняются, пока файл не загружен заново
+HTACCESS = """<IfModule mod_headers.c>
+    Header set Cache-Control "public, max-age=300, must-revalidate"
+    Header set Access-Control-Allow-Origin "*"
+</IfModule>
+AddType application/json .json
+"""
+
+
+def _ok(data: Any) -> Dict[str, Any]:
+    """Обёртка ответа как в api.php"""
+    if isinstance(data, list):
+        return {"status": "ok", "count": len(data), "data": data}
+    return {"status": "ok", "data": data}
+
+
+def _race(row: sqlite3.Row) -> Dict[str, Any]:
+    race = {
+        "id": row["id"],
+        "name": row["name"],
+        "date": row["date"],
+        "location": row["location"],
+        "organizer": row["organizer"],
+        "race_type": row["race_type"],
+        "distances": row["distances"],
+        "website_url": row["website_url"],
+        "protocol_url": row["protocol_url"],
+        "is_active": row["is_active"],
+    }
+    if race["distances"]:
+        try:
+            race["distances"] = json.loads(race["distances"])
+        except ValueError:
+            race["distances"] = [{"name": race["distances"]}]
+    if race["date"]:
+        try:
+            race["date_formatted"] = datetime.strptime(race["date"], "%Y-%m-%d").strftime("%d.%m.%Y")
+        except ValueError:
+            pass
+        race["date_iso"] = race["date"]
+    return race
+
+
+def render(conn: sqlite3.Connection, today: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Файлы API по одному: (относительный путь, данные).
+    Результаты читаются потоком по race_id — в памяти один протокол, а не вся таблица.
+    """
+    races = [_race(row) for row in conn.execute("SELECT * FROM races ORDER BY date, name")]
+
+    upcoming = [r for r in races if r["date"] and r["date"] >= today and r["is_active"]]
+    yield "races_upcoming.json", _ok(upcoming[:UPCOMING_LIMIT])
+    past = [r for r in races if r["date"] and r["date"] < today]
+    yield "races_past.json", _ok(past[::-1][:PAST_LIMIT])
+
+    by_month = defaultdict(list)
+    for race in races:
+        if race["date"] and race["is_active"]:
+            by_month[race["date"][:7]].append(race)
+    for month, month_races in by_month.items():
+        yield f"calendar/{month}.json", _ok(month_races)
+    yield "calendar/index.json", _ok(sorted(by_month))
+    del by_month
+
+    # Протокол забега — как только закончилась его группа результатов
+    races_by_id = {race["id"]: race for race in races}
+    rows = conn.execute("""
+        SELECT r.*, ru.first_name, ru.last_name
+        FROM results r
+        JOIN runners ru ON r.runner_id = ru.id
+        ORDER BY r.race_id, r.finish_time_seconds IS NULL, r.finish_time_seconds, r.id
+    """)
+    for race_id, group in groupby(rows, key=lambda row: row["race_id"]):
+        race = races_by_id.pop(race_id, None)
+        results = []
+        for row in group:
+            result = dict(row)
+            result.pop("created_at", None)
+            result.pop("updated_at", None)
+            results.append(result)
+        if race is not None:
+            yield f"race/{race_id}.json", _ok({**race, "results": results})
+    for race_id, race in races_by_id.items():
+        yield f"race/{race_id}.json", _ok({**race, "results": []})
+
+    # Рейтинг: лучший результат каждого бегуна на дистанции (по distance_m — все написания вместе).
+    # Агрегирует SQLite, в Python — только топ RATING_LIMIT дистанции
+    rating_index = []
+    rows = conn.execute("""
+        SELECT distance_m, runner_id, finish_time_seconds AS best_time_seconds, finish_time,
+               races_count, best_place, first_name, last_name, city
+        FROM (
+            SELECT r.distance_m, r.runner_id, r.finish_time_seconds, r.finish_time,
+                   ru.first_name, ru.last_name, ru.city,
+                   ROW_NUMBER() OVER w AS pb,
+                   COUNT(*) OVER w_all AS races_count,
+                   MIN(NULLIF(r.overall_place, 0)) OVER w_all AS best_place
+            FROM results r
+            JOIN runners ru ON r.runner_id = ru.id
+            WHERE r.finish_time_seconds IS NOT NULL AND r.distance_m IS NOT NULL
+            WINDOW w_all AS (PARTITION BY r.distance_m, r.runner_id),
+                   w AS (w_all ORDER BY r.finish_time_seconds, r.id)
+        )
+        WHERE pb = 1
+        ORDER BY distance_m, best_time_seconds, runner_id
+    """)
+    for meters, group in groupby(rows, key=lambda row: row["distance_m"]):
+        top, runners = [], 0
+        for row in group:
+            runners += 1
+            if len(top) < RATING_LIMIT:
+                top.append({
+                    "id": row["runner_id"],
+                    "first_name": row["first_name"],
+                    "last_name": row["last_name"],
+                    "city": row["city"],
+                    "best_time_seconds": row["best_time_seconds"],
+                    "best_time": row["finish_time"],
+                    "races_count": row["races_count"],
+                    "best_place": row["best_place"],
+                })
+        yield f"rating/{meters}.json", _ok(top)
+        rating_index.append({
+            "distance": distance_label(meters),
+            "distance_m": meters,
+            "file": f"rating/{meters}.json",
+            "runners": runners,
+        })
+    yield "rating/index.json", _ok(rating_index)
+
+    # Личные рекорды — только бегунов с Telegram (как runner_bests по telegram_id)
+    rows = conn.execute("""
+        SELECT ru.telegram_id, r.distance, r.distance_m, r.finish_time_seconds, r.finish_time,
+               ra.name AS race_name, ra.date AS race_date
+        FROM results r
+        JOIN runners ru ON r.runner_id = ru.id
+        JOIN races ra ON r.race_id = ra.id
+        WHERE ru.telegram_id IS NOT NULL AND r.finish_time_seconds IS NOT NULL
+        ORDER BY ru.telegram_id, r.id
+    """)
+    for telegram_id, group in groupby(rows, key=lambda row: row["telegram_id"]):
+        per_distance = {}
+        for row in group:
+            key = row["distance_m"] or row["distance"]
+            best = per_distance.get(key)
+            if best is None or row["finish_time_seconds"] < best["best_time_seconds"]:
+                per_distance[key] = {
+                    "distance": distance_label(row["distance_m"]) or row["distance"],
+                    "distance_m": row["distance_m"],
+                    "best_time_seconds": row["finish_time_seconds"],
+                    "best_time": row["finish_time"],
+                    "race_name": row["race_name"],
+                    "race_date": row["race_date"],
+                }
+        ordered = sorted(per_distance.values(), key=lambda b: (b["distance_m"] or 10**9, b["distance"]))
+        yield f"runner_bests/{telegram_id}.json", _ok(ordered)
+
+
+def _etag(content: bytes) -> str:
+    return '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+
+
+def write_files(files: Iterable[Tuple[str, Any]], output_dir: str) -> Dict[str, int]:
+    """
+    Записать изменившиеся файлы по мере поступления, удалить устаревшие и обновить manifest.json.
+    Returns: {"files": N, "changed": N, "unchanged": N, "removed": N, "version": N}
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    old = {"version": 0, "files": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            old = json.load(f)
+
+    def rendered() -> Iterator[Tuple[str, bytes]]:
+        for path, data in files:
+            yield path, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        yield ".htaccess", HTACCESS.encode("utf-8")
+
+    entries, changed = {}, 0
+    for path, content in rendered():
+        etag = _etag(content)
+        entries[path] = {"etag": etag, "size": len(content)}
+        full_path = os.path.join(output_dir, path)
+        if old["files"].get(path, {}).get("etag") == etag and os.path.exists(full_path):
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+        changed += 1
+
+    removed = 0
+    for path in set(old["files"]) - set(entries):
+        try:
+            os.remove(os.path.join(output_dir, path))
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    version = old["version"] + 1 if changed or removed else old["version"]
+    manifest = {
+        "version": version,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S") if version != old["version"]
+        else old.get("generated_at"),
+        "files": dict(sorted(entries.items())),
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return {"files": len(entries), "changed": changed, "unchanged": len(entries) - changed,
+            "removed": removed, "version": version}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Статические JSON-файлы API сайта")
+    parser.add_argument("--db", default=DB_PATH, help="Путь к seido.db")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Папка для файлов (по умолчанию api/static)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Файл базы данных не найден: {args.db}")
+        exit(1)
+
+    print("🔄 Экспорт статического API...")
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    os.makedirs(args.output, exist_ok=True)
+    try:
+        # Все файлы — из одного снимка БД; пишутся по мере формирования
+        conn.execute("BEGIN")
+        stats = write_files(render(conn, date.today().isoformat()), args.output)
+    finally:
+        conn.close()
+
+    print(f"✅ Файлов: {stats['files']}, изменено {stats['changed']}, без изменений {stats['unchanged']}, "
+          f"удалено {stats['removed']}, версия {stats['version']}")
+    print(f"📁 {args.output}")
+    if stats["changed"] or stats["removed"]:
+        print("\n📤 Загрузите изменения: python scripts/upload_to_hosting.py --static")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,134 +1,231 @@
 """
 Экспорт данных из SQLite в SQL файл для импорта в MySQL через phpMyAdmin
+
+Таблицы читаются курсором порциями (в памяти не держится больше одной порции),
+строки пишутся многострочными INSERT ограниченного размера.
+Файл можно сжать (--gzip, phpMyAdmin принимает .sql.gz) и разрезать на части
+не больше --max-size МБ — для лимита загрузки хостинга. Части импортируются по порядку.
+
+Запуск:
+  python export_to_sql.py
+  python export_to_sql.py --gzip --max-size 40
 """
+import argparse
+import gzip
+import os
 import sqlite3
-import json
+import time
 from datetime import datetime
-import os
+from typing import Iterable, Iterator, List, Optional, Sequence
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "seido.db")
 OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "seido_export.sql")
 
-if not os.path.exists(DB_PATH):
-    print(f"❌ Файл базы данных не найден: {DB_PATH}")
-    exit(1)
-
-conn = sqlite3.connect(DB_PATH)
-conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
-
-print("🔄 Экспорт данных из SQLite...")
-
-with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-    f.write("-- Экспорт данных Seido из SQLite\n")
-    f.write(f"-- Дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-    f.write("SET FOREIGN_KEY_CHECKS=0;\n\n")
-    
-    # Экспорт бегунов
-    print("  📊 Экспорт бегунов...")
-    cursor.execute("SELECT * FROM runners")
-    runners = cursor.fetchall()
-    
-    if runners:
-        f.write("-- Бегуны\n")
-        f.write("DELETE FROM runners;\n")
-        for row in runners:
-            values = []
-            for key in row.keys():
-                val = row[key]
-                if val is None:
-                    values.append("NULL")
-                elif isinstance(val, str):
-                    # Экранируем кавычки
-                    val_escaped = val.replace("'", "''").replace("\\", "\\\\")
-                    values.append(f"'{val_escaped}'")
-                elif isinstance(val, (int, float)):
-                    values.append(str(val))
-                else:
-                    values.append(f"'{str(val)}'")
-            
-            columns = ', '.join(row.keys())
-            values_str = ', '.join(values)
-            f.write(f"INSERT INTO runners ({columns}) VALUES ({values_str});\n")
-        print(f"    ✅ Экспортировано {len(runners)} бегунов")
-    
-    # Экспорт забегов
-    print("  🏃 Экспорт забегов...")
-    cursor.execute("SELECT * FROM races")
-    races = cursor.fetchall()
-    
+# Строк в одной порции чтения из SQLite
+FETCH_ROWS = 5000
+# Размер одного INSERT: заметно меньше max_allowed_packet MySQL (по умолчанию 4 МБ)
+STATEMENT_KB = 512
+
+# (таблица, заголовок, колонки MySQL или None — все колонки SQLite)
+EXPORT_TABLES = (
+    ("runners", "Бегуны", None),
     # Колонки, которые есть в MySQL (исключаем organizer_id и другие несуществующие)
-    mysql_race_columns = ['id', 'name', 'date', 'location', 'organizer', 'race_type', 
-                          'distances', 'website_url', 'protocol_url', 'is_active', 
-                          'created_at', 'updated_at']
-    
-    if races:
-        f.write("\n-- Забеги\n")
-        f.write("DELETE FROM races;\n")
-        for row in races:
-            values = []
-            columns = []
-            
-            # Фильтруем только существующие колонки
-            for key in mysql_race_columns:
-                if key in row.keys():
-                    columns.append(key)
-                    val = row[key]
-                    if val is None:
-                        values.append("NULL")
-                    elif isinstance(val, str):
-                        val_escaped = val.replace("'", "''").replace("\\", "\\\\")
-                        values.append(f"'{val_escaped}'")
-                    elif isinstance(val, (int, float)):
-                        values.append(str(val))
-                    elif isinstance(val, dict) or (isinstance(val, str) and val.startswith('{')):
-                        # JSON данные
-                        if isinstance(val, str):
-                            val_escaped = val.replace("'", "''")
-                        else:
-                            val_escaped = json.dumps(val, ensure_ascii=False).replace("'", "''")
-                        values.append(f"'{val_escaped}'")
-                    else:
-                        values.append(f"'{str(val)}'")
-            
-            columns_str = ', '.join(columns)
-            values_str = ', '.join(values)
-            f.write(f"INSERT INTO races ({columns_str}) VALUES ({values_str});\n")
-        print(f"    ✅ Экспортировано {len(races)} забегов")
-    
-    # Экспорт результатов
-    print("  🏆 Экспорт результатов...")
-    cursor.execute("SELECT * FROM results")
-    results = cursor.fetchall()
-    
-    if results:
-        f.write("\n-- Результаты\n")
-        f.write("DELETE FROM results;\n")
-        for row in results:
-            values = []
-            for key in row.keys():
-                val = row[key]
-                if val is None:
-                    values.append("NULL")
-                elif isinstance(val, str):
-                    val_escaped = val.replace("'", "''").replace("\\", "\\\\")
-                    values.append(f"'{val_escaped}'")
-                elif isinstance(val, (int, float)):
-                    values.append(str(val))
-                else:
-                    values.append(f"'{str(val)}'")
-            
-            columns = ', '.join(row.keys())
-            values_str = ', '.join(values)
-            f.write(f"INSERT INTO results ({columns}) VALUES ({values_str});\n")
-        print(f"    ✅ Экспортировано {len(results)} результатов")
-    
-    f.write("\nSET FOREIGN_KEY_CHECKS=1;\n")
-
-conn.close()
-
-print(f"\n✅ Экспорт завершён: {OUTPUT_FILE}")
-print(f"\n📤 Теперь импортируйте этот файл в phpMyAdmin:")
-print(f"   1. Откройте phpMyAdmin")
-print(f"   2. Выберите базу u3426357_seido")
-print(f"   3. Вкладка 'Импорт' → выберите файл → 'Вперёд'")
+    ("races", "Забеги", (
+        "id", "name", "date", "location", "organizer", "race_type",
+        "distances", "website_url", "protocol_url", "is_active",
+        "created_at", "updated_at",
+    )),
+    ("results", "Результаты", None),
+)
+# У бегунов и забегов id SQLite выгружается ещё и в sqlite_id — ключ sync_to_mysql.py,
+# чтобы после импорта дампа синхронизация находила эти строки
+SQLITE_ID_TABLES = ("runners", "races")
+
+HEADER = (
+    "SET NAMES utf8mb4;\n"
+    "SET FOREIGN_KEY_CHECKS=0;\n"
+    "SET UNIQUE_CHECKS=0;\n"
+    "SET autocommit=0;\n\n"
+)
+FOOTER = (
+    "\nCOMMIT;\n"
+    "SET UNIQUE_CHECKS=1;\n"
+    "SET FOREIGN_KEY_CHECKS=1;\n"
+)
+
+_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "'": "\\'",
+    "\0": "\\0",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\x1a": "\\Z",
+})
+
+
+def sql_literal(value) -> str:
+    """Значение SQLite → литерал MySQL"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'" if value else "''"
+    return "'" + str(value).translate(_ESCAPES) + "'"
+
+
+def table_columns(conn: sqlite3.Connection, table: str, wanted: Optional[Sequence[str]]) -> List[str]:
+    """Колонки таблицы SQLite (если задан wanted — только они, в его порядке)"""
+    existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if wanted is None:
+        return existing
+    return [c for c in wanted if c in existing]
+
+
+def iter_rows(conn: sqlite3.Connection, table: str, columns: Sequence[str]) -> Iterator[tuple]:
+    """Строки таблицы порциями по FETCH_ROWS"""
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        yield from rows
+
+
+def insert_statements(table: str, columns: Sequence[str], rows: Iterable[tuple],
+                      max_bytes: int) -> Iterator[tuple]:
+    """
+    Многострочные INSERT размером не больше max_bytes (строка, которая одна больше
+    лимита, уходит отдельным INSERT). Yields: (текст INSERT, число строк в нём)
+    """
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+    values: List[str] = []
+    size = len(prefix)
+    for row in rows:
+        item = "(" + ", ".join(sql_literal(v) for v in row) + ")"
+        # utf-8 кириллица занимает 2 байта — считаем с запасом
+        item_size = len(item) * 2 + 2
+        if values and size + item_size > max_bytes:
+            yield prefix + ",\n".join(values) + ";\n", len(values)
+            values, size = [], len(prefix)
+        values.append(item)
+        size += item_size
+    if values:
+        yield prefix + ",\n".join(values) + ";\n", len(values)
+
+
+class SqlWriter:
+    """
+    Пишет операторы в seido_export.sql[.gz] или, если задан max_bytes, в части
+    seido_export.001.sql[.gz], seido_export.002.sql[.gz], ... Граница частей проходит
+    только между операторами; у каждой части свой заголовок и COMMIT.
+    """
+
+    def __init__(self, path: str, compress: bool = False, max_bytes: Optional[int] = None):
+        base = path[:-3] if path.endswith(".gz") else path
+        self.stem, self.ext = os.path.splitext(base)
+        self.ext = (self.ext or ".sql") + (".gz" if compress else "")
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.paths: List[str] = []
+        self._raw = None
+        self._out = None
+
+    def _open(self) -> None:
+        number = len(self.paths) + 1
+        suffix = f".{number:03d}" if self.max_bytes else ""
+        path = f"{self.stem}{suffix}{self.ext}"
+        self._raw = open(path, "wb")
+        self._out = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6) if self.compress else self._raw
+        self.paths.append(path)
+        self._out.write(f"-- Экспорт данных Seido из SQLite (часть {number})\n".encode("utf-8"))
+        self._out.write(f"-- Дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n".encode("utf-8"))
+        self._out.write(HEADER.encode("utf-8"))
+
+    def _size(self) -> int:
+        # Для gzip — уже сжатые байты на диске (zlib буферизует, оценка слегка занижена)
+        return self._raw.tell()
+
+    def write(self, statement: str) -> None:
+        data = statement.encode("utf-8")
+        if self._out is None:
+            self._open()
+        elif self.max_bytes and self._size() + len(data) // (4 if self.compress else 1) > self.max_bytes:
+            self._close_part()
+            self._open()
+        self._out.write(data)
+
+    def _close_part(self) -> None:
+        self._out.write(FOOTER.encode("utf-8"))
+        if self._out is not self._raw:
+            self._out.close()
+        self._raw.close()
+        self._out = self._raw = None
+
+    def close(self) -> None:
+        if self._out is None:
+            self._open()
+        self._close_part()
+
+
+def export(db_path: str, output: str, compress: bool = False, max_mb: Optional[float] = None,
+           statement_kb: int = STATEMENT_KB) -> List[str]:
+    """Выгрузить таблицы EXPORT_TABLES. Returns: пути созданных файлов"""
+    conn = sqlite3.connect(db_path)
+    writer = SqlWriter(output, compress, int(max_mb * 1024 * 1024) if max_mb else None)
+    try:
+        # Все таблицы — из одного снимка, даже если бот пишет в БД во время экспорта
+        conn.execute("BEGIN")
+        for table, title, wanted in EXPORT_TABLES:
+            started = time.perf_counter()
+            columns = table_columns(conn, table, wanted)
+            insert_columns = list(columns)
+            if table in SQLITE_ID_TABLES and "id" in columns:
+                columns = columns + ["id"]
+                insert_columns.append("sqlite_id")
+            writer.write(f"-- {title}\nDELETE FROM {table};\n")
+            total = 0
+            for statement, count in insert_statements(table, insert_columns, iter_rows(conn, table, columns),
+                                                      statement_kb * 1024):
+                writer.write(statement)
+                total += count
+            writer.write("\n")
+            print(f"    ✅ {title}: {total} строк за {time.perf_counter() - started:.1f} с")
+    finally:
+        writer.close()
+        conn.close()
+    return writer.paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт SQLite → SQL для phpMyAdmin")
+    parser.add_argument("--db", default=DB_PATH, help="Путь к seido.db")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Файл результата")
+    parser.add_argument("--gzip", action="store_true", help="Сжать в .sql.gz")
+    parser.add_argument("--max-size", type=float, help="Разрезать на части не больше N МБ")
+    parser.add_argument("--statement-kb", type=int, default=STATEMENT_KB,
+                        help=f"Максимальный размер одного INSERT, КБ (по умолчанию {STATEMENT_KB})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Файл базы данных не найден: {args.db}")
+        exit(1)
+
+    print("🔄 Экспорт данных из SQLite...")
+    paths = export(args.db, args.output, args.gzip, args.max_size, args.statement_kb)
+
+    print(f"\n✅ Экспорт завершён:")
+    for path in paths:
+        print(f"   {path} ({os.path.getsize(path) / 1024 / 1024:.1f} МБ)")
+    print(f"\n📤 Теперь импортируйте {'файлы по порядку' if len(paths) > 1 else 'этот файл'} в phpMyAdmin:")
+    print(f"   1. Откройте phpMyAdmin")
+    print(f"   2. Выберите базу u3426357_seido")
+    print(f"   3. Вкладка 'Импорт' → выберите файл → 'Вперёд'")
+
+
+if __name__ == "__main__":
+    main()
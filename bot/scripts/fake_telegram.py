@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Seido — fake Telegram Bot API для локальной проверки режима webhook
+Отвечает на вызовы Bot API заглушками, запоминает адрес из setWebhook
+и может отправить на него пачку апдейтов, замерив задержку до ответа бота.
+В режиме polling отдаёт через getUpdates апдейты из очереди updates
+(так startup_report замеряет время до первого обработанного апдейта).
+
+Запуск:
+  python -m bot.scripts.fake_telegram --port 8081
+  (в bot/.env: TELEGRAM_API_URL=http://127.0.0.1:8081, BOT_MODE=webhook,
+   WEBHOOK_URL=http://127.0.0.1:8080)
+  python -m bot.scripts.fake_telegram --port 8081 --updates 200 --users 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+from aiohttp import ClientConnectorError, ClientSession, web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Seido", "username": "seido_fake_bot"}
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.webhook_url = ""
+        self.secret_token = ""
+        self.calls = Counter()
+        self.message_id = 0
+        self.replies = {}  # chat_id -> asyncio.Event (ответ на отправленный апдейт)
+        self.webhook_set = asyncio.Event()
+        self.updates = []  # очередь для getUpdates (режим polling)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    async def _get_updates(self, params: dict) -> list:
+        """Апдейты с update_id >= offset; пустая очередь — короткий long polling"""
+        offset = int(params.get("offset") or 0)
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates:
+            await asyncio.sleep(0.2)
+        return self.updates
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method == "setWebhook":
+            self.webhook_url = params.get("url", "")
+            self.secret_token = params.get("secret_token", "")
+            self.webhook_set.set()
+            return True
+        if method in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument"):
+            chat_id = int(params.get("chat_id") or 0)
+            self.message_id += 1
+            event = self.replies.get(chat_id)
+            if event:
+                event.set()
+            return {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+def _start_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def send_updates(fake: FakeTelegram, count: int, users: int, timeout: float):
+    """Отправить count апдейтов /start от users пользователей, вывести задержки"""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": fake.secret_token} if fake.secret_token else {}
+    latencies, lost = [], 0
+
+    async def one(session: ClientSession, update_id: int):
+        nonlocal lost
+        # Уникальный chat_id на апдейт — чтобы сопоставить ответ бота с запросом
+        chat_id = 10_000_000 + update_id
+        event = fake.replies[chat_id] = asyncio.Event()
+        update = _start_update(update_id, chat_id)
+        update["message"]["from"]["id"] = 10_000 + update_id % users
+        started = time.perf_counter()
+        async with session.post(fake.webhook_url, json=update, headers=headers) as resp:
+            if resp.status != 200:
+                lost += 1
+                return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            latencies.append(time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            lost += 1
+        finally:
+            fake.replies.pop(chat_id, None)
+
+    async with ClientSession() as session:
+        # setWebhook приходит до того, как сервер бота начал слушать порт;
+        # GET на адрес webhook ничего не обрабатывает (405), только проверяет порт
+        for _ in range(50):
+            try:
+                async with session.get(fake.webhook_url):
+                    break
+            except ClientConnectorError:
+                await asyncio.sleep(0.2)
+
+    wall = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(one(session, i + 1) for i in range(count)))
+    wall = time.perf_counter() - wall
+
+    print(f"\n📨 Апдейтов: {count}, ответов: {len(latencies)}, потеряно: {lost}, за {wall:.2f} с")
+    if latencies:
+        ms = sorted(x * 1000 for x in latencies)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        print(f"   задержка, мс: p50={statistics.median(ms):.0f} p95={p95:.0f} max={ms[-1]:.0f}")
+    print(f"   вызовы Bot API: {json.dumps(dict(fake.calls), ensure_ascii=False)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--updates", type=int, default=0, help="Отправить N апдейтов /start после setWebhook")
+    parser.add_argument("--users", type=int, default=10, help="Число разных пользователей в пачке")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Ожидание ответа на апдейт, с")
+    args = parser.parse_args()
+
+    fake = FakeTelegram()
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    print(f"🤖 Fake Bot API: http://{args.host}:{args.port} (ждём setWebhook от бота)")
+
+    try:
+        if args.updates:
+            await fake.webhook_set.wait()
+            print(f"🔗 Webhook: {fake.webhook_url}")
+            await send_updates(fake, args.updates, max(1, args.users), args.timeout)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -4,20 +4,21 @@ Seido — импорт исторических забегов в РФ
 Дубликаты не создаются. Для RR сохраняем protocol_url для последующего сбора протоколов.
 Запуск: python -m bot.scripts.import_historical_races
         python -m bot.scripts.import_historical_races --period 2023
+        python -m bot.scripts.import_historical_races --incremental   # только новые/изменённые в RR
 """
 import argparse
 import asyncio
 import json
 import logging
 import sys
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 
-import aiohttp
-
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from bot.config import RR_SHARD_DAYS
 from bot.db import db
+from bot.parsers.rr_api import RussiaRunningClient
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
@@ -27,67 +28,40 @@ PERIODS = {
     "2024_2026": ("2024-01-01", "2026-02-22"),
     "2023": ("2023-01-01", "2024-01-01"),
 }
-RR_API_URL = "https://russiarunning.com/api/events/list/ru"
-RR_HEADERS = {
-    "Content-Type": "application/json",
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-}
-
+# Состояние --incremental в job_runs
+RR_STATE_JOB = "import_historical_rr"
+
+
+async def fetch_rr_events(date_from: str, date_to: str, state: dict | None = None) -> tuple[list[dict], dict | None]:
+    """
+    События RussiaRunning за период: окна по RR_SHARD_DAYS дней, страницы параллельно.
+    С state (--incremental) — только новые и изменившиеся с прошлого запуска.
+    Returns: (события, новое состояние или None)
+    """
+    start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    try:
+        async with RussiaRunningClient() as client:
+            if state is None:
+                items, new_state = await client.fetch_range(start, end, shard_days=RR_SHARD_DAYS), None
+            else:
+                items, new_state = await client.fetch_changed(start, end, state=state, shard_days=RR_SHARD_DAYS)
+            logger.info(f"  RR: запросов {client.requests}, окон без изменений {client.skipped_windows}")
+    except Exception as e:
+        logger.warning(f"RR API request error: {e}")
+        return [], None
 
-async def fetch_rr_events(date_from: str, date_to: str) -> list[dict]:
-    """Получить все события RussiaRunning за период (с пагинацией)"""
     events = []
-    skip = 0
-    take = 200
-
-    async with aiohttp.ClientSession(headers=RR_HEADERS) as session:
-        while True:
-            payload = {"Take": take, "Skip": skip, "DateFrom": date_from}
-            try:
-                async with session.post(RR_API_URL, json=payload) as resp:
-                    if resp.status != 200:
-                        logger.warning(f"RR API error: {resp.status}")
-                        break
-                    data = await resp.json()
-            except Exception as e:
-                logger.warning(f"RR API request error: {e}")
-                break
-
-            items = data.get("Items", [])
-            if not items:
-                break
-
-            for item in items:
-                event_date_str = (item.get("d") or "").split("T")[0]
-                try:
-                    event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
-                except ValueError:
-                    continue
-
-                date_from_dt = datetime.strptime(date_from, "%Y-%m-%d").date()
-                date_to_dt = datetime.strptime(date_to, "%Y-%m-%d").date()
-                if event_date < date_from_dt or event_date > date_to_dt:
-                    continue
-
-                event_id = item.get("c", "")
-                events.append({
-                    "name": (item.get("t") or "").strip(),
-                    "date": event_date_str,
-                    "location": (item.get("p") or "").strip(),
-                    "url": f"https://russiarunning.com/event/{event_id}/",
-                    "protocol_url": f"https://results.russiarunning.com/event/{event_id}/" if event_id else "",
-                    "organizer": "RussiaRunning",
-                })
-
-            logger.info(f"  RR: загружено {len(events)} событий (skip={skip})")
-            if len(items) < take:
-                break
-            if len(items) == 0:
-                break
-            skip += take
-            await asyncio.sleep(0.5)  # вежливая пауза
-
-    return events
+    for ev in sorted(items, key=lambda ev: ev["event_date"]):
+        event_id = ev["external_id"]
+        events.append({
+            "name": ev["title"],
+            "date": ev["event_date"].isoformat(),
+            "location": ev["city"],
+            "url": ev["url"],
+            "protocol_url": f"https://results.russiarunning.com/event/{event_id}/" if event_id else "",
+            "organizer": "RussiaRunning",
+        })
+    return events, new_state
 
 
 def _static_events_2023() -> list[dict]:
@@ -185,6 +159,8 @@ async def main():
                         help="Период: 2024_2026 (по умолч.) или 2023")
     parser.add_argument("--date-from", help="Начало периода (YYYY-MM-DD)")
     parser.add_argument("--date-to", help="Конец периода (YYYY-MM-DD)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="RussiaRunning: только события, новые или изменённые с прошлого запуска")
     args = parser.parse_args()
 
     if args.date_from and args.date_to:
@@ -215,7 +191,12 @@ async def main():
 
     # 1. RussiaRunning
     logger.info("RussiaRunning: загрузка событий...")
-    rr_events = await fetch_rr_events(date_from, date_to)
+    started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    state = None
+    if args.incremental:
+        run = await db.get_job_run(RR_STATE_JOB)
+        state = (run or {}).get("result") or {}
+    rr_events, rr_state = await fetch_rr_events(date_from, date_to, state)
     logger.info(f"RussiaRunning: получено {len(rr_events)} событий в периоде")
 
     to_insert = []
@@ -248,6 +229,9 @@ async def main():
         await db.db.commit()
     total_added = len(to_insert)
     logger.info(f"RussiaRunning: добавлено {total_added} новых забегов")
+    if rr_state:
+        await db.save_job_run(RR_STATE_JOB, started_at, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                              success=True, result=rr_state)
 
     # 2. RunC, WildTrail и др. (статический список)
     static = _get_static_events(date_from, date_to)
@@ -6,6 +6,11 @@ import re
 from typing import Dict, Optional, Tuple
 from datetime import datetime
 
+try:
+    from bot.distances import distance_label, distance_meters
+except ImportError:  # запуск из папки bot/
+    from distances import distance_label, distance_meters
+
 
 def normalize_name(full_name: str) -> Dict[str, str]:
     """
@@ -192,32 +197,21 @@ def normalize_distance(distance_str: str) -> str:
     - "5000 м"
     - "5K"
     - "5.0"
+    - "Полумарафон"
     
     Returns:
-        Нормализованная дистанция (например, "5 км")
+        Нормализованная дистанция (например, "5 км", "21.1 км")
     """
     if not distance_str:
         return ""
     
     distance_str = str(distance_str).strip()
     
-    # Извлечение числа
-    match = re.search(r'(\d+\.?\d*)', distance_str)
-    if not match:
+    # Каноническая подпись по метрам (см. bot/distances.py): «5км», «5.0», «5000 м» → «5 км»
+    meters = distance_meters(distance_str)
+    if meters is None:
         return distance_str
-    
-    distance = float(match.group(1))
-    
-    # Определение единиц измерения
-    if 'км' in distance_str.lower() or 'km' in distance_str.lower() or 'k' in distance_str.lower():
-        return f"{distance:.1f} км".rstrip('0').rstrip('.')
-    elif 'м' in distance_str.lower() or 'm' in distance_str.lower():
-        # Метры в километры
-        km = distance / 1000
-        return f"{km:.1f} км".rstrip('0').rstrip('.')
-    else:
-        # По умолчанию километры
-        return f"{distance:.1f} км".rstrip('0').rstrip('.')
+    return distance_label(meters)
 
 
 def normalize_gender(gender_str: str) -> Optional[str]:
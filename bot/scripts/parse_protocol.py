@@ -5,14 +5,13 @@ Seido - Основной парсер протоколов забегов
 import asyncio
 import sys
 import logging
+import time
 from pathlib import Path
 from typing import List, Dict, Optional
 
 # Добавляем путь к корню проекта
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from bot.scripts.pdf_parser import PDFProtocolParser
-from bot.scripts.excel_parser import ExcelProtocolParser
 from bot.scripts.normalize_data import normalize_protocol_row
 from bot.db import db
 
@@ -31,6 +30,8 @@ class ProtocolImporter:
             'results_added': 0,
             'errors': 0
         }
+        # Секунды по этапам: разбор файла, нормализация строк, поиск/создание бегунов, запись результатов
+        self.stage_seconds = {'parse': 0.0, 'normalize': 0.0, 'runners': 0.0, 'results': 0.0}
     
     async def find_or_create_runner(
         self,
@@ -46,6 +47,13 @@ class ProtocolImporter:
         Returns:
             ID бегуна
         """
+        started = time.perf_counter()
+        try:
+            return await self._find_or_create_runner(first_name, last_name, birth_date, gender, city)
+        finally:
+            self.stage_seconds['runners'] += time.perf_counter() - started
+
+    async def _find_or_create_runner(self, first_name, last_name, birth_date, gender, city) -> int:
         # Поиск существующего бегуна
         runner = await db.get_runner_by_name(
             last_name=last_name,
@@ -111,7 +119,8 @@ class ProtocolImporter:
             race_type=race_type,
             distances=distances,
             website_url=website_url,
-            protocol_url=protocol_url
+            protocol_url=protocol_url,
+            source='protocol',
         )
         
         self.stats['races_created'] += 1
@@ -128,7 +137,8 @@ class ProtocolImporter:
         age_group_place: Optional[int] = None,
         total_runners: Optional[int] = None
     ):
-        """Импорт результата в базу"""
+        """Импорт результата в базу (доски рейтинга — см. finish_import)"""
+        started = time.perf_counter()
         try:
             await db.add_result(
                 runner_id=runner_id,
@@ -138,13 +148,23 @@ class ProtocolImporter:
                 overall_place=overall_place,
                 gender_place=gender_place,
                 age_group_place=age_group_place,
-                total_runners=total_runners
+                total_runners=total_runners,
+                update_leaderboards=False
             )
             self.stats['results_added'] += 1
         except Exception as e:
             logger.error(f"Ошибка при добавлении результата: {e}")
             self.stats['errors'] += 1
+        finally:
+            self.stage_seconds['results'] += time.perf_counter() - started
     
+    async def finish_import(self, race_id: int):
+        """Влить результаты забега в доски рейтинга одним проходом и зафиксировать импорт"""
+        started = time.perf_counter()
+        await db.update_leaderboards_for_race(race_id)
+        await db.db.commit()
+        self.stage_seconds['results'] += time.perf_counter() - started
+
     async def import_protocol(
         self,
         file_path: str,
@@ -184,14 +204,19 @@ class ProtocolImporter:
         logger.info(f"Забег: {race_name} ({race_date})")
         
         # Парсинг файла
+        # pdfplumber и pandas тяжёлые — импортируется только нужный
+        started = time.perf_counter()
         if file_path.suffix.lower() == '.pdf':
+            from bot.scripts.pdf_parser import PDFProtocolParser
             parser = PDFProtocolParser(str(file_path))
             raw_data = parser.parse(header_row=header_row)
         elif file_path.suffix.lower() in ['.xlsx', '.xls']:
+            from bot.scripts.excel_parser import ExcelProtocolParser
             parser = ExcelProtocolParser(str(file_path))
             raw_data = parser.parse(sheet_name=sheet_name, header_row=header_row)
         else:
             raise ValueError(f"Неподдерживаемый формат файла: {file_path.suffix}")
+        self.stage_seconds['parse'] += time.perf_counter() - started
         
         if not raw_data:
             logger.warning("Не удалось извлечь данные из файла")
@@ -217,7 +242,9 @@ class ProtocolImporter:
         for i, row in enumerate(raw_data, 1):
             try:
                 # Нормализация данных
+                started = time.perf_counter()
                 normalized = normalize_protocol_row(row)
+                self.stage_seconds['normalize'] += time.perf_counter() - started
                 
                 # Пропускаем строки без обязательных данных
                 if not normalized.get('last_name') or not normalized.get('first_name'):
@@ -259,12 +286,8 @@ class ProtocolImporter:
                 self.stats['errors'] += 1
                 continue
         
-        # Обновление total_runners для забега
-        await db.db.execute(
-            "UPDATE races SET total_runners = ? WHERE id = ?",
-            (imported, race_id)
-        )
-        await db.db.commit()
+        # races.results_count обновляется триггерами на results (см. db.init_race_counter_triggers)
+        await self.finish_import(race_id)
         
         logger.info(f"Импорт завершён: {imported} результатов")
         self.print_stats()
@@ -305,7 +328,9 @@ class ProtocolImporter:
         imported = 0
         for i, row in enumerate(raw_data, 1):
             try:
+                started = time.perf_counter()
                 normalized = normalize_protocol_row(row)
+                self.stage_seconds['normalize'] += time.perf_counter() - started
                 if not normalized.get('last_name') or not normalized.get('first_name'):
                     continue
                 result_distance = distance or normalized.get('distance', '') or '?'
@@ -333,7 +358,7 @@ class ProtocolImporter:
                 logger.debug(f"Ошибка строка {i}: {e}")
                 self.stats['errors'] += 1
 
-        await db.db.commit()
+        await self.finish_import(race_id)
         logger.info(f"Импорт завершён: {imported} результатов")
         self.print_stats()
 
@@ -346,6 +371,9 @@ class ProtocolImporter:
         print(f"   Бегунов найдено: {self.stats['runners_found']}")
         print(f"   Результатов добавлено: {self.stats['results_added']}")
         print(f"   Ошибок: {self.stats['errors']}")
+        if any(self.stage_seconds.values()):
+            stages = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in self.stage_seconds.items())
+            print(f"   По этапам: {stages}")
         print("="*50 + "\n")
 
 
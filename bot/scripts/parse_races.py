@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Seido — разовый прогон парсинга забегов без бота (ParseScheduler.parse_all)
+Тот же прогон, что ночной в 3:00 и /parse: все парсеры из PARSER_CLASSES, новые забеги — в БД.
+С --profile прогон идёт под профилировщиком (profiling.py): время по этапам
+(download, parse, db, ...), топ функций и файлы для flamegraph в bot/logs/profiles/.
+Запуск: python -m bot.scripts.parse_races
+        python -m bot.scripts.parse_races --profile sample
+        python -m bot.scripts.parse_races --profile cprofile --profile-top 30
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Планировщик импортирует модули бота без префикса bot. (как при запуске main.py)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import db
+from parsers.scheduler import scheduler
+from profiling import MODES as PROFILE_MODES, PROFILE_TOP, profiled
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Разовый прогон парсинга забегов")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="Профилировать прогон: sample (время по этапам, .folded) или cprofile (.prof)")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_TOP, help="Функций в топе каждого этапа")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        async with profiled("parse", args.profile, top=args.profile_top) as profiler:
+            results = await scheduler.parse_all(trigger="manual")
+        for source, count in results.items():
+            mark = " ⚠️" if source in scheduler.progress.get("errors", {}) else ""
+            print(f"• {source}: {count} забегов{mark}")
+        print(f"📊 Всего добавлено: {sum(results.values())}")
+        if profiler:
+            print(profiler.report.format())
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
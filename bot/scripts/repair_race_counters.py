@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Seido — ремонт денормализованных счётчиков забегов
+Пересчитывает races.results_count и races.distances_with_results по таблице results.
+Обычно счётчики поддерживают триггеры; скрипт нужен после ручных правок БД
+или массовых операций в обход триггеров.
+С флагом --rollups дополнительно пересобирает дневные сводки (rollup_*_daily),
+с --leaderboards — заново разбирает results.distance_m и пересобирает доски рейтинга.
+Запуск: python -m bot.scripts.repair_race_counters [--rollups] [--leaderboards]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bot.db import db
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ремонт денормализованных счётчиков")
+    parser.add_argument("--rollups", action="store_true", help="Пересобрать дневные сводки")
+    parser.add_argument("--leaderboards", action="store_true", help="Пересчитать distance_m и доски рейтинга")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        repaired = await db.rebuild_race_counters()
+        print(f"✅ Счётчики пересчитаны. Исправлено забегов: {repaired}")
+        if args.rollups:
+            await db.rebuild_daily_rollups()
+            print("✅ Дневные сводки пересобраны")
+        if args.leaderboards:
+            updated = await db.backfill_distance_m(only_missing=False)
+            rows = await db.rebuild_leaderboards()
+            print(f"✅ distance_m пересчитана у {updated} результатов, на досках рейтинга {rows} строк")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
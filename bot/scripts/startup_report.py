@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Seido — отчёт о холодном старте бота: время импорта, время до первого апдейта и память
+Запускает `python -X importtime -c "import main"` в отдельном процессе (как при старте бота),
+разбирает вывод и показывает самые дорогие модули, время импорта модулей бота и RSS.
+Затем запускает main.main() в режиме polling против fake Telegram (scripts/fake_telegram.py)
+на копии базы и замеряет время от запуска процесса до ответа на первый /start
+и RSS бота после простоя.
+
+Бюджет запуска:
+  - модули из DEFERRED_MODULES (парсеры сайтов, bs4, pandas, pdfplumber, playwright)
+    не должны загружаться при старте — только при первом парсинге / /admin_collect;
+  - --budget-ms: общее время импорта не больше N мс;
+  - --first-update-budget-ms: ответ на первый апдейт не позже N мс от запуска процесса.
+При нарушении — код возврата 1 (можно запускать перед деплоем).
+
+Запуск:
+  python -m bot.scripts.startup_report
+  python -m bot.scripts.startup_report --budget-ms 1500 --top 20 --json startup.json
+  python -m bot.scripts.startup_report --no-first-update   # только импорт
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from bot.scripts.fake_telegram import FakeTelegram, _start_update
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Не должны попадать в sys.modules при запуске бота
+DEFERRED_MODULES = (
+    "bs4", "lxml", "pandas", "numpy", "openpyxl", "pdfplumber", "playwright",
+    "parsers.russiarunning", "parsers.ironstar", "parsers.runc", "parsers.timerman",
+    "parsers.goldenultra", "parsers.wildtrail", "parsers.openband", "parsers.dtrail",
+    "parsers.tulamarathon", "parsers.topliga", "bot.scripts",
+)
+
+# Выполняется в дочернем процессе из папки bot/
+CHILD_CODE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except (OSError, StopIteration):
+    try:
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            rss_kb //= 1024
+    except ImportError:
+        pass
+print(json.dumps({"import_s": elapsed, "rss_kb": rss_kb, "modules": sorted(sys.modules)}))
+"""
+
+# Запуск бота целиком на копии базы; первичный парсинг отключён — он идёт в фоне и ходит в сеть
+BOT_CODE = """
+import asyncio, sys
+import db
+db.DB_PATH = sys.argv[1]
+import main
+from parsers.scheduler import scheduler
+
+async def _no_initial_parse():
+    return None
+
+scheduler.start_initial_parse = _no_initial_parse
+asyncio.run(main.main())
+"""
+
+FIRST_UPDATE_USER = 424242
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Строки `import time: self | cumulative | name` → [{name, self_us, cumulative_us, depth}]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        name = parts[2].rstrip()
+        rows.append({
+            "name": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def run_child() -> Dict:
+    """Импорт main в отдельном процессе; Returns: {import_s, rss_kb, modules, importtime}"""
+    env = dict(os.environ)
+    # Без токена aiogram.Bot не создаётся; бот не запускается, только импортируется
+    env.setdefault("BOT_TOKEN", "123456:startup-report")
+    env["PYTHONIOENCODING"] = "utf-8"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE],
+        cwd=BOT_DIR, env=env, capture_output=True, text=True, encoding="utf-8",
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-3000:])
+        raise SystemExit(f"❌ import main завершился с кодом {proc.returncode}")
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    report["importtime"] = parse_importtime(proc.stderr)
+    return report
+
+
+def _rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+
+
+async def run_bot(timeout: float, idle: float) -> Dict:
+    """
+    main.main() против fake Telegram: время от запуска процесса до ответа на первый /start
+    и RSS после простоя idle секунд. Returns: {first_update_s, idle_rss_kb, api_calls}
+    """
+    fake = FakeTelegram()
+    fake.updates.append(_start_update(1, FIRST_UPDATE_USER))
+    replied = fake.replies[FIRST_UPDATE_USER] = asyncio.Event()
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    await web.SockSite(runner, sock).start()
+
+    tmp_dir = tempfile.mkdtemp(prefix="seido-startup-")
+    db_path = os.path.join(tmp_dir, "seido.db")
+    if os.path.exists(os.path.join(BOT_DIR, "seido.db")):
+        shutil.copy(os.path.join(BOT_DIR, "seido.db"), db_path)
+
+    env = dict(os.environ)
+    env.setdefault("BOT_TOKEN", "123456:startup-report")
+    env.update({
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{port}",
+        "BOT_MODE": "polling",
+        "METRICS_PORT": "0",
+        "HEALTHCHECK_URL": "",
+        "PYTHONIOENCODING": "utf-8",
+    })
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", BOT_CODE, db_path, cwd=BOT_DIR, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    result = {"first_update_s": None, "idle_rss_kb": None}
+    try:
+        waiter = asyncio.create_task(replied.wait())
+        exited = asyncio.create_task(proc.wait())
+        await asyncio.wait({waiter, exited}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if replied.is_set():
+            result["first_update_s"] = time.perf_counter() - started
+            await asyncio.sleep(idle)
+            result["idle_rss_kb"] = _rss_kb(proc.pid)
+        elif exited.done():
+            stderr = (await proc.stderr.read()).decode("utf-8", "replace")
+            print(stderr[-3000:])
+            raise SystemExit(f"❌ бот завершился с кодом {proc.returncode} до ответа на апдейт")
+        waiter.cancel()
+        exited.cancel()
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            try:
+                await asyncio.wait_for(proc.wait(), 10)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        await runner.cleanup()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    result["api_calls"] = dict(fake.calls)
+    return result
+
+
+def summarize(report: Dict, top: int) -> Dict:
+    rows = report["importtime"]
+    by_package = defaultdict(int)
+    for row in rows:
+        by_package[row["name"].split(".")[0]] += row["self_us"]
+    bot_modules = {row["name"]: row["cumulative_us"] for row in rows
+                   if os.path.exists(os.path.join(BOT_DIR, row["name"].split(".")[0] + ".py"))
+                   or os.path.isdir(os.path.join(BOT_DIR, row["name"].split(".")[0]))}
+    deferred_loaded = [m for m in report["modules"]
+                       if any(m == d or m.startswith(d + ".") for d in DEFERRED_MODULES)]
+    return {
+        "import_ms": round(report["import_s"] * 1000, 1),
+        "importtime_total_ms": round(sum(r["self_us"] for r in rows) / 1000, 1),
+        "rss_mb": round(report["rss_kb"] / 1024, 1) if report["rss_kb"] else None,
+        "modules": len(report["modules"]),
+        "top_packages_ms": {k: round(v / 1000, 1) for k, v in
+                            sorted(by_package.items(), key=lambda kv: -kv[1])[:top]},
+        "top_modules_self_ms": {r["name"]: round(r["self_us"] / 1000, 1) for r in
+                                sorted(rows, key=lambda r: -r["self_us"])[:top]},
+        "bot_modules_ms": {k: round(v / 1000, 1) for k, v in
+                           sorted(bot_modules.items(), key=lambda kv: -kv[1])},
+        "deferred_loaded": deferred_loaded,
+    }
+
+
+def summarize_bot(report: Dict) -> Dict:
+    return {
+        "first_update_ms": round(report["first_update_s"] * 1000, 1) if report["first_update_s"] else None,
+        "idle_rss_mb": round(report["idle_rss_kb"] / 1024, 1) if report["idle_rss_kb"] else None,
+        "api_calls": report["api_calls"],
+    }
+
+
+def print_summary(summary: Dict, budget_ms: Optional[float],
+                  first_update_budget_ms: Optional[float] = None) -> List[str]:
+    """Вывести отчёт; Returns: список нарушений бюджета"""
+    print(f"⏱ import main: {summary['import_ms']:.0f} мс (по -X importtime {summary['importtime_total_ms']:.0f} мс), "
+          f"модулей: {summary['modules']}, RSS: {summary['rss_mb'] if summary['rss_mb'] is not None else '?'} МБ")
+    bot = summary.get("bot")
+    if bot:
+        first = f"{bot['first_update_ms']:.0f} мс" if bot["first_update_ms"] is not None else "нет ответа"
+        print(f"⏱ первый апдейт: {first} от запуска процесса, "
+              f"RSS после простоя: {bot['idle_rss_mb'] if bot['idle_rss_mb'] is not None else '?'} МБ")
+
+    print("\n📦 Пакеты (собственное время импорта, мс):")
+    for name, ms in summary["top_packages_ms"].items():
+        print(f"   {ms:8.1f}  {name}")
+    print("\n🐢 Самые дорогие модули (мс):")
+    for name, ms in summary["top_modules_self_ms"].items():
+        print(f"   {ms:8.1f}  {name}")
+    print("\n🤖 Модули бота (с зависимостями, мс):")
+    for name, ms in summary["bot_modules_ms"].items():
+        print(f"   {ms:8.1f}  {name}")
+
+    violations = []
+    if summary["deferred_loaded"]:
+        violations.append("загружены при старте: " + ", ".join(summary["deferred_loaded"]))
+    if budget_ms is not None and summary["import_ms"] > budget_ms:
+        violations.append(f"импорт {summary['import_ms']:.0f} мс > бюджета {budget_ms:.0f} мс")
+    if bot and bot["first_update_ms"] is None:
+        violations.append("бот не ответил на первый апдейт")
+    elif bot and first_update_budget_ms is not None and bot["first_update_ms"] > first_update_budget_ms:
+        violations.append(f"первый апдейт {bot['first_update_ms']:.0f} мс > бюджета {first_update_budget_ms:.0f} мс")
+    print()
+    for v in violations:
+        print(f"❌ {v}")
+    if not violations:
+        print("✅ Бюджет запуска соблюдён")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта и память при запуске бота")
+    parser.add_argument("--budget-ms", type=float, help="Допустимое время import main, мс")
+    parser.add_argument("--top", type=int, default=15, help="Сколько модулей/пакетов показать")
+    parser.add_argument("--json", help="Сохранить отчёт в JSON")
+    parser.add_argument("--first-update-budget-ms", type=float,
+                        help="Допустимое время до ответа на первый апдейт, мс")
+    parser.add_argument("--no-first-update", action="store_true",
+                        help="Не запускать бота, только замер импорта")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Ожидание ответа на первый апдейт, с")
+    parser.add_argument("--idle", type=float, default=3.0, help="Простой перед замером RSS бота, с")
+    args = parser.parse_args()
+
+    summary = summarize(run_child(), args.top)
+    if not args.no_first_update:
+        summary["bot"] = summarize_bot(asyncio.run(run_bot(args.timeout, args.idle)))
+    violations = print_summary(summary, args.budget_ms, args.first_update_budget_ms)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**summary, "violations": violations}, f, ensure_ascii=False, indent=1)
+        print(f"📁 {args.json}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,10 @@ env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 if os.path.exists(env_path):
     load_dotenv(env_path)
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sync_to_mysql import RACE_COLUMNS, adopt_races, ensure_mysql_keys, race_distances, upsert_rows
+
 # Путь к локальной SQLite БД
 SQLITE_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "seido.db")
 
@@ -51,91 +55,29 @@ async def sync_races_only(sqlite_conn, mysql_conn):
         column_names = [description[0] for description in cursor.description]
         races = [dict(zip(column_names, row)) for row in rows]
     
-    mysql_cursor = mysql_conn.cursor()
-    
-    synced = 0
-    updated = 0
-    errors = 0
-    
     print(f"   Найдено забегов в SQLite: {len(races)}")
     
-    for race in races:
-        try:
-            # Проверяем, существует ли забег (по имени и дате)
-            mysql_cursor.execute(
-                "SELECT id FROM races WHERE name = %s AND date = %s",
-                (race['name'], race['date'])
-            )
-            exists = mysql_cursor.fetchone()
-            
-            # Преобразуем distances в JSON строку, если это строка
-            distances = race.get('distances', '')
-            if isinstance(distances, str) and distances:
-                try:
-                    import json
-                    # Если это уже JSON строка, оставляем как есть
-                    if not distances.startswith('[') and not distances.startswith('{'):
-                        distances = json.dumps([{"name": distances}])
-                except:
-                    distances = '[]'
-            elif not distances:
-                distances = '[]'
-            
-            if exists:
-                # Обновляем
-                mysql_cursor.execute("""
-                    UPDATE races SET
-                        location = %s,
-                        organizer = %s,
-                        race_type = %s,
-                        distances = %s,
-                        website_url = %s,
-                        protocol_url = %s,
-                        is_active = %s,
-                        updated_at = NOW()
-                    WHERE name = %s AND date = %s
-                """, (
-                    race.get('location'),
-                    race.get('organizer'),
-                    race.get('race_type'),
-                    distances,
-                    race.get('website_url'),
-                    race.get('protocol_url'),
-                    race.get('is_active', 1),
-                    race['name'],
-                    race['date']
-                ))
-                updated += 1
-            else:
-                # Вставляем нового
-                mysql_cursor.execute("""
-                    INSERT INTO races (
-                        name, date, location, organizer, race_type,
-                        distances, website_url, protocol_url, is_active
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    race['name'],
-                    race['date'],
-                    race.get('location'),
-                    race.get('organizer'),
-                    race.get('race_type'),
-                    distances,
-                    race.get('website_url'),
-                    race.get('protocol_url'),
-                    race.get('is_active', 1)
-                ))
-                synced += 1
-                
-            if (synced + updated) % 10 == 0:
-                print(f"   Обработано: {synced + updated}/{len(races)}")
-                
-        except Exception as e:
-            print(f"  ❌ Ошибка при синхронизации забега '{race.get('name')}': {e}")
-            errors += 1
-    
-    mysql_conn.commit()
-    print(f"  ✅ Забеги: добавлено {synced}, обновлено {updated}, ошибок {errors}")
-    return synced + updated
+    # Пачками INSERT ... ON DUPLICATE KEY UPDATE по ключу races.sqlite_id
+    ensure_mysql_keys(mysql_conn)
+    rows = [
+        (
+            race['id'],
+            race['name'],
+            race['date'],
+            race.get('location'),
+            race.get('organizer'),
+            race.get('race_type'),
+            race_distances(race),
+            race.get('website_url'),
+            race.get('protocol_url'),
+            race.get('is_active', 1),
+        )
+        for race in races
+    ]
+    adopt_races(mysql_conn, rows)
+    written, errors = upsert_rows(mysql_conn, "races", RACE_COLUMNS, rows, ("sqlite_id",))
+    print(f"  ✅ Забеги: записано {written}, ошибок {errors}")
+    return written
 
 
 async def main():
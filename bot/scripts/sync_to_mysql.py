@@ -1,13 +1,21 @@
 """
 Синхронизация данных из SQLite в MySQL для сайта seidorun.ru
+
+Инкрементально: выгружаются только строки, попавшие в журнал sync_changes
+после прошлой успешной синхронизации (см. Database.init_sync_changelog).
+Первый запуск (или --full) выгружает таблицы целиком.
+Строки читаются одним снимком SQLite, запись идёт в потоках: бегуны и забеги
+параллельно, результаты после них. --dry-run показывает, сколько строк изменится.
 """
+import argparse
 import asyncio
-import aiosqlite
+import json
 import pymysql
 import os
+import re
 import sys
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env
@@ -18,6 +26,8 @@ if os.path.exists(env_path):
 # Добавляем родительскую директорию в путь
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from db import db
+
 # Путь к локальной SQLite БД
 SQLITE_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "seido.db")
 
@@ -33,307 +43,443 @@ MYSQL_CONFIG = {
 }
 
 
-async def get_sqlite_connection():
-    """Подключение к SQLite"""
-    return await aiosqlite.connect(SQLITE_DB)
-
-
 def get_mysql_connection():
     """Подключение к MySQL"""
     return pymysql.connect(**MYSQL_CONFIG)
 
 
-async def sync_runners(sqlite_conn, mysql_conn):
-    """Синхронизация бегунов"""
-    print("🔄 Синхронизация бегунов...")
-    
-    # Получаем всех бегунов из SQLite
-    async with sqlite_conn.execute("SELECT * FROM runners") as cursor:
-        rows = await cursor.fetchall()
-        runners = [dict(row) for row in rows]
-    
-    mysql_cursor = mysql_conn.cursor()
-    
-    synced = 0
-    updated = 0
-    errors = 0
-    
-    for runner in runners:
+def changed_filter(alias: str, window: Optional[Tuple[int, int]], *tables: str) -> Tuple[str, list]:
+    """
+    WHERE-условие «строка менялась в окне журнала (since, upto]».
+    tables — пары колонка:таблица, например "id:results", "runner_id:runners".
+    window=None — полная выгрузка, без условия.
+    """
+    if window is None:
+        return "", []
+    since, upto = window
+    parts, params = [], []
+    for spec in tables:
+        column, table = spec.split(":")
+        parts.append(
+            f"{alias}.{column} IN (SELECT row_id FROM sync_changes "
+            f"WHERE table_name = ? AND id > ? AND id <= ?)"
+        )
+        params += [table, since, upto]
+    return " WHERE " + " OR ".join(parts), params
+
+
+# Строк в одном executemany: pymysql склеивает пачку в многострочный INSERT
+BATCH_SIZE = 2000
+
+RUNNER_COLUMNS = (
+    "sqlite_id", "telegram_id", "first_name", "last_name", "middle_name",
+    "birth_date", "gender", "city", "country", "club_name",
+)
+RACE_COLUMNS = (
+    "sqlite_id", "name", "date", "location", "organizer", "race_type",
+    "distances", "website_url", "protocol_url", "is_active",
+)
+RESULT_COLUMNS = (
+    "runner_id", "race_id", "distance", "distance_m",
+    "finish_time", "finish_time_seconds", "pace", "pace_seconds_per_km",
+    "overall_place", "gender_place", "age_group", "age_group_place",
+    "club_place", "total_runners", "points", "is_official",
+)
+
+
+def ensure_mysql_keys(mysql_conn):
+    """
+    Ключи MySQL, на которые опирается upsert, для баз, созданных старой версией seido_mysql.sql:
+    - runners.sqlite_id / races.sqlite_id — id строки в SQLite, стабильный ключ синхронизации;
+    - results.distance_m — каноническая дистанция в метрах для рейтингов (см. bot/distances.py).
+    Уникальный ключ races(name, date) снимается: в SQLite бывают разные забеги с одинаковыми
+    названием и датой, ключ синхронизации — sqlite_id. Старые строки без sqlite_id
+    «усыновляются»: бегуны — upsert по telegram_id, забеги — adopt_races по (name, date).
+    """
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute(
+            "ALTER TABLE results ADD COLUMN distance_m INT NULL AFTER distance, "
+            "ADD INDEX idx_distance_m (distance_m, finish_time_seconds)"
+        )
+        mysql_conn.commit()
+        print("🔑 Добавлена колонка results.distance_m")
+    except pymysql.MySQLError as e:
+        if not (e.args and e.args[0] == 1060):
+            raise
+    for table in ("runners", "races"):
         try:
-            # Проверяем, существует ли бегун
-            mysql_cursor.execute(
-                "SELECT id FROM runners WHERE telegram_id = %s",
-                (runner['telegram_id'],)
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN sqlite_id INT NULL, "
+                f"ADD UNIQUE KEY unique_sqlite_id (sqlite_id)"
             )
-            exists = mysql_cursor.fetchone()
-            
-            if exists:
-                # Обновляем
-                mysql_cursor.execute("""
-                    UPDATE runners SET
-                        first_name = %s,
-                        last_name = %s,
-                        middle_name = %s,
-                        birth_date = %s,
-                        gender = %s,
-                        city = %s,
-                        country = %s,
-                        club_name = %s,
-                        updated_at = NOW()
-                    WHERE telegram_id = %s
-                """, (
-                    runner['first_name'],
-                    runner['last_name'],
-                    runner.get('middle_name'),
-                    runner.get('birth_date'),
-                    runner.get('gender'),
-                    runner.get('city'),
-                    runner.get('country', 'Россия'),
-                    runner.get('club_name'),
-                    runner['telegram_id']
-                ))
-                updated += 1
-            else:
-                # Вставляем нового
-                mysql_cursor.execute("""
-                    INSERT INTO runners (
-                        telegram_id, first_name, last_name, middle_name,
-                        birth_date, gender, city, country, club_name
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    runner['telegram_id'],
-                    runner['first_name'],
-                    runner['last_name'],
-                    runner.get('middle_name'),
-                    runner.get('birth_date'),
-                    runner.get('gender'),
-                    runner.get('city'),
-                    runner.get('country', 'Россия'),
-                    runner.get('club_name')
-                ))
-                synced += 1
-        except Exception as e:
-            print(f"  ❌ Ошибка при синхронизации бегуна {runner.get('telegram_id')}: {e}")
-            errors += 1
-    
-    mysql_conn.commit()
-    print(f"  ✅ Бегуны: добавлено {synced}, обновлено {updated}, ошибок {errors}")
-    return synced + updated
+            mysql_conn.commit()
+            print(f"🔑 Добавлена колонка {table}.sqlite_id")
+        except pymysql.MySQLError as e:
+            if not (e.args and e.args[0] == 1060):  # Duplicate column name — уже есть
+                raise
+    try:
+        cursor.execute("ALTER TABLE races DROP INDEX unique_race, ADD INDEX idx_name_date (name, date)")
+        mysql_conn.commit()
+        print("🔑 Уникальный ключ races(name, date) заменён обычным индексом")
+    except pymysql.MySQLError as e:
+        if not (e.args and e.args[0] == 1091):  # Can't DROP — ключа уже нет
+            raise
 
 
-async def sync_races(sqlite_conn, mysql_conn):
-    """Синхронизация забегов"""
-    print("🔄 Синхронизация забегов...")
-    
-    # Получаем все забеги из SQLite
-    async with sqlite_conn.execute("SELECT * FROM races") as cursor:
-        rows = await cursor.fetchall()
-        races = [dict(row) for row in rows]
-    
-    mysql_cursor = mysql_conn.cursor()
-    
-    synced = 0
-    updated = 0
-    errors = 0
-    
-    for race in races:
+def adopt_races(mysql_conn, rows: List[tuple]) -> int:
+    """
+    Проставить sqlite_id забегам MySQL без него (загруженным до синхронизации по sqlite_id
+    или из дампа) по (name, date): каждому забегу SQLite — не больше одной строки MySQL,
+    поэтому дубли (name, date) из SQLite не сливаются в одну. Returns: усыновлено строк
+    """
+    known = fetch_id_map(mysql_conn, "races")
+    idx = {c: RACE_COLUMNS.index(c) for c in ("sqlite_id", "name", "date")}
+    pending = [
+        (row[idx["sqlite_id"]], row[idx["name"]], row[idx["date"]])
+        for row in rows if row[idx["sqlite_id"]] not in known
+    ]
+    if not pending:
+        return 0
+    cursor = mysql_conn.cursor()
+    adopted = 0
+    for start in range(0, len(pending), BATCH_SIZE):
+        adopted += cursor.executemany(
+            "UPDATE races SET sqlite_id = %s WHERE sqlite_id IS NULL AND name = %s AND date = %s "
+            "ORDER BY id LIMIT 1",
+            pending[start:start + BATCH_SIZE],
+        ) or 0
+        mysql_conn.commit()
+    if adopted:
+        print(f"  🔗 Забеги: {adopted} строк MySQL без sqlite_id связаны по (name, date)")
+    return adopted
+
+
+def upsert_rows(
+    mysql_conn,
+    table: str,
+    columns: Tuple[str, ...],
+    rows: List[tuple],
+    key_columns: Tuple[str, ...],
+) -> Tuple[int, int]:
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE пачками по BATCH_SIZE через executemany.
+    Колонки key_columns (уникальный ключ) не перезаписываются, но пустые заполняются:
+    строка, совпавшая по другому ключу (runners.telegram_id), получает sqlite_id.
+    Если пачка падает целиком, она повторяется построчно, чтобы отсеять плохие строки.
+    Returns: (записано строк, ошибок)
+    """
+    if not rows:
+        return 0, 0
+    placeholders = ", ".join(["%s"] * len(columns))
+    updates = ", ".join(
+        f"{c} = COALESCE({c}, VALUES({c}))" if c in key_columns else f"{c} = VALUES({c})"
+        for c in columns
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+    cursor = mysql_conn.cursor()
+    written = errors = 0
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
         try:
-            # Проверяем, существует ли забег (по имени и дате)
-            mysql_cursor.execute(
-                "SELECT id FROM races WHERE name = %s AND date = %s",
-                (race['name'], race['date'])
-            )
-            exists = mysql_cursor.fetchone()
-            
-            # Преобразуем distances в JSON строку, если это строка
-            distances = race.get('distances', '')
-            if isinstance(distances, str) and distances:
+            cursor.executemany(sql, chunk)
+            written += len(chunk)
+        except pymysql.MySQLError as e:
+            print(f"  ⚠️ Пачка {table} [{start}:{start + len(chunk)}] не записана ({e}), повтор построчно")
+            for row in chunk:
                 try:
-                    import json
-                    distances = json.dumps(distances) if not distances.startswith('[') else distances
-                except:
-                    distances = ''
-            
-            if exists:
-                # Обновляем
-                mysql_cursor.execute("""
-                    UPDATE races SET
-                        location = %s,
-                        organizer = %s,
-                        race_type = %s,
-                        distances = %s,
-                        website_url = %s,
-                        protocol_url = %s,
-                        is_active = %s,
-                        updated_at = NOW()
-                    WHERE name = %s AND date = %s
-                """, (
-                    race.get('location'),
-                    race.get('organizer'),
-                    race.get('race_type'),
-                    distances,
-                    race.get('website_url'),
-                    race.get('protocol_url'),
-                    race.get('is_active', 1),
-                    race['name'],
-                    race['date']
-                ))
-                updated += 1
+                    cursor.execute(sql, row)
+                    written += 1
+                except pymysql.MySQLError as row_error:
+                    print(f"  ❌ {table} {row[:3]}: {row_error}")
+                    errors += 1
+        mysql_conn.commit()
+    return written, errors
+
+
+def race_distances(race: Dict[str, Any]) -> str:
+    """
+    distances для JSON-колонки MySQL (общая для sync_to_mysql и sync_races_only):
+    JSON как есть, строку без JSON оборачиваем в [{"name": ...}] — как ждёт сайт
+    """
+    distances = race.get('distances', '')
+    if isinstance(distances, str) and distances:
+        if not distances.startswith('[') and not distances.startswith('{'):
+            return json.dumps([{"name": distances}], ensure_ascii=False)
+        return distances
+    return distances or '[]'
+
+
+# ============================================
+# ЧТЕНИЕ ИЗ SQLITE (в одной транзакции — согласованный снимок)
+# ============================================
+
+async def read_runners(sqlite_conn, window: Optional[Tuple[int, int]] = None) -> List[tuple]:
+    """Бегуны, изменённые с прошлой синхронизации (или все при полной), строками RUNNER_COLUMNS"""
+    where, params = changed_filter("r", window, "id:runners")
+    async with sqlite_conn.execute(f"SELECT r.* FROM runners r{where}", params) as cursor:
+        runners = [dict(row) for row in await cursor.fetchall()]
+    return [
+        (
+            runner['id'],
+            runner['telegram_id'],
+            runner['first_name'],
+            runner['last_name'],
+            runner.get('middle_name'),
+            runner.get('birth_date'),
+            runner.get('gender'),
+            runner.get('city'),
+            runner.get('country') or 'Россия',
+            runner.get('club_name'),
+        )
+        for runner in runners
+    ]
+
+
+async def read_races(sqlite_conn, window: Optional[Tuple[int, int]] = None) -> List[tuple]:
+    """Забеги, изменённые с прошлой синхронизации (или все при полной), строками RACE_COLUMNS"""
+    where, params = changed_filter("r", window, "id:races")
+    async with sqlite_conn.execute(f"SELECT r.* FROM races r{where}", params) as cursor:
+        races = [dict(row) for row in await cursor.fetchall()]
+    return [
+        (
+            race['id'],
+            race['name'],
+            race['date'],
+            race.get('location'),
+            race.get('organizer'),
+            race.get('race_type'),
+            race_distances(race),
+            race.get('website_url'),
+            race.get('protocol_url'),
+            race.get('is_active', 1),
+        )
+        for race in races
+    ]
+
+
+async def read_results(sqlite_conn, window: Optional[Tuple[int, int]] = None) -> List[tuple]:
+    """
+    Результаты, изменённые с прошлой синхронизации, строками RESULT_COLUMNS.
+    runner_id/race_id здесь ещё локальные — переводятся в write_results.
+    """
+    where, params = changed_filter("r", window, "id:results")
+    async with sqlite_conn.execute(f"SELECT r.* FROM results r{where}", params) as cursor:
+        results = [dict(row) for row in await cursor.fetchall()]
+    return [
+        (
+            result['runner_id'],
+            result['race_id'],
+            result['distance'],
+            result.get('distance_m'),
+            result.get('finish_time'),
+            result.get('finish_time_seconds'),
+            result.get('pace'),
+            result.get('pace_seconds_per_km'),
+            result.get('overall_place'),
+            result.get('gender_place'),
+            result.get('age_group'),
+            result.get('age_group_place'),
+            result.get('club_place'),
+            result.get('total_runners'),
+            result.get('points'),
+            result.get('is_official', 1),
+        )
+        for result in results
+    ]
+
+
+async def read_snapshot(sqlite_conn, state: Dict[str, Dict], full: bool) -> Tuple[int, Dict[str, List[tuple]]]:
+    """
+    Прочитать границу журнала и все изменённые строки в одной транзакции чтения:
+    бот может писать в БД во время синхронизации, а таблицы должны быть согласованы
+    между собой и с границей upto. Блокировка держится только на время чтения.
+    """
+    await sqlite_conn.execute("BEGIN")
+    try:
+        async with sqlite_conn.execute("SELECT COALESCE(MAX(id), 0) FROM sync_changes") as cursor:
+            upto = (await cursor.fetchone())[0]
+        snapshot = {}
+        for table, title, read, _ in SYNC_STEPS:
+            if full or table not in state:
+                window = None
+                print(f"📦 {title}: полная выгрузка")
             else:
-                # Вставляем нового
-                mysql_cursor.execute("""
-                    INSERT INTO races (
-                        name, date, location, organizer, race_type,
-                        distances, website_url, protocol_url, is_active
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    race['name'],
-                    race['date'],
-                    race.get('location'),
-                    race.get('organizer'),
-                    race.get('race_type'),
-                    distances,
-                    race.get('website_url'),
-                    race.get('protocol_url'),
-                    race.get('is_active', 1)
-                ))
-                synced += 1
-        except Exception as e:
-            print(f"  ❌ Ошибка при синхронизации забега {race.get('name')}: {e}")
-            errors += 1
-    
-    mysql_conn.commit()
-    print(f"  ✅ Забеги: добавлено {synced}, обновлено {updated}, ошибок {errors}")
-    return synced + updated
+                window = (state[table]["last_change_id"], upto)
+            snapshot[table] = await read(sqlite_conn, window)
+    finally:
+        await sqlite_conn.commit()
+    return upto, snapshot
 
 
-async def sync_results(sqlite_conn, mysql_conn):
-    """Синхронизация результатов"""
-    print("🔄 Синхронизация результатов...")
-    
-    # Получаем все результаты из SQLite с JOIN к runners и races
-    async with sqlite_conn.execute("""
-        SELECT r.*, ru.telegram_id, ra.name as race_name, ra.date as race_date
-        FROM results r
-        JOIN runners ru ON r.runner_id = ru.id
-        JOIN races ra ON r.race_id = ra.id
-    """) as cursor:
-        rows = await cursor.fetchall()
-        results = [dict(row) for row in rows]
-    
-    mysql_cursor = mysql_conn.cursor()
-    
-    synced = 0
-    updated = 0
-    errors = 0
-    
-    for result in results:
+# ============================================
+# ЗАПИСЬ В MYSQL (блокирующий pymysql — в потоках, у каждой таблицы своё соединение)
+# ============================================
+
+TIME_RE = re.compile(r"(\d+):(\d{2}):(\d{2})")
+
+
+def _norm(value: Any) -> Any:
+    """Привести значение SQLite/MySQL к сравнимому виду (для --dry-run)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        match = TIME_RE.fullmatch(value)
+        if match:
+            h, m, sec = map(int, match.groups())
+            return h * 3600 + m * 60 + sec
+        if value[:1] in "[{":
+            try:
+                return json.dumps(json.loads(value), sort_keys=True, ensure_ascii=False)
+            except ValueError:
+                pass
+    return value
+
+
+def diff_counts(
+    mysql_conn,
+    table: str,
+    columns: Tuple[str, ...],
+    rows: List[tuple],
+    key_columns: Tuple[str, ...],
+) -> Dict[str, int]:
+    """Сколько строк upsert вставит, изменит и оставит как есть (без записи)"""
+    key_idx = [columns.index(c) for c in key_columns]
+    remote = {}
+    cursor = mysql_conn.cursor()
+    key_sql = f"({', '.join(key_columns)})" if len(key_columns) > 1 else key_columns[0]
+    one = f"({', '.join(['%s'] * len(key_columns))})" if len(key_columns) > 1 else "%s"
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
+        keys = [tuple(row[i] for i in key_idx) for row in chunk]
         try:
-            # Находим runner_id в MySQL по telegram_id
-            mysql_cursor.execute(
-                "SELECT id FROM runners WHERE telegram_id = %s",
-                (result['telegram_id'],)
-            )
-            runner_row = mysql_cursor.fetchone()
-            if not runner_row:
-                continue  # Пропускаем, если бегун не найден
-            
-            mysql_runner_id = runner_row[0]
-            
-            # Находим race_id в MySQL по имени и дате
-            mysql_cursor.execute(
-                "SELECT id FROM races WHERE name = %s AND date = %s",
-                (result['race_name'], result['race_date'])
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE {key_sql} IN ({', '.join([one] * len(keys))})",
+                [v for key in keys for v in key],
             )
-            race_row = mysql_cursor.fetchone()
-            if not race_row:
-                continue  # Пропускаем, если забег не найден
-            
-            mysql_race_id = race_row[0]
-            
-            # Проверяем, существует ли результат
-            mysql_cursor.execute("""
-                SELECT id FROM results 
-                WHERE runner_id = %s AND race_id = %s AND distance = %s
-            """, (mysql_runner_id, mysql_race_id, result['distance']))
-            exists = mysql_cursor.fetchone()
-            
-            if exists:
-                # Обновляем
-                mysql_cursor.execute("""
-                    UPDATE results SET
-                        finish_time = %s,
-                        finish_time_seconds = %s,
-                        pace = %s,
-                        pace_seconds_per_km = %s,
-                        overall_place = %s,
-                        gender_place = %s,
-                        age_group = %s,
-                        age_group_place = %s,
-                        club_place = %s,
-                        total_runners = %s,
-                        points = %s,
-                        is_official = %s,
-                        updated_at = NOW()
-                    WHERE runner_id = %s AND race_id = %s AND distance = %s
-                """, (
-                    result.get('finish_time'),
-                    result.get('finish_time_seconds'),
-                    result.get('pace'),
-                    result.get('pace_seconds_per_km'),
-                    result.get('overall_place'),
-                    result.get('gender_place'),
-                    result.get('age_group'),
-                    result.get('age_group_place'),
-                    result.get('club_place'),
-                    result.get('total_runners'),
-                    result.get('points'),
-                    result.get('is_official', 1),
-                    mysql_runner_id,
-                    mysql_race_id,
-                    result['distance']
-                ))
-                updated += 1
-            else:
-                # Вставляем новый
-                mysql_cursor.execute("""
-                    INSERT INTO results (
-                        runner_id, race_id, distance,
-                        finish_time, finish_time_seconds, pace, pace_seconds_per_km,
-                        overall_place, gender_place, age_group, age_group_place,
-                        club_place, total_runners, points, is_official
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    mysql_runner_id,
-                    mysql_race_id,
-                    result['distance'],
-                    result.get('finish_time'),
-                    result.get('finish_time_seconds'),
-                    result.get('pace'),
-                    result.get('pace_seconds_per_km'),
-                    result.get('overall_place'),
-                    result.get('gender_place'),
-                    result.get('age_group'),
-                    result.get('age_group_place'),
-                    result.get('club_place'),
-                    result.get('total_runners'),
-                    result.get('points'),
-                    result.get('is_official', 1)
-                ))
-                synced += 1
-        except Exception as e:
-            print(f"  ❌ Ошибка при синхронизации результата: {e}")
-            errors += 1
-    
-    mysql_conn.commit()
-    print(f"  ✅ Результаты: добавлено {synced}, обновлено {updated}, ошибок {errors}")
-    return synced + updated
+        except pymysql.MySQLError as e:
+            if e.args and e.args[0] == 1054:  # нет колонки sqlite_id — всё будет вставлено
+                break
+            raise
+        for remote_row in cursor.fetchall():
+            remote[tuple(remote_row[i] for i in key_idx)] = remote_row
+    counts = {"insert": 0, "update": 0, "same": 0}
+    for row in rows:
+        existing = remote.get(tuple(row[i] for i in key_idx))
+        if existing is None:
+            counts["insert"] += 1
+        elif [_norm(v) for v in existing] != [_norm(v) for v in row]:
+            counts["update"] += 1
+        else:
+            counts["same"] += 1
+    return counts
+
+
+def write_table(
+    table: str,
+    columns: Tuple[str, ...],
+    rows: List[tuple],
+    key_columns: Tuple[str, ...],
+    dry_run: bool,
+) -> Tuple[int, int, Optional[Dict[str, int]]]:
+    """Upsert строк в своём соединении. Returns: (записано, ошибок, diff при --dry-run)"""
+    mysql_conn = get_mysql_connection()
+    try:
+        if dry_run:
+            return 0, 0, diff_counts(mysql_conn, table, columns, rows, key_columns)
+        written, errors = upsert_rows(mysql_conn, table, columns, rows, key_columns)
+        return written, errors, None
+    finally:
+        mysql_conn.close()
+
+
+def fetch_id_map(mysql_conn, table: str) -> Dict[int, int]:
+    """Вся карта id SQLite → id MySQL для таблицы одним запросом"""
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute(f"SELECT sqlite_id, id FROM {table} WHERE sqlite_id IS NOT NULL")
+    except pymysql.MySQLError as e:
+        if e.args and e.args[0] == 1054:  # колонки ещё нет (--dry-run до первой синхронизации)
+            return {}
+        raise
+    return dict(cursor.fetchall())
+
+
+def write_runners(rows: List[tuple], dry_run: bool = False):
+    return write_table("runners", RUNNER_COLUMNS, rows, ("sqlite_id",), dry_run)
+
+
+def write_races(rows: List[tuple], dry_run: bool = False):
+    if not dry_run and rows:
+        mysql_conn = get_mysql_connection()
+        try:
+            adopt_races(mysql_conn, rows)
+        finally:
+            mysql_conn.close()
+    return write_table("races", RACE_COLUMNS, rows, ("sqlite_id",), dry_run)
+
+
+def write_results(rows: List[tuple], dry_run: bool = False):
+    """
+    Перевести runner_id/race_id по картам sqlite_id → id (загружаются целиком одним
+    запросом на таблицу) и записать. Вызывается после бегунов и забегов — из-за внешних ключей.
+    Результаты без пары в MySQL считаются ошибками: прогресс не сдвинется, они повторятся.
+    """
+    mysql_conn = get_mysql_connection()
+    try:
+        runner_ids = fetch_id_map(mysql_conn, "runners")
+        race_ids = fetch_id_map(mysql_conn, "races")
+    finally:
+        mysql_conn.close()
+
+    mapped, missing = [], 0
+    for row in rows:
+        runner_id, race_id = runner_ids.get(row[0]), race_ids.get(row[1])
+        if not runner_id or not race_id:
+            missing += 1
+            continue
+        mapped.append((runner_id, race_id) + row[2:])
+
+    written, errors, diff = write_table(
+        "results", RESULT_COLUMNS, mapped, ("runner_id", "race_id", "distance"), dry_run
+    )
+    if diff is not None:
+        # При --dry-run бегуны/забеги ещё не записаны — их результаты тоже будут вставлены
+        diff["insert"] += missing
+        return written, errors, diff
+    if missing:
+        print(f"  ⚠️ Результаты: {missing} без бегуна или забега в MySQL")
+    return written, errors + missing, None
+
+
+# Зависимости: результаты ссылаются на бегунов и забеги (внешние ключи),
+# бегуны и забеги друг от друга не зависят и пишутся параллельно
+SYNC_STEPS = (
+    ("runners", "Бегуны", read_runners, write_runners),
+    ("races", "Забеги", read_races, write_races),
+    ("results", "Результаты", read_results, write_results),
+)
+PARALLEL_STAGES = (("runners", "races"), ("results",))
 
 
 async def main():
     """Основная функция синхронизации"""
+    parser = argparse.ArgumentParser(description="Синхронизация SQLite → MySQL")
+    parser.add_argument("--full", action="store_true", help="Выгрузить таблицы целиком, игнорируя журнал")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать, сколько строк изменится")
+    args = parser.parse_args()
+
     print("=" * 60)
-    print("🚀 Синхронизация данных Seido: SQLite → MySQL")
+    print("🚀 Синхронизация данных Seido: SQLite → MySQL" + (" (dry run)" if args.dry_run else ""))
     print("=" * 60)
     print(f"📅 Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
@@ -343,30 +489,61 @@ async def main():
         print(f"❌ Ошибка: файл {SQLITE_DB} не найден!")
         return
     
-    # Подключаемся к базам данных
+    # Подключаемся к базам данных (db.connect создаёт журнал изменений, если его ещё нет)
     try:
-        sqlite_conn = await get_sqlite_connection()
+        await db.connect()
+        sqlite_conn = db.db
         mysql_conn = get_mysql_connection()
         print("✅ Подключение к базам данных установлено")
         print()
     except Exception as e:
         print(f"❌ Ошибка подключения: {e}")
+        await db.disconnect()
         return
     
     try:
-        # Синхронизируем данные
-        runners_count = await sync_runners(sqlite_conn, mysql_conn)
-        print()
-        races_count = await sync_races(sqlite_conn, mysql_conn)
+        if not args.dry_run:
+            ensure_mysql_keys(mysql_conn)
+        mysql_conn.close()
+
+        state = await db.get_sync_state()
+        upto, snapshot = await read_snapshot(sqlite_conn, state, args.full)
+        steps = {table: (title, write) for table, title, _, write in SYNC_STEPS}
+        for table, (title, _) in steps.items():
+            print(f"🔄 {title}: к выгрузке {len(snapshot[table])}")
         print()
-        results_count = await sync_results(sqlite_conn, mysql_conn)
+
+        counts = {}
+        for stage in PARALLEL_STAGES:
+            outcomes = await asyncio.gather(*(
+                asyncio.to_thread(steps[table][1], snapshot[table], args.dry_run) for table in stage
+            ))
+            for table, (written, errors, diff) in zip(stage, outcomes):
+                title = steps[table][0]
+                if diff is not None:
+                    print(f"  🔍 {title}: вставить {diff['insert']}, изменить {diff['update']}, без изменений {diff['same']}")
+                    continue
+                counts[title] = written
+                print(f"  ✅ {title}: записано {written}, ошибок {errors}")
+                if errors:
+                    # Прогресс не двигаем: строки с ошибками попадут в следующий прогон
+                    print(f"  ⚠️ {title}: есть ошибки, прогресс не сохранён")
+                else:
+                    await db.save_sync_state(table, upto, written)
         print()
+
+        if args.dry_run:
+            print("ℹ️ Dry run: в MySQL ничего не записано, прогресс не сохранён")
+            return
+
+        pruned = await db.prune_sync_changes()
         
         print("=" * 60)
         print("✅ Синхронизация завершена!")
-        print(f"   Бегуны: {runners_count}")
-        print(f"   Забеги: {races_count}")
-        print(f"   Результаты: {results_count}")
+        for title, done in counts.items():
+            print(f"   {title}: {done}")
+        if pruned:
+            print(f"   Очищено записей журнала: {pruned}")
         print("=" * 60)
         
     except Exception as e:
@@ -374,8 +551,7 @@ async def main():
         import traceback
         traceback.print_exc()
     finally:
-        await sqlite_conn.close()
-        mysql_conn.close()
+        await db.disconnect()
         print("\n🔌 Соединения закрыты")
 
 
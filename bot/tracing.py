@@ -0,0 +1,184 @@
+"""
+Seido Bot - Трассировка обработки апдейтов
+На каждый апдейт открывается трасса (TracingMiddleware в middlewares.py), внутри неё —
+дочерние спаны: запросы к SQLite (query_stats.py), вызовы Bot API (ApiTracingMiddleware)
+и помеченные @traced функции (форматирование). Время, не попавшее ни в один спан, —
+собственный код обработчика («code»).
+
+Все трассы держатся в памяти для /dev → «Медленные апдейты»; в журнал
+logs/traces_YYYYMMDD.jsonl пишется доля TRACE_SAMPLE_RATE и все медленнее TRACE_SLOW_MS.
+"""
+import functools
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+try:
+    from config import TRACE_SAMPLE_RATE, TRACE_SLOW_MS
+except ImportError:
+    from bot.config import TRACE_SAMPLE_RATE, TRACE_SLOW_MS
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = os.path.join(os.path.dirname(__file__), "logs")
+# Больше спанов в одной трассе не пишется (итоги по видам считаются по всем)
+MAX_SPANS = 200
+# Сколько последних трасс держать в памяти для /dev
+RECENT_TRACES = 500
+
+
+class Trace:
+    __slots__ = ("trace_id", "update_id", "handler", "started", "wall", "spans", "totals",
+                 "dropped", "duration", "status")
+
+    def __init__(self, update_id: Optional[int], handler: str):
+        self.trace_id = f"{random.getrandbits(64):016x}"
+        self.update_id = update_id
+        self.handler = handler
+        self.started = time.perf_counter()
+        self.wall = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.spans: List[Dict[str, Any]] = []
+        # вид спана → [мс, количество]
+        self.totals: Dict[str, List[float]] = {}
+        self.dropped = 0
+        self.duration: Optional[float] = None
+        self.status = "ok"
+
+    def add_span(self, kind: str, name: str, started: float, seconds: float, **attrs: Any) -> None:
+        if self.duration is not None:
+            return  # фоновая задача, пережившая апдейт
+        total = self.totals.setdefault(kind, [0.0, 0])
+        total[0] += seconds * 1000
+        total[1] += 1
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        span = {
+            "kind": kind,
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "ms": round(seconds * 1000, 2),
+        }
+        span.update(attrs)
+        self.spans.append(span)
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Время по видам спанов + «code» — остаток, не покрытый спанами"""
+        out = {kind: {"ms": round(ms, 2), "count": int(count)} for kind, (ms, count) in self.totals.items()}
+        covered = sum(ms for ms, _ in self.totals.values())
+        out["code"] = {"ms": round(max(0.0, (self.duration or 0) * 1000 - covered), 2), "count": 1}
+        return out
+
+    def to_dict(self, with_spans: bool = True) -> Dict[str, Any]:
+        data = {
+            "ts": self.wall,
+            "trace_id": self.trace_id,
+            "update_id": self.update_id,
+            "handler": self.handler,
+            "status": self.status,
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            "breakdown": self.breakdown(),
+        }
+        if with_spans:
+            data["spans"] = self.spans
+            if self.dropped:
+                data["spans_dropped"] = self.dropped
+        return data
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("seido_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def add_span(kind: str, name: str, started: float, seconds: float, **attrs: Any) -> None:
+    """Записать готовый спан в текущую трассу (если апдейт трассируется)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(kind, name, started, seconds, **attrs)
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs: Any) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(kind, name, started, time.perf_counter() - started, **attrs)
+
+
+def traced(kind: str):
+    """Декоратор синхронной функции: её вызовы — спаны вида kind"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.add_span(kind, func.__name__, started, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """Начало/конец трасс, выборка в журнал и последние трассы для /dev"""
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, slow_ms: float = TRACE_SLOW_MS,
+                 trace_dir: str = TRACE_DIR):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.trace_dir = trace_dir
+        self.recent: Deque[Trace] = deque(maxlen=RECENT_TRACES)
+        self.stats = {"traces": 0, "written": 0, "write_errors": 0}
+
+    def start(self, update_id: Optional[int], handler: str):
+        trace = Trace(update_id, handler)
+        return trace, _current.set(trace)
+
+    def finish(self, trace: Trace, token, error: bool = False) -> None:
+        _current.reset(token)
+        trace.duration = time.perf_counter() - trace.started
+        if error:
+            trace.status = "error"
+        self.recent.append(trace)
+        self.stats["traces"] += 1
+        if trace.duration * 1000 >= self.slow_ms or random.random() < self.sample_rate:
+            self._write(trace)
+
+    def _write(self, trace: Trace) -> None:
+        path = os.path.join(self.trace_dir, f"traces_{datetime.now().strftime('%Y%m%d')}.jsonl")
+        try:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            self.stats["written"] += 1
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            logger.warning(f"Не удалось записать трассу: {e}")
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые медленные из последних RECENT_TRACES апдейтов"""
+        top = heapq.nlargest(limit, self.recent, key=lambda t: t.duration or 0)
+        return [t.to_dict() for t in top]
+
+
+# Глобальный экземпляр
+tracer = Tracer()
@@ -0,0 +1,191 @@
+"""
+Seido Bot - Режим webhook (aiohttp)
+Telegram сам присылает апдейты на WEBHOOK_URL + WEBHOOK_PATH; ответ 200 уходит сразу,
+обработка идёт в фоне не более чем в WEBHOOK_MAX_CONCURRENCY задач одновременно.
+GET /health — состояние процесса для внешнего мониторинга (вместо пинга Healthchecks).
+GET /metrics — метрики Prometheus (metrics.py), GET /metrics/db — время запросов к SQLite
+по методам и журнал медленных (query_stats.py).
+"""
+import asyncio
+import logging
+import signal
+import time
+from typing import Any, Dict
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config import (
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_DRAIN_TIMEOUT,
+)
+from db import db
+from metrics import metrics_handler, registry
+from middlewares import throttling
+from query_stats import query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook с ограничением параллельности и дренажом при остановке.
+    Пока идёт остановка, новые апдейты получают 503 — Telegram повторит их позже.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+        drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self.max_concurrency = max(1, max_concurrency)
+        self.drain_timeout = drain_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.accepting = True
+        self.started_at = time.monotonic()
+        self.stats = {"received": 0, "handled": 0, "failed": 0, "rejected": 0, "running": 0}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not self.accepting:
+            self.stats["rejected"] += 1
+            return web.Response(status=503, text="Shutting down")
+        self.stats["received"] += 1
+        return await super().handle(request)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            self.stats["running"] += 1
+            try:
+                await super()._background_feed_update(bot=bot, update=update)
+                self.stats["handled"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.exception(f"Ошибка обработки апдейта {update.get('update_id')}: {e}")
+            finally:
+                self.stats["running"] -= 1
+
+    @property
+    def pending(self) -> int:
+        """Апдейты, принятые, но ещё не обработанные (в работе + в очереди)"""
+        return len(self._background_feed_update_tasks)
+
+    async def drain(self) -> None:
+        """Перестать принимать апдейты и дождаться начатых (не дольше drain_timeout)"""
+        self.accepting = False
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+        logger.info(f"Ожидание {len(tasks)} апдейтов перед остановкой...")
+        _, not_done = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(f"Прервано апдейтов по таймауту: {len(not_done)}")
+
+    async def close(self) -> None:
+        # Сессию бота закрывает on_shutdown в main.py — после дренажа
+        await self.drain()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok" if self.accepting else "draining",
+            "mode": "webhook",
+            "uptime_s": round(time.monotonic() - self.started_at),
+            "pending": self.pending,
+            "max_concurrency": self.max_concurrency,
+            "db": db.db is not None,
+            **self.stats,
+            "throttling": dict(throttling.stats),
+        }
+
+
+async def _health(request: web.Request) -> web.Response:
+    handler: BoundedRequestHandler = request.app["webhook_handler"]
+    data = handler.health()
+    status = 200 if data["status"] == "ok" and data["db"] else 503
+    return web.json_response(data, status=status)
+
+
+async def _db_metrics(request: web.Request) -> web.Response:
+    return web.json_response(query_stats.snapshot())
+
+
+def _webhook_lines(handler: BoundedRequestHandler):
+    lines = [
+        "# HELP seido_webhook_requests_total Запросы webhook по исходу",
+        "# TYPE seido_webhook_requests_total counter",
+    ]
+    for outcome in ("received", "handled", "failed", "rejected"):
+        lines.append(f'seido_webhook_requests_total{{outcome="{outcome}"}} {handler.stats[outcome]}')
+    lines += [
+        "# HELP seido_webhook_pending Принятые и ещё не обработанные апдейты",
+        "# TYPE seido_webhook_pending gauge",
+        f"seido_webhook_pending {handler.pending}",
+    ]
+    return lines
+
+
+def build_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение: POST WEBHOOK_PATH, GET /health, GET /metrics и GET /metrics/db"""
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET or None,
+    )
+    app["webhook_handler"] = handler
+    registry.register_collector("webhook", lambda: _webhook_lines(handler))
+    # Регистрируем до setup_application: дренаж (on_shutdown обработчика) должен
+    # отработать раньше, чем хуки диспетчера закроют БД и сессию бота
+    handler.register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/health", _health)
+    app.router.add_get("/metrics", metrics_handler)
+    app.router.add_get("/metrics/db", _db_metrics)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def _set_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    await bot.set_webhook(
+        url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET or None,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=min(100, max(1, WEBHOOK_MAX_CONCURRENCY)),
+    )
+    logger.info(f"Webhook установлен: {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Запустить aiohttp-сервер и работать до SIGINT/SIGTERM (Ctrl+C)"""
+    if not WEBHOOK_URL:
+        raise RuntimeError("BOT_MODE=webhook требует WEBHOOK_URL в .env")
+
+    dp.startup.register(_set_webhook)
+    app = build_app(dp, bot)
+    runner = web.AppRunner(app, shutdown_timeout=WEBHOOK_DRAIN_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
+    await site.start()
+    print(f"🌐 Webhook-сервер слушает {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C прерывает stop.wait() через KeyboardInterrupt
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
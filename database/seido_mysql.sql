@@ -7,6 +7,7 @@
 -- ============================================
 CREATE TABLE IF NOT EXISTS runners (
     id INT PRIMARY KEY AUTO_INCREMENT,
+    sqlite_id INT UNIQUE,                  -- id в SQLite бота (ключ синхронизации)
     telegram_id BIGINT UNIQUE,
     first_name VARCHAR(100) NOT NULL,
     last_name VARCHAR(100) NOT NULL,
@@ -28,6 +29,7 @@ CREATE TABLE IF NOT EXISTS runners (
 -- ============================================
 CREATE TABLE IF NOT EXISTS races (
     id INT PRIMARY KEY AUTO_INCREMENT,
+    sqlite_id INT UNIQUE,                  -- id в SQLite бота (ключ синхронизации)
     name VARCHAR(200) NOT NULL,
     date DATE NOT NULL,
     location VARCHAR(200),
@@ -39,6 +41,7 @@ CREATE TABLE IF NOT EXISTS races (
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_name_date (name, date),      -- не уникальный: ключ синхронизации — sqlite_id
     INDEX idx_date (date),
     INDEX idx_name (name),
     INDEX idx_organizer (organizer),
@@ -53,6 +56,7 @@ CREATE TABLE IF NOT EXISTS results (
     runner_id INT NOT NULL,
     race_id INT NOT NULL,
     distance VARCHAR(50) NOT NULL,
+    distance_m INT,                      -- дистанция в метрах (5 км, 5км, 5000 м → 5000)
     finish_time TIME,
     finish_time_seconds INT,
     pace TIME,
@@ -72,7 +76,8 @@ CREATE TABLE IF NOT EXISTS results (
     UNIQUE KEY unique_result (runner_id, race_id, distance),
     INDEX idx_runner (runner_id),
     INDEX idx_race (race_id),
-    INDEX idx_time (finish_time_seconds)
+    INDEX idx_time (finish_time_seconds),
+    INDEX idx_distance_m (distance_m, finish_time_seconds)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ============================================
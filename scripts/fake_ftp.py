@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Seido — локальный FTP-сервер для проверки upload_to_hosting.py без хостинга
+Минимальный набор команд ftplib (USER/PASS, PASV, STOR, RNFR/RNTO, DELE, MKD, CWD, ...),
+файлы пишутся в папку --root. --latency имитирует задержку до reg.ru на каждую команду.
+
+Запуск:
+  python scripts/fake_ftp.py --root /tmp/ftp --port 2121 --latency 30
+  (в bot/.env: FTP_HOST=127.0.0.1, FTP_PORT=2121, FTP_PASSWORD=любой;
+   папку /tmp/ftp/public_html создайте заранее)
+"""
+import argparse
+import os
+import posixpath
+import shutil
+import socket
+import socketserver
+import threading
+import time
+
+
+class FtpHandler(socketserver.StreamRequestHandler):
+    server: "FakeFtpServer"
+    # Иначе ответ 226 ждёт delayed ACK клиента (~40 мс на файл), как не бывает у настоящих серверов
+    disable_nagle_algorithm = True
+
+    def reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("utf-8"))
+
+    def local(self, path: str) -> str:
+        """Путь FTP → путь в папке root (выйти за root нельзя)"""
+        virtual = posixpath.normpath(posixpath.join(self.cwd, path or "."))
+        return os.path.join(self.server.root, virtual.lstrip("/"))
+
+    def handle(self) -> None:
+        self.cwd = "/"
+        self.rename_from = None
+        self.data_listener = None
+        self.reply("220 Seido fake FTP")
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            command, _, arg = line.partition(" ")
+            command = command.upper()
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            with self.server.lock:
+                self.server.calls[command] = self.server.calls.get(command, 0) + 1
+            method = getattr(self, f"do_{command}", None)
+            if method is None:
+                self.reply(f"502 {command} not implemented")
+                continue
+            try:
+                if method(arg) is False:
+                    break
+            except OSError as e:
+                self.reply(f"550 {e.strerror or e}")
+
+    def do_USER(self, arg):
+        self.reply("331 Password required")
+
+    def do_PASS(self, arg):
+        self.reply("230 Logged in")
+
+    def do_SYST(self, arg):
+        self.reply("215 UNIX Type: L8")
+
+    def do_FEAT(self, arg):
+        self.reply("211 No features")
+
+    def do_OPTS(self, arg):
+        self.reply("200 OK")
+
+    def do_NOOP(self, arg):
+        self.reply("200 OK")
+
+    def do_TYPE(self, arg):
+        self.reply("200 Type set")
+
+    def do_PWD(self, arg):
+        self.reply(f'257 "{self.cwd}"')
+
+    def do_CWD(self, arg):
+        if not os.path.isdir(self.local(arg)):
+            self.reply("550 No such directory")
+            return
+        self.cwd = posixpath.normpath(posixpath.join(self.cwd, arg))
+        self.reply("250 OK")
+
+    def do_MKD(self, arg):
+        path = self.local(arg)
+        if os.path.exists(path):
+            self.reply("550 Exists")
+            return
+        os.mkdir(path)
+        self.reply(f'257 "{arg}" created')
+
+    def do_DELE(self, arg):
+        os.remove(self.local(arg))
+        self.reply("250 Deleted")
+
+    def do_RNFR(self, arg):
+        if not os.path.exists(self.local(arg)):
+            self.reply("550 No such file")
+            return
+        self.rename_from = self.local(arg)
+        self.reply("350 Ready")
+
+    def do_RNTO(self, arg):
+        if self.rename_from is None:
+            self.reply("503 RNFR first")
+            return
+        os.replace(self.rename_from, self.local(arg))
+        self.rename_from = None
+        self.reply("250 Renamed")
+
+    def do_SIZE(self, arg):
+        self.reply(f"213 {os.path.getsize(self.local(arg))}")
+
+    def do_PASV(self, arg):
+        if self.data_listener:
+            self.data_listener.close()
+        self.data_listener = socket.socket()
+        self.data_listener.bind((self.server.server_address[0], 0))
+        self.data_listener.listen(1)
+        host, port = self.data_listener.getsockname()
+        self.reply(f"227 Entering Passive Mode ({host.replace('.', ',')},{port >> 8},{port & 0xFF})")
+
+    def _data_connection(self) -> socket.socket:
+        conn, _ = self.data_listener.accept()
+        self.data_listener.close()
+        self.data_listener = None
+        return conn
+
+    def do_STOR(self, arg):
+        if self.data_listener is None:
+            self.reply("425 Use PASV first")
+            return
+        self.reply("150 Opening data connection")
+        conn = self._data_connection()
+        with conn, open(self.local(arg), "wb") as f:
+            shutil.copyfileobj(conn.makefile("rb"), f)
+        self.reply("226 Transfer complete")
+
+    def do_NLST(self, arg):
+        if self.data_listener is None:
+            self.reply("425 Use PASV first")
+            return
+        self.reply("150 Opening data connection")
+        conn = self._data_connection()
+        with conn:
+            names = sorted(os.listdir(self.local(arg)))
+            conn.sendall("".join(f"{n}\r\n" for n in names).encode("utf-8"))
+        self.reply("226 Transfer complete")
+
+    def do_QUIT(self, arg):
+        self.reply("221 Bye")
+        return False
+
+
+class FakeFtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, root: str, latency: float = 0.0):
+        super().__init__(address, FtpHandler)
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный FTP-сервер для проверки загрузки")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2121)
+    parser.add_argument("--root", required=True, help="Папка, куда пишутся файлы")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка на команду, мс")
+    args = parser.parse_args()
+
+    os.makedirs(args.root, exist_ok=True)
+    server = FakeFtpServer((args.host, args.port), args.root, args.latency / 1000)
+    print(f"📁 Fake FTP: ftp://{args.host}:{args.port} → {server.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"   команды: {server.calls}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
 """
 Автоматическая загрузка файлов на хостинг reg.ru через FTP
+
+  python upload_to_hosting.py            — сайт (index.html, api.php, логотип)
+  python upload_to_hosting.py --static   — статический API (api/static, см. bot/scripts/export_static_api.py)
+
+Загружаются только изменённые файлы: sha256 загруженных хранится в .upload_manifest.json
+(в корне проекта). Файлы идут параллельно по нескольким FTP-соединениям, каждый —
+под временным именем с переименованием в конце, так что сайт не увидит недописанный файл.
+Файлы api/static, которых больше нет локально, удаляются с хостинга.
+Проверка без хостинга: scripts/fake_ftp.py.
 """
+import argparse
 import ftplib
+import hashlib
+import json
 import os
+import posixpath
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -21,6 +37,9 @@ FTP_CONFIG = {
     'remote_dir': os.getenv('FTP_REMOTE_DIR', '/public_html'),
 }
 
+# Одновременных FTP-соединений (хостинг ограничивает их число на пользователя)
+FTP_WORKERS = int(os.getenv('FTP_WORKERS', 4))
+
 # Файлы для загрузки
 FILES_TO_UPLOAD = [
     {
@@ -40,78 +59,250 @@ FILES_TO_UPLOAD = [
     },
 ]
 
+# Статический API: список файлов берётся из его manifest.json,
+# сам manifest загружается последним — сайт увидит новую версию, когда файлы уже на месте
+STATIC_DIR = 'api/static'
+STATIC_MANIFEST = 'manifest.json'
 
-def create_remote_directory(ftp, remote_dir):
-    """Создаёт директорию на FTP сервере, если её нет"""
-    if not remote_dir or remote_dir == '.':
-        return
-    
-    parts = [p for p in remote_dir.split('/') if p]
-    current_path = ''
-    
-    for part in parts:
-        current_path += '/' + part
-        try:
-            ftp.cwd(current_path)
-        except:
+UPLOAD_MANIFEST = '.upload_manifest.json'
+TEMP_SUFFIX = '.uploading'
+# Больше файлов — не печатаем каждый, только итог и ошибки
+VERBOSE_LIMIT = 20
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def static_files(project_root):
+    """Файлы api/static по его manifest.json (manifest.json — последним) или None"""
+    manifest_path = project_root / STATIC_DIR / STATIC_MANIFEST
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        paths = sorted(json.load(f)['files'])
+    return [
+        {
+            'local': f'{STATIC_DIR}/{path}',
+            'remote': f'{STATIC_DIR}/{path}',
+            'description': 'Статический API',
+        }
+        for path in paths + [STATIC_MANIFEST]
+    ]
+
+
+def load_upload_manifest(project_root):
+    """{удалённый путь: sha256} загруженного на текущий хост и папку"""
+    path = project_root / UPLOAD_MANIFEST
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('host') != FTP_CONFIG['host'] or data.get('remote_dir') != FTP_CONFIG['remote_dir']:
+        return {}
+    return data.get('files', {})
+
+
+def save_upload_manifest(project_root, files):
+    with open(project_root / UPLOAD_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump({
+            'host': FTP_CONFIG['host'],
+            'remote_dir': FTP_CONFIG['remote_dir'],
+            'files': dict(sorted(files.items())),
+        }, f, ensure_ascii=False, indent=1)
+
+
+def connect_ftp():
+    ftp = ftplib.FTP(timeout=60)
+    ftp.connect(FTP_CONFIG['host'], FTP_CONFIG['port'])
+    ftp.login(FTP_CONFIG['user'], FTP_CONFIG['password'])
+    ftp.encoding = 'utf-8'
+    # Двоичный режим один раз на соединение, а не перед каждым файлом, как в storbinary
+    ftp.voidcmd('TYPE I')
+    return ftp
+
+
+class FtpPool:
+    """По одному FTP-соединению на поток; оборванное соединение открывается заново"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def get(self):
+        ftp = getattr(self._local, 'ftp', None)
+        if ftp is None:
+            ftp = self._local.ftp = connect_ftp()
+            with self._lock:
+                self._all.append(ftp)
+        return ftp
+
+    def drop(self):
+        ftp = getattr(self._local, 'ftp', None)
+        self._local.ftp = None
+        if ftp is not None:
+            ftp.close()
+
+    def close(self):
+        for ftp in self._all:
             try:
-                ftp.mkd(current_path)
-                ftp.cwd(current_path)
-            except Exception as e:
-                print(f"  [!] Не удалось создать директорию {current_path}: {e}")
+                ftp.quit()
+            except Exception:
+                ftp.close()
+
+
+def remote_full_path(remote_path):
+    return posixpath.join(FTP_CONFIG['remote_dir'] or '/', remote_path)
+
+
+def create_remote_directories(ftp, remote_paths):
+    """Создать папки для файлов один раз до загрузки (родительские раньше дочерних)"""
+    dirs = set()
+    for remote_path in remote_paths:
+        parent = posixpath.dirname(remote_path)
+        while parent:
+            dirs.add(parent)
+            parent = posixpath.dirname(parent)
+    for remote_dir in sorted(dirs, key=lambda d: (d.count('/'), d)):
+        try:
+            ftp.mkd(remote_full_path(remote_dir))
+        except ftplib.error_perm:
+            pass  # уже есть
+
+
+def store(ftp, local_path, path):
+    with open(local_path, 'rb') as file, ftp.transfercmd(f'STOR {path}') as conn:
+        while block := file.read(1 << 16):
+            conn.sendall(block)
+    ftp.voidresp()
 
 
-def upload_file(ftp, local_path, remote_path, base_dir):
-    """Загружает один файл на FTP сервер"""
+def upload_file(ftp, local_path, remote_path):
+    """
+    Загрузить файл атомарно: запись под временным именем и переименование —
+    сайт не увидит недописанный файл, даже если его нет в .upload_manifest.json
+    (первый прогон, --force, потерянный manifest).
+    """
+    target = remote_full_path(remote_path)
+    temp = target + TEMP_SUFFIX
+    store(ftp, local_path, temp)
     try:
-        # Переходим в базовую директорию
-        ftp.cwd(base_dir)
-        
-        # Создаём директории, если нужно
-        remote_dir = os.path.dirname(remote_path)
-        if remote_dir:
-            create_remote_directory(ftp, remote_dir)
-            # Переходим в директорию файла
-            if remote_dir:
-                try:
-                    ftp.cwd(remote_dir)
-                except:
-                    pass
-        
-        # Загружаем файл
-        remote_filename = os.path.basename(remote_path)
-        with open(local_path, 'rb') as file:
-            ftp.storbinary(f'STOR {remote_filename}', file)
-        
-        print(f"  [OK] Загружен: {remote_path}")
-        return True
-    except Exception as e:
-        print(f"  [ERROR] Ошибка при загрузке {remote_path}: {e}")
-        return False
+        ftp.rename(temp, target)
+    except ftplib.error_perm:
+        # Некоторые серверы не переименовывают поверх существующего файла
+        try:
+            ftp.delete(target)
+        except ftplib.error_perm:
+            # Файла нет — переименование не удалось по другой причине
+            delete_file(ftp, remote_path + TEMP_SUFFIX)
+            raise
+        ftp.rename(temp, target)
+
+
+def delete_file(ftp, remote_path):
+    try:
+        ftp.delete(remote_full_path(remote_path))
+    except ftplib.error_perm:
+        pass  # уже удалён вручную
+
+
+def run_parallel(pool, action, items, workers, verbose):
+    """
+    Выполнить action(ftp, item) для всех items в workers потоках; при сетевой ошибке
+    соединение открывается заново и попытка повторяется один раз.
+    Returns: (успешные items, число ошибок)
+    """
+    done, failed = [], 0
+    lock = threading.Lock()
+
+    def worker(item):
+        nonlocal failed
+        for attempt in (1, 2):
+            try:
+                action(pool.get(), item)
+                with lock:
+                    done.append(item)
+                if verbose:
+                    print(f"  [OK] {item['remote']}")
+                return
+            except ftplib.error_perm as e:
+                error = e  # ответ сервера — повтор не поможет
+                break
+            except (OSError, EOFError, ftplib.Error) as e:
+                error = e
+                pool.drop()
+        with lock:
+            failed += 1
+        print(f"  [ERROR] Ошибка при загрузке {item['remote']}: {error}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(worker, items))
+    return done, failed
 
 
 def main():
     """Основная функция загрузки"""
+    parser = argparse.ArgumentParser(description="Загрузка файлов на хостинг по FTP")
+    parser.add_argument('--static', action='store_true', help="Загрузить статический API (api/static)")
+    parser.add_argument('--force', action='store_true', help="Загрузить все файлы, даже не изменённые")
+    parser.add_argument('--dry-run', action='store_true', help="Только показать, что будет загружено и удалено")
+    parser.add_argument('--workers', type=int, default=FTP_WORKERS,
+                        help=f"Параллельных FTP-соединений (по умолчанию {FTP_WORKERS})")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Загрузка файлов на хостинг seidorun.ru")
     print("=" * 60)
     print()
-    
+
     # Проверяем наличие файлов
     project_root = Path(__file__).parent.parent
     missing_files = []
-    
-    for file_info in FILES_TO_UPLOAD:
+    files_to_upload = FILES_TO_UPLOAD
+    if args.static:
+        files_to_upload = static_files(project_root)
+        if files_to_upload is None:
+            print(f"[!] Нет {STATIC_DIR}/{STATIC_MANIFEST}. Сначала: python bot/scripts/export_static_api.py")
+            return
+
+    for file_info in files_to_upload:
         local_path = project_root / file_info['local']
         if not local_path.exists():
             missing_files.append(file_info['local'])
             print(f"[!] Файл не найден: {file_info['local']}")
-    
+
     if missing_files:
         print(f"\n❌ Не найдено файлов: {', '.join(missing_files)}")
         print("Проверьте, что все файлы на месте.")
         return
-    
+
+    # Сравниваем с тем, что уже загружено
+    uploaded = load_upload_manifest(project_root)
+    hashes = {f['remote']: file_hash(project_root / f['local']) for f in files_to_upload}
+    changed = [f for f in files_to_upload if args.force or uploaded.get(f['remote']) != hashes[f['remote']]]
+    stale = []
+    if args.static:
+        current = set(hashes)
+        stale = [{'remote': path} for path in sorted(uploaded)
+                 if path.startswith(STATIC_DIR + '/') and path not in current]
+
+    print(f"Файлов: {len(files_to_upload)}, изменено: {len(changed)}, к удалению: {len(stale)}")
+    if not changed and not stale:
+        print("[OK] Всё уже загружено")
+        return
+    if args.dry_run:
+        for file_info in changed:
+            print(f"  ↑ {file_info['remote']}")
+        for file_info in stale:
+            print(f"  ✗ {file_info['remote']}")
+        return
+    print()
+
     # Проверяем настройки FTP
     if not FTP_CONFIG['password']:
         print("[!] Пароль FTP не указан!")
@@ -121,19 +312,15 @@ def main():
         print("FTP_PASSWORD=ваш_пароль")
         print("FTP_REMOTE_DIR=/public_html")
         return
-    
+
     # Подключаемся к FTP
     print(f"Подключение к FTP: {FTP_CONFIG['host']}...")
     print(f"   Пользователь: {FTP_CONFIG['user']}")
     print(f"   Порт: {FTP_CONFIG['port']}")
     print()
-    
+
     try:
-        ftp = ftplib.FTP()
-        ftp.connect(FTP_CONFIG['host'], FTP_CONFIG['port'])
-        print("[OK] Соединение установлено, авторизация...")
-        ftp.login(FTP_CONFIG['user'], FTP_CONFIG['password'])
-        ftp.encoding = 'utf-8'
+        ftp = connect_ftp()
         print("[OK] Авторизация успешна!")
         print()
     except ftplib.error_perm as e:
@@ -152,53 +339,61 @@ def main():
         print("2. Доступность FTP сервера")
         print("3. Настройки файрвола")
         return
-    
+
+    pool = FtpPool()
+    started = time.perf_counter()
     try:
-        # Переходим в рабочую директорию
-        try:
-            ftp.cwd(FTP_CONFIG['remote_dir'])
-            print(f"Рабочая директория: {FTP_CONFIG['remote_dir']}")
-        except:
-            print(f"[!] Директория {FTP_CONFIG['remote_dir']} не найдена, используем корень")
-        
-        print()
-        print("Начинаю загрузку файлов...")
-        print()
-        
-        # Загружаем файлы
-        uploaded = 0
-        failed = 0
-        
-        for file_info in FILES_TO_UPLOAD:
-            local_path = project_root / file_info['local']
-            remote_path = file_info['remote']
-            
-            print(f"{file_info['description']}: {file_info['local']} -> {remote_path}")
-            
-            if upload_file(ftp, str(local_path), remote_path, FTP_CONFIG['remote_dir']):
-                uploaded += 1
-            else:
-                failed += 1
-            print()
-        
+        create_remote_directories(ftp, [f['remote'] for f in changed])
+        ftp.quit()
+
+        print(f"Начинаю загрузку: {len(changed)} файлов в {args.workers} потоков...")
+        verbose = len(changed) + len(stale) <= VERBOSE_LIMIT
+        upload = lambda conn, f: upload_file(conn, str(project_root / f['local']), f['remote'])
+
+        # manifest статического API — только после всех его файлов и только без ошибок
+        last = [f for f in changed if args.static and f['remote'].endswith('/' + STATIC_MANIFEST)]
+        done, failed = run_parallel(pool, upload, [f for f in changed if f not in last], args.workers, verbose)
+        if last and failed:
+            print(f"[!] {last[0]['remote']} не загружен из-за ошибок выше — сайт остаётся на прошлой версии")
+        elif last:
+            more, failed = run_parallel(pool, upload, last, 1, verbose)
+            done += more
+        for file_info in done:
+            uploaded[file_info['remote']] = hashes[file_info['remote']]
+
+        # Устаревшие файлы удаляем, только когда новая версия целиком на хостинге
+        deleted = []
+        if stale and not failed:
+            deleted, _ = run_parallel(pool, lambda conn, f: delete_file(conn, f['remote']),
+                                      stale, args.workers, verbose)
+            for file_info in deleted:
+                uploaded.pop(file_info['remote'], None)
+        save_upload_manifest(project_root, uploaded)
+
         # Итоги
+        print()
         print("=" * 60)
         print("[OK] Загрузка завершена!")
-        print(f"   Успешно: {uploaded}")
+        print(f"   Загружено: {len(done)}")
+        print(f"   Удалено: {len(deleted)}")
         print(f"   Ошибок: {failed}")
+        print(f"   Время: {time.perf_counter() - started:.1f} с")
         print("=" * 60)
-        
-        if uploaded > 0:
+
+        if done and not args.static:
             print("\nПроверьте сайт:")
             print("   https://seidorun.ru")
             print("   https://seidorun.ru/api/api.php")
-        
+        if failed:
+            sys.exit(1)
+
     except Exception as e:
         print(f"[ERROR] Критическая ошибка: {e}")
         import traceback
         traceback.print_exc()
+        sys.exit(1)
     finally:
-        ftp.quit()
+        pool.close()
         print("\nСоединение закрыто")
 
 